@@ -1,6 +1,7 @@
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -11,7 +12,6 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     'core.apps.CoreConfig',
-    'import_export',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -45,11 +45,53 @@ TEMPLATES = [
     },
 ]
 WSGI_APPLICATION = 'config.wsgi.application'
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Banco de dados escolhido por variáveis de ambiente: DB_ENGINE=sqlite (padrão, para sites
+# pequenos) ou DB_ENGINE=postgres (vários atendentes gravando ao mesmo tempo).
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'leilao'),
+            'USER': os.getenv('DB_USER', ''),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', ''),
+            # Conexões persistentes: cada worker reaproveita a conexão entre requisições, e a
+            # verificação de saúde descarta as que o servidor já fechou antes de usá-las.
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+            # Os .iterator() das exportações usam cursores no servidor (as linhas chegam em blocos).
+            # Atrás de um pgbouncer em modo "transaction" eles precisam ser desligados (DB_PGBOUNCER=1).
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER', '') == '1',
+            'OPTIONS': {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10'))},
+        }
+    }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME') or BASE_DIR / 'db.sqlite3',
+            # BEGIN IMMEDIATE: a transação já começa com a trava de escrita, então escritas concorrentes
+            # esperam o timeout (segundos) em vez de falhar com "database is locked" ao promover leitura -> escrita.
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': int(os.getenv('DB_SQLITE_TIMEOUT', '20'))},
+            # Banco de testes em arquivo (e não em memória): os testes de concorrência abrem uma
+            # conexão por thread, como os workers em produção.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE inválido: {DB_ENGINE!r} (use 'sqlite' ou 'postgres').")
+# PRAGMAs aplicados a cada nova conexão SQLite (sinal connection_created em core/signals.py). WAL
+# deixa as leituras seguirem durante uma escrita; synchronous=NORMAL é seguro com WAL e evita um
+# fsync por commit; mmap e cache maiores reduzem leituras de disco nos dashboards.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('DB_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('DB_SQLITE_TIMEOUT', '20')) * 1000,
+    'mmap_size': int(os.getenv('DB_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'cache_size': -int(os.getenv('DB_SQLITE_CACHE_KB', str(64 * 1024))),
+    'temp_store': 'MEMORY',
 }
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -71,4 +113,42 @@ API_CLIENTES_ID = os.getenv("API_CLIENT_ID")
 API_CLIENTES_SECRET = os.getenv("API_CLIENT_SECRET")
 STATICFILES_DIRS = [
     BASE_DIR / "static",
-]
\ No newline at end of file
+]
+# Arquivos enviados para a fila de jobs e relatórios gerados em segundo plano.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Arquivos dos leilões arquivados (comando archive_leiloes, core/arquivamento.py): um diretório por
+# leilão com as visitas, lotes, arremates e histórico em CSV compactado (gzip).
+ARQUIVO_LEILOES_DIR = Path(os.getenv('ARQUIVO_LEILOES_DIR') or BASE_DIR / 'arquivo')
+# Cache usado pelos dashboards e pelo token da API de clientes. Em produção com vários workers,
+# aponte para um cache compartilhado (ex.: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Check-in de visitas (core/visitas.py): os check-ins simultâneos de um processo são gravados
+# juntos, em grupos de até VISITAS_GRUPO_MAXIMO ou a cada VISITAS_JANELA_MS milissegundos
+# (0 grava cada requisição na hora, sem agrupar).
+VISITAS_JANELA_MS = int(os.getenv('VISITAS_JANELA_MS', '20'))
+VISITAS_GRUPO_MAXIMO = 200
+
+# Perfil das requisições (core/perfil.py): desligado por padrão. Com PERFIL_REQUISICOES=1, mede
+# cada requisição e agrega histogramas por view em api/perfil/ (staff); PERFIL_AMOSTRAGEM é a
+# fração das requisições registradas no log "core.perfil" (as mais lentas que
+# PERFIL_LIMITE_LENTO_MS sempre são registradas).
+PERFIL_REQUISICOES = os.getenv('PERFIL_REQUISICOES', '') == '1'
+PERFIL_AMOSTRAGEM = float(os.getenv('PERFIL_AMOSTRAGEM', '0.01'))
+PERFIL_LIMITE_LENTO_MS = float(os.getenv('PERFIL_LIMITE_LENTO_MS', '1000'))
+PERFIL_CONSULTAS_LENTAS = 5
+if PERFIL_REQUISICOES:
+    # Primeiro da lista, para o tempo medido incluir os demais middlewares.
+    MIDDLEWARE.insert(0, 'core.perfil.PerfilRequisicoesMiddleware')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'core.perfil': {'handlers': ['console'], 'level': 'INFO', 'propagate': False}},
+}
@@ -1,5 +1,6 @@
 from django.contrib import admin, messages
-from .models import Comitente, Veiculo, Leilao, Visita, Arremate, Lote
+from .lotes import cancelar_arremates, transicionar_lotes
+from .models import Cliente, Comitente, Veiculo, Leilao, Visita, Arremate, Lote, Job
 
 # --- FUNÇÕES AUXILIARES ---
 
@@ -12,14 +13,27 @@ def formatar_moeda(valor):
         return f"R$ {valor_numerico:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     except (ValueError, TypeError): return valor
 
-@admin.action(description="Reverter status para 'Disponível'")
+def _mensagem_transicao(request, alterados, ignorados, descricao):
+    messages.success(request, f"{alterados} lote(s) {descricao}.")
+    if ignorados:
+        messages.warning(request, f"{ignorados} lote(s) ignorado(s): o status atual não permite esta operação.")
+
+@admin.action(description="Reverter status para 'Disponível' (cancela o arremate)")
 def reverter_para_disponivel(modeladmin, request, queryset):
-    updated_count = queryset.update(status='DISPONIVEL')
-    # Também deleta o arremate associado, se houver
-    for lote in queryset:
-        if hasattr(lote, 'arremate'):
-            lote.arremate.delete() # O sinal de delete do arremate não é mais necessário com esta abordagem
-    messages.success(request, f"{updated_count} lote(s) teve(iveram) seu status revertido para 'Disponível'.")
+    cancelados, ignorados = cancelar_arremates(queryset)
+    _mensagem_transicao(request, cancelados, ignorados, "teve(iveram) o arremate cancelado e voltou(aram) para 'Disponível'")
+
+@admin.action(description="Confirmar pagamento")
+def confirmar_pagamento(modeladmin, request, queryset):
+    _mensagem_transicao(request, *transicionar_lotes(queryset, 'PAGAMENTO_CONFIRMADO'), "com pagamento confirmado")
+
+@admin.action(description="Marcar como 'Retirado'")
+def marcar_retirado(modeladmin, request, queryset):
+    _mensagem_transicao(request, *transicionar_lotes(queryset, 'RETIRADO'), "marcado(s) como retirado(s)")
+
+@admin.action(description="Marcar como 'Retornado com Multa'")
+def marcar_retornado(modeladmin, request, queryset):
+    _mensagem_transicao(request, *transicionar_lotes(queryset, 'RETORNADO'), "marcado(s) como retornado(s)")
 
 # --- CONFIGURAÇÕES DO ADMIN ---
 
@@ -34,17 +48,30 @@ class LeilaoAdmin(admin.ModelAdmin):
     list_display = ('nome_evento', 'data_leilao_principal')
     search_fields = ('nome_evento',)
 
+class ClienteAdmin(admin.ModelAdmin):
+    list_display = ('documento', 'nome', 'atualizado_em')
+    search_fields = ('documento', 'nome')
+
 class VisitaAdmin(admin.ModelAdmin):
     list_display = ('leilao', 'cpf_cliente', 'nome_cliente', 'data_visita')
     search_fields = ('cpf_cliente', 'nome_cliente', 'leilao__nome_evento')
     list_filter = ('leilao',)
+    list_select_related = ('leilao',)
+    autocomplete_fields = ('cliente',)
 
 class LoteAdmin(admin.ModelAdmin):
     list_display = ('numero_lote', 'veiculo', 'leilao', 'comitente', 'status', 'lance_inicial_formatado')
     search_fields = ('numero_lote', 'veiculo__placa', 'veiculo__min_veiculo', 'leilao__nome_evento')
     list_filter = ('status', 'leilao', 'comitente')
     ordering = ('-leilao__data_leilao_principal', 'numero_lote')
-    actions = [reverter_para_disponivel]
+    list_select_related = ('veiculo', 'leilao', 'comitente')
+    autocomplete_fields = ('veiculo',)
+    actions = [confirmar_pagamento, marcar_retirado, marcar_retornado, reverter_para_disponivel]
+
+    def get_queryset(self, request):
+        # Também no autocomplete do ArremateAdmin e na página de edição (str(lote) usa o leilão).
+        # O changelist ignora list_select_related quando a queryset já vem com select_related.
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
     @admin.display(description='Lance Inicial', ordering='lance_inicial')
     def lance_inicial_formatado(self, obj):
@@ -54,6 +81,10 @@ class ArremateAdmin(admin.ModelAdmin):
     list_display = ('lote_info', 'nome_cliente', 'cpf_cliente', 'valor_arremate_formatado', 'data_arremate')
     search_fields = ('lote__veiculo__placa', 'lote__numero_lote', 'nome_cliente', 'cpf_cliente')
     list_filter = ('lote__leilao',)
+    # lote_info usa str(lote), que lê o leilão do lote.
+    list_select_related = ('lote__leilao',)
+    # Um <select> com todos os lotes/clientes faria uma consulta por opção; o autocomplete busca sob demanda.
+    autocomplete_fields = ('lote', 'cliente')
 
     @admin.display(description='Lote', ordering='lote__numero_lote')
     def lote_info(self, obj):
@@ -63,10 +94,17 @@ class ArremateAdmin(admin.ModelAdmin):
     def valor_arremate_formatado(self, obj):
         return formatar_moeda(obj.valor_arremate)
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'progresso', 'criado_por', 'criado_em', 'concluido_em')
+    list_filter = ('tipo', 'status')
+    list_select_related = ('criado_por',)
+
 # --- REGISTROS FINAIS ---
 admin.site.register(Comitente, ComitenteAdmin)
+admin.site.register(Cliente, ClienteAdmin)
 admin.site.register(Veiculo, VeiculoAdmin)
 admin.site.register(Leilao, LeilaoAdmin)
 admin.site.register(Visita, VisitaAdmin)
 admin.site.register(Lote, LoteAdmin)
-admin.site.register(Arremate, ArremateAdmin)
\ No newline at end of file
+admin.site.register(Arremate, ArremateAdmin)
+admin.site.register(Job, JobAdmin)
\ No newline at end of file
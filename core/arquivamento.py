@@ -0,0 +1,168 @@
+# Arquivo: core/arquivamento.py
+# Arquivamento de leilões encerrados (comando archive_leiloes). As visitas, lotes, arremates e o
+# histórico de status do leilão vão para CSVs compactados (gzip) em
+# settings.ARQUIVO_LEILOES_DIR/leilao_<id>/ e saem do banco.
+# Continuam no banco o Leilao, os resumos diários (lidos pelos dashboards) e um LeilaoArquivado
+# com os totais. Para um leilão arquivado, dashboard_leilao e a análise de preços leem os arquivos.
+# Só leilões encerrados são arquivados: data já passada e nenhum lote vendido ainda por retirar
+# (STATUS_EM_ANDAMENTO). Lotes DISPONIVEL de um leilão passado não foram vendidos e não mudam mais.
+# O funil e o top de arrematantes do dashboard geral, e a análise de preços de todos os leilões,
+# consideram só os dados no banco: contagens distintas de clientes não podem ser somadas entre leilões.
+import contextvars
+import csv
+import gzip
+import os
+import shutil
+from datetime import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Count, Exists, OuterRef, Sum
+from .cache_dashboard import invalidar_apos_commit
+from .conversao import valor_fipe
+from .funil import linha_funil_comitente, montar_funil
+from .models import Arremate, EventoLeilao, HistoricoStatusLote, Leilao, LeilaoArquivado, Lote, Visita
+
+TAMANHO_BLOCO_ARQUIVO = 2000
+# Lote vendido que ainda não foi retirado nem retornado: o leilão continua em andamento.
+STATUS_EM_ANDAMENTO = ('ARREMATADO', 'PAGAMENTO_CONFIRMADO')
+# Verdadeiro durante a exclusão das linhas de um leilão arquivado: os sinais de exclusão
+# (core/signals.py) não devolvem lotes para DISPONIVEL, não recalculam os resumos diários, que
+# devem continuar como estão, e não invalidam o cache linha a linha.
+_arquivando = contextvars.ContextVar('arquivando', default=False)
+
+class LeilaoEmAndamento(Exception):
+    pass
+
+# Tabela -> colunas do CSV: (campo do values_list, tipo usado na leitura).
+COLUNAS_ARQUIVO = {
+    'visitas': (('id', int), ('cliente_id', int), ('cpf_cliente', str), ('nome_cliente', str), ('data_visita', datetime)),
+    'lotes': (
+        ('id', int), ('numero_lote', int), ('veiculo_id', str), ('veiculo__min_veiculo', str), ('comitente_id', int),
+        ('comitente__nome', str), ('lance_inicial', Decimal), ('proporcao_fipe', str), ('valor_fipe', Decimal), ('status', str),
+    ),
+    'arremates': (
+        ('id', int), ('lote_id', int), ('cliente_id', int), ('cpf_cliente', str), ('nome_cliente', str),
+        ('valor_arremate', Decimal), ('data_arremate', datetime),
+    ),
+    'historico': (('id', int), ('lote_id', int), ('status_anterior', str), ('status', str), ('momento', datetime)),
+}
+
+def _consultas(leilao_id):
+    return {
+        'visitas': Visita.objects.filter(leilao_id=leilao_id),
+        'lotes': Lote.objects.filter(leilao_id=leilao_id),
+        'arremates': Arremate.objects.filter(lote__leilao_id=leilao_id),
+        'historico': HistoricoStatusLote.objects.filter(leilao_id=leilao_id),
+    }
+
+def _caminho(pasta, tabela=None):
+    diretorio = os.path.join(settings.ARQUIVO_LEILOES_DIR, pasta)
+    return diretorio if tabela is None else os.path.join(diretorio, f'{tabela}.csv.gz')
+
+# --- GRAVAÇÃO ---
+
+def _escrever(queryset, colunas, caminho):
+    # Lido em blocos e escrito linha a linha: a memória não depende do tamanho do leilão.
+    campos = [campo for campo, _ in colunas]; total = 0
+    with gzip.open(caminho, 'wt', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(campos)
+        for valores in queryset.order_by('id').values_list(*campos).iterator(chunk_size=TAMANHO_BLOCO_ARQUIVO):
+            escritor.writerow(['' if valor is None else valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores])
+            total += 1
+    # Os arquivos precisam estar no disco antes de as linhas saírem do banco.
+    with open(caminho, 'rb') as arquivo: os.fsync(arquivo.fileno())
+    return total
+
+def arquivando():
+    return _arquivando.get()
+
+def _lotes_em_andamento(leilao_id):
+    return Lote.objects.filter(leilao_id=leilao_id, status__in=STATUS_EM_ANDAMENTO)
+
+def leiloes_para_arquivar(antes):
+    # Nunca inclui o dia de hoje: um leilão de hoje ainda recebe arremates.
+    antes = min(antes, timezone.localdate())
+    return Leilao.objects.filter(data_leilao_principal__lt=antes, arquivamento__isnull=True).filter(
+        ~Exists(_lotes_em_andamento(OuterRef('id')))
+    ).order_by('data_leilao_principal', 'id')
+
+def arquivar_leilao(leilao):
+    # Grava os arquivos e remove as linhas na mesma transação; se algo falhar, o banco fica como
+    # estava e a pasta é apagada. Devolve o LeilaoArquivado criado.
+    pasta = f'leilao_{leilao.id}'
+    os.makedirs(_caminho(pasta), exist_ok=True)
+    try:
+        with transaction.atomic():
+            # Conferido de novo na transação: um lote pode ter mudado depois da seleção.
+            if leilao.data_leilao_principal >= timezone.localdate() or _lotes_em_andamento(leilao.id).exists():
+                raise LeilaoEmAndamento(f"O leilão {leilao.nome_evento} ainda tem lotes em andamento.")
+            consultas = _consultas(leilao.id)
+            totais = {tabela: _escrever(consultas[tabela], colunas, _caminho(pasta, tabela)) for tabela, colunas in COLUNAS_ARQUIVO.items()}
+            arquivamento = LeilaoArquivado.objects.create(
+                leilao=leilao, pasta=pasta, visitas=totais['visitas'], lotes=totais['lotes'], arremates=totais['arremates'],
+                visitantes=consultas['visitas'].aggregate(total=Count('cpf_cliente', distinct=True))['total'],
+                valor_total=consultas['arremates'].aggregate(total=Sum('valor_arremate'))['total'] or 0,
+            )
+            # As linhas dependentes saem antes dos lotes: a exclusão em cascata dos lotes não tem mais
+            # nada a buscar. Os eventos do feed ao vivo não são arquivados.
+            marca = _arquivando.set(True)
+            try:
+                for queryset in (consultas['arremates'], consultas['historico'], EventoLeilao.objects.filter(leilao_id=leilao.id), consultas['visitas'], consultas['lotes']):
+                    queryset.delete()
+            finally:
+                _arquivando.reset(marca)
+            invalidar_apos_commit([leilao.id])
+    except BaseException:
+        shutil.rmtree(_caminho(pasta), ignore_errors=True)
+        raise
+    return arquivamento
+
+# --- LEITURA ---
+
+def _converter(tipo, valor):
+    if tipo is str: return valor
+    if valor == '': return None
+    return datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+
+def ler_arquivo(arquivamento, tabela):
+    # Linhas de uma tabela do leilão arquivado, como dicionários com os tipos originais.
+    tipos = dict(COLUNAS_ARQUIVO[tabela])
+    with gzip.open(_caminho(arquivamento.pasta, tabela), 'rt', encoding='utf-8', newline='') as arquivo:
+        for linha in csv.DictReader(arquivo):
+            yield {campo: _converter(tipos[campo], valor) for campo, valor in linha.items()}
+
+def detalhes_arquivados(arquivamento):
+    # Funil, funil por comitente e listas de visitantes e arremates de dashboard_leilao, com o
+    # mesmo formato das consultas de core/funil.py e das listas de modelos.
+    lotes = {lote['id']: lote for lote in ler_arquivo(arquivamento, 'lotes')}
+    visitas = sorted(ler_arquivo(arquivamento, 'visitas'), key=lambda visita: visita['data_visita'], reverse=True)
+    arremates = sorted(ler_arquivo(arquivamento, 'arremates'), key=lambda arremate: arremate['data_arremate'], reverse=True)
+    visitantes = {visita['cliente_id'] for visita in visitas} - {None}
+    arrematantes = {arremate['cliente_id'] for arremate in arremates} - {None}
+    clientes_por_comitente = {}
+    for arremate in arremates:
+        lote = lotes[arremate['lote_id']]
+        arremate['lote'] = {'numero_lote': lote['numero_lote'], 'veiculo': {'placa': lote['veiculo_id'], 'min_veiculo': lote['veiculo__min_veiculo']}}
+        clientes_por_comitente.setdefault((lote['comitente__nome'], lote['comitente_id']), set()).add(arremate['cliente_id'])
+    return {
+        'funil': montar_funil(len(visitantes), len(arrematantes), len(visitantes & arrematantes)),
+        'funil_por_comitente': [
+            linha_funil_comitente(comitente_id, nome, len(clientes - {None}), len(clientes & visitantes), len(visitantes))
+            for (nome, comitente_id), clientes in sorted(clientes_por_comitente.items())
+        ],
+        'lista_visitantes': visitas, 'lista_arremates': arremates,
+    }
+
+def linhas_analise(arquivamento):
+    # As colunas de core/analises.py (COLUNAS_DATAFRAME), a partir dos arquivos de lotes e arremates.
+    valores = {arremate['lote_id']: arremate['valor_arremate'] for arremate in ler_arquivo(arquivamento, 'arremates')}
+    _float = lambda valor: None if valor is None else float(valor)
+    return [
+        (lote['id'], lote['comitente_id'], lote['comitente__nome'], lote['veiculo__min_veiculo'], float(lote['lance_inicial']),
+         _float(lote['valor_fipe']) if lote['valor_fipe'] is not None else valor_fipe(lote['proporcao_fipe'], lote['lance_inicial']),
+         _float(valores.get(lote['id'])))
+        for lote in ler_arquivo(arquivamento, 'lotes')
+    ]
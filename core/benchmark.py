@@ -0,0 +1,370 @@
+# Arquivo: core/benchmark.py
+# Massa de dados em volume realista (comando seed_benchmark) e medição das views mais pesadas
+# pelo cliente de testes do Django (comando benchmark), com saída em JSON para comparar versões.
+import csv
+import io
+import math
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, time as hora, timedelta
+from decimal import Decimal
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .cache_dashboard import invalidar_apos_commit, invalidar_dashboards, invalidar_opcoes, CHAVE_LEILOES_ATIVOS, CHAVE_OPCOES_COMITENTES, CHAVE_OPCOES_LEILOES
+from .clientes import backfill_clientes
+from .importacao import COLUNAS_PLANILHA
+from .historico import registrar_transicoes, transicao_status
+from .models import Arremate, Cliente, Comitente, EventoLeilao, HistoricoStatusLote, Leilao, LeilaoArquivado, Lote, ResumoDiarioComitente, ResumoDiarioLeilao, Veiculo, Visita
+from .resumos import reconstruir_resumos
+
+# --- MASSA DE DADOS ---
+
+VOLUMES_PADRAO = {
+    'leiloes': 200, 'lotes': 500_000, 'visitas': 2_000_000, 'arremates': 300_000,
+    'clientes': 250_000, 'comitentes': 40,
+}
+TAMANHO_LOTE_BULK = 5000
+
+# Marcas que identificam a massa gerada, para a limpeza não tocar em dados reais.
+PREFIXO_LEILAO = 'Benchmark '
+PREFIXO_COMITENTE = 'Comitente Benchmark '
+PREFIXO_PLACA = 'BM'
+PREFIXO_DOCUMENTO = '999'
+
+# Expoente da distribuição dos clientes: quanto maior, mais visitas e arremates se concentram
+# em poucos CPFs (com 3, os 20% de clientes mais frequentes ficam com ~58% das visitas).
+ENVIESAMENTO_CLIENTES = 3
+DIAS_DE_VISITA = 7  # as visitas acontecem na semana que antecede o leilão
+DISTRIBUICAO_STATUS_VENDIDOS = [('ARREMATADO', 30), ('PAGAMENTO_CONFIRMADO', 30), ('RETIRADO', 35), ('RETORNADO', 5)]
+# Caminho de status de cada status final no histórico, a partir do arremate.
+CAMINHOS_STATUS = {
+    'ARREMATADO': ('ARREMATADO',), 'PAGAMENTO_CONFIRMADO': ('ARREMATADO', 'PAGAMENTO_CONFIRMADO'),
+    'RETIRADO': ('ARREMATADO', 'PAGAMENTO_CONFIRMADO', 'RETIRADO'), 'RETORNADO': ('ARREMATADO', 'RETORNADO'),
+}
+DIAS_ANTES_DO_LEILAO = 15  # os lotes são cadastrados (status DISPONIVEL) duas semanas antes
+# Descrições repetidas, como numa planilha real: a análise de preços agrupa por descrição do veículo.
+MODELOS_VEICULO = ('Gol 1.0', 'Onix 1.4', 'HB20 1.6', 'Strada 1.4', 'Corolla 2.0', 'Hilux 2.8', 'CG 160', 'Uno 1.0', 'Civic 2.0', 'S10 2.8')
+
+def volumes_em_escala(escala=1.0, **volumes):
+    # Aplica o fator de escala aos volumes padrão; volumes informados explicitamente não são escalados.
+    calculados = {nome: max(1, int(valor * escala)) for nome, valor in VOLUMES_PADRAO.items()}
+    calculados.update({nome: valor for nome, valor in volumes.items() if valor is not None})
+    calculados['arremates'] = min(calculados['arremates'], calculados['lotes'])
+    return calculados
+
+def _documento(indice):
+    numero = f'{PREFIXO_DOCUMENTO}{indice:08d}'
+    # Metade dos documentos chega formatada, como acontece nas telas de recepção.
+    return numero if indice % 2 else f'{numero[:3]}.{numero[3:6]}.{numero[6:9]}-{numero[9:]}'
+
+def _indice_enviesado(rng, total):
+    return int(total * rng.random() ** ENVIESAMENTO_CLIENTES)
+
+def _momento(rng, dia):
+    return timezone.make_aware(datetime.combine(dia, hora(8)) + timedelta(seconds=rng.randrange(10 * 3600)))
+
+def _dividir(total, partes):
+    base, resto = divmod(total, partes)
+    return [base + (1 if indice < resto else 0) for indice in range(partes)]
+
+@contextmanager
+def _sem_auto_now_add(modelo, nome_campo):
+    # O bulk_create preencheria data_visita com "agora"; a massa precisa de datas espalhadas.
+    campo = modelo._meta.get_field(nome_campo)
+    campo.auto_now_add = False
+    try: yield
+    finally: campo.auto_now_add = True
+
+def _historico(rng, lote_id, leilao_id, status_final, cadastro, venda):
+    # Cadastro do lote e, se vendido, cada passo até o status final, com alguns dias entre eles.
+    transicoes = [transicao_status(lote_id, leilao_id, None, 'DISPONIVEL', cadastro)]
+    anterior = 'DISPONIVEL'; momento = venda; agora = timezone.now()
+    for passo, status in enumerate(CAMINHOS_STATUS.get(status_final, ())):
+        if passo: momento = min(agora, momento + timedelta(hours=rng.randrange(2, 24 * 10)))
+        transicoes.append(transicao_status(lote_id, leilao_id, anterior, status, momento)); anterior = status
+    return transicoes
+
+def _popular_leilao(rng, leilao, placas, quantidade_visitas, chance_arremate, comitentes, total_clientes):
+    Veiculo.objects.bulk_create([
+        Veiculo(placa=placa, min_veiculo=f'Veículo {MODELOS_VEICULO[indice % len(MODELOS_VEICULO)]}') for indice, placa in enumerate(placas)
+    ], batch_size=TAMANHO_LOTE_BULK)
+    status_vendidos, pesos = zip(*DISTRIBUICAO_STATUS_VENDIDOS)
+    lotes = []
+    for numero, placa in enumerate(placas, start=1):
+        lance = Decimal(rng.randrange(5_000, 150_000)); proporcao = rng.randrange(40, 95)
+        lotes.append(Lote(
+            leilao=leilao, veiculo_id=placa, comitente_id=comitentes[_indice_enviesado(rng, len(comitentes))], numero_lote=numero,
+            lance_inicial=lance, proporcao_fipe=f'{proporcao}%', valor_fipe=(lance * 100 / proporcao).quantize(Decimal('0.01')),
+            status=rng.choices(status_vendidos, pesos)[0] if rng.random() < chance_arremate else 'DISPONIVEL',
+        ))
+    Lote.objects.bulk_create(lotes, batch_size=TAMANHO_LOTE_BULK)
+    # Nem todo banco devolve as chaves no bulk_create; uma consulta por leilão resolve.
+    ids = dict(Lote.objects.filter(leilao=leilao).values_list('numero_lote', 'id'))
+    arremates = []; historico = []
+    cadastro = _momento(rng, leilao.data_leilao_principal - timedelta(days=DIAS_ANTES_DO_LEILAO))
+    for lote in lotes:
+        venda = None
+        if lote.status != 'DISPONIVEL':
+            cliente = _indice_enviesado(rng, total_clientes); venda = _momento(rng, leilao.data_leilao_principal)
+            arremates.append(Arremate(
+                lote_id=ids[lote.numero_lote], cpf_cliente=_documento(cliente), nome_cliente=f'Cliente {cliente}',
+                valor_arremate=(lote.lance_inicial * Decimal(str(round(rng.uniform(0.8, 1.6), 2)))).quantize(Decimal('0.01')),
+                data_arremate=venda,
+            ))
+        historico.extend(_historico(rng, ids[lote.numero_lote], leilao.id, lote.status, cadastro, venda))
+    Arremate.objects.bulk_create(arremates, batch_size=TAMANHO_LOTE_BULK)
+    registrar_transicoes(historico)
+    with _sem_auto_now_add(Visita, 'data_visita'):
+        for inicio in range(0, quantidade_visitas, TAMANHO_LOTE_BULK):
+            visitas = []
+            for _ in range(min(TAMANHO_LOTE_BULK, quantidade_visitas - inicio)):
+                cliente = _indice_enviesado(rng, total_clientes)
+                visitas.append(Visita(
+                    leilao=leilao, cpf_cliente=_documento(cliente), nome_cliente=f'Cliente {cliente}' if rng.random() < 0.9 else None,
+                    data_visita=_momento(rng, leilao.data_leilao_principal - timedelta(days=rng.randrange(DIAS_DE_VISITA))),
+                ))
+            Visita.objects.bulk_create(visitas)
+    return len(arremates)
+
+def popular_banco(volumes, semente=42, progresso=None):
+    # Gera a massa de benchmark com bulk_create, um leilão por transação. O leilão mais recente é
+    # o de hoje, para os períodos "hoje", "semana" e "mês" dos dashboards também terem dados.
+    # progresso(leiloes_gerados, total_de_leiloes) é chamado a cada leilão.
+    rng = random.Random(semente)
+    if Leilao.objects.filter(nome_evento__startswith=PREFIXO_LEILAO).exists():
+        raise ValueError('Já existe massa de benchmark neste banco; use --limpar para gerá-la de novo.')
+    Comitente.objects.bulk_create([Comitente(nome=f'{PREFIXO_COMITENTE}{numero:03d}') for numero in range(volumes['comitentes'])], ignore_conflicts=True)
+    comitentes = list(Comitente.objects.filter(nome__startswith=PREFIXO_COMITENTE).order_by('nome').values_list('id', flat=True))
+    hoje = timezone.localdate(); intervalo = max(1, 730 // volumes['leiloes'])
+    chance_arremate = volumes['arremates'] / volumes['lotes']
+    lotes_por_leilao = _dividir(volumes['lotes'], volumes['leiloes'])
+    visitas_por_leilao = _dividir(volumes['visitas'], volumes['leiloes'])
+    totais = {'leiloes': volumes['leiloes'], 'lotes': volumes['lotes'], 'visitas': volumes['visitas'], 'arremates': 0}
+    proxima_placa = 0
+    for indice in range(volumes['leiloes']):
+        placas = [f'{PREFIXO_PLACA}{numero:08d}' for numero in range(proxima_placa, proxima_placa + lotes_por_leilao[indice])]
+        proxima_placa += len(placas)
+        dia = hoje - timedelta(days=(volumes['leiloes'] - 1 - indice) * intervalo)
+        with transaction.atomic():
+            leilao = Leilao.objects.create(nome_evento=f'{PREFIXO_LEILAO}{indice + 1:03d}', data_leilao_principal=dia)
+            totais['arremates'] += _popular_leilao(rng, leilao, placas, visitas_por_leilao[indice], chance_arremate, comitentes, volumes['clientes'])
+        if progresso: progresso(indice + 1, volumes['leiloes'])
+    # bulk_create não dispara sinais: clientes, resumos e caches são atualizados de uma vez no fim.
+    totais['clientes'] = backfill_clientes()[0]
+    reconstruir_resumos()
+    invalidar_dashboards(); invalidar_opcoes(CHAVE_OPCOES_COMITENTES, CHAVE_OPCOES_LEILOES, CHAVE_LEILOES_ATIVOS)
+    return totais
+
+def limpar_benchmark():
+    # Remove só a massa gerada, com DELETEs diretos (sem carregar as linhas nem disparar sinais).
+    # Devolve a quantidade de leilões removidos.
+    leiloes = Leilao.objects.filter(nome_evento__startswith=PREFIXO_LEILAO)
+    with transaction.atomic():
+        for queryset in (
+            Arremate.objects.filter(lote__leilao__in=leiloes), Visita.objects.filter(leilao__in=leiloes),
+            EventoLeilao.objects.filter(leilao__in=leiloes), HistoricoStatusLote.objects.filter(leilao__in=leiloes),
+            ResumoDiarioLeilao.objects.filter(leilao__in=leiloes),
+            ResumoDiarioComitente.objects.filter(leilao__in=leiloes), LeilaoArquivado.objects.filter(leilao__in=leiloes),
+            Lote.objects.filter(leilao__in=leiloes),
+        ):
+            queryset._raw_delete(queryset.db)
+        removidos = leiloes._raw_delete(leiloes.db)
+        for queryset in (
+            Veiculo.objects.filter(placa__startswith=PREFIXO_PLACA, aparicoes_em_lote__isnull=True),
+            Comitente.objects.filter(nome__startswith=PREFIXO_COMITENTE, lotes__isnull=True),
+            Cliente.objects.filter(documento__startswith=PREFIXO_DOCUMENTO, visitas__isnull=True, arremates__isnull=True),
+        ):
+            queryset._raw_delete(queryset.db)
+        invalidar_apos_commit(); invalidar_opcoes(CHAVE_OPCOES_COMITENTES, CHAVE_OPCOES_LEILOES, CHAVE_LEILOES_ATIVOS)
+    return removidos
+
+# --- MEDIÇÃO DAS VIEWS ---
+
+USUARIO_BENCHMARK = 'benchmark'
+LINHAS_UPLOAD = 1000
+# Cache local e exclusivo: no modo "frio" só ele é limpo antes de cada requisição, nunca o cache real.
+CACHE_BENCHMARK = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+
+def leilao_de_referencia():
+    # O leilão com mais lotes: o pior caso de dashboard_leilao e das listagens filtradas.
+    return Leilao.objects.annotate(total_lotes=Count('lotes')).order_by('-total_lotes', '-id').first()
+
+def _planilha_upload(leilao, linhas):
+    # Reenvia os primeiros lotes do leilão com os mesmos dados, então medir não altera a massa.
+    saida = io.StringIO()
+    escritor = csv.writer(saida, delimiter=';')
+    escritor.writerow(COLUNAS_PLANILHA)
+    campos = ('veiculo_id', 'numero_lote', 'veiculo__min_veiculo', 'comitente__nome', 'lance_inicial', 'proporcao_fipe')
+    for placa, numero, descricao, comitente, lance, fipe in Lote.objects.filter(leilao=leilao).order_by('numero_lote').values_list(*campos)[:linhas]:
+        escritor.writerow([placa, numero, descricao, comitente, str(lance).replace('.', ','), fipe])
+    return saida.getvalue().encode('utf-8')
+
+def cenarios(leilao, linhas_upload=LINHAS_UPLOAD):
+    # {nome: (método, url, função que monta os dados da requisição ou None)}
+    from .views.dashboards import PERIODOS_DASHBOARD
+    planilha = _planilha_upload(leilao, linhas_upload)
+    lista = reverse('lista_completa_veiculos'); exportar = reverse('exportar_veiculos')
+    resultado = {f'dashboard[{periodo}]': ('get', f"{reverse('dashboard')}?periodo={periodo}", None) for periodo in PERIODOS_DASHBOARD}
+    resultado.update({
+        'dashboard_api[semana]': ('get', f"{reverse('dashboard_api')}?periodo=semana", None),
+        'dashboard_leilao': ('get', reverse('dashboard_leilao', args=[leilao.id]), None),
+        'analise_precos[leilao]': ('get', reverse('analise_precos_leilao_api', args=[leilao.id]), None),
+        'analise_precos[todos]': ('get', reverse('analise_precos_api'), None),
+        'lista_completa_veiculos': ('get', lista, None),
+        'lista_completa_veiculos[status]': ('get', f'{lista}?status=ARREMATADO', None),
+        'lista_completa_veiculos[busca]': ('get', f'{lista}?q=Veiculo', None),
+        'upload_excel[formulario]': ('get', reverse('upload_excel'), None),
+        'upload_excel[importacao]': ('post', reverse('upload_excel'), lambda: {'leilao': leilao.id, 'excel_file': SimpleUploadedFile('benchmark.csv', planilha, 'text/csv')}),
+        'exportar_veiculos_xls[xlsx]': ('get', f'{exportar}?leilao={leilao.id}', None),
+        'exportar_veiculos_xls[csv]': ('get', f'{exportar}?leilao={leilao.id}&formato=csv', None),
+        'gerenciar_lotes': ('get', reverse('gerenciar_lotes'), None),
+    })
+    return resultado
+
+def _requisitar(cliente, metodo, url, dados):
+    resposta = getattr(cliente, metodo)(url, dados() if dados else None)
+    # Respostas em streaming (exportações) só são geradas quando consumidas; o cliente de testes
+    # as fecha ao fim da iteração, como um servidor WSGI.
+    if resposta.streaming:
+        for _ in resposta.streaming_content: pass
+    return resposta.status_code
+
+def _percentil(valores, percentual):
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(percentual / 100 * len(ordenados)) - 1)]
+
+def medir_cenario(cliente, metodo, url, dados, repeticoes, frio=True):
+    _requisitar(cliente, metodo, url, dados)  # aquecimento: templates compilados, imports, conexão
+    tempos = []
+    for _ in range(repeticoes):
+        if frio: cache.clear()
+        inicio = time.perf_counter()
+        status = _requisitar(cliente, metodo, url, dados)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    # Consultas e memória em uma execução à parte: o rastreamento distorce o tempo.
+    if frio: cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as consultas:
+            _requisitar(cliente, metodo, url, dados)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': status, 'p50_ms': round(_percentil(tempos, 50), 2), 'p95_ms': round(_percentil(tempos, 95), 2),
+        'media_ms': round(sum(tempos) / len(tempos), 2), 'max_ms': round(max(tempos), 2),
+        'consultas': len(consultas), 'pico_memoria_kb': round(pico / 1024),
+    }
+
+def descrever_banco():
+    # Perfil do banco em que a medição rodou; relatórios só são comparáveis no mesmo perfil.
+    descricao = {
+        'vendor': connection.vendor, 'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+    }
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size'):
+                cursor.execute(f'PRAGMA {pragma}'); descricao[pragma] = cursor.fetchone()[0]
+    else:
+        descricao['cursores_no_servidor'] = not connection.settings_dict['DISABLE_SERVER_SIDE_CURSORS']
+    return descricao
+
+def volumes_atuais():
+    return {
+        'leiloes': Leilao.objects.count(), 'lotes': Lote.objects.count(), 'visitas': Visita.objects.count(),
+        'arremates': Arremate.objects.count(), 'clientes': Cliente.objects.count(),
+    }
+
+def medir_views(repeticoes=10, leilao=None, frio=True, linhas_upload=LINHAS_UPLOAD, apenas=None, progresso=None):
+    # Mede cada cenário e devolve o relatório em um dicionário serializável em JSON.
+    # apenas: nomes (ou prefixos, como "dashboard") dos cenários a medir.
+    # progresso(nome_do_cenario, resultado) é chamado ao fim de cada cenário.
+    leilao = leilao or leilao_de_referencia()
+    if leilao is None: raise ValueError('Nenhum leilão cadastrado; rode "manage.py seed_benchmark" antes.')
+    usuario = User.objects.filter(username=USUARIO_BENCHMARK).first() or User.objects.create_superuser(USUARIO_BENCHMARK, None, None)
+    resultados = {}
+    with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False, CACHES=CACHE_BENCHMARK):
+        cliente = Client()
+        cliente.force_login(usuario)
+        for nome, (metodo, url, dados) in cenarios(leilao, linhas_upload).items():
+            if apenas and not any(nome == filtro or nome.startswith(f'{filtro}[') for filtro in apenas): continue
+            resultados[nome] = medir_cenario(cliente, metodo, url, dados, repeticoes, frio)
+            if progresso: progresso(nome, resultados[nome])
+    return {
+        'gerado_em': timezone.now().isoformat(timespec='seconds'), 'django': django.get_version(), 'banco': descrever_banco(),
+        'repeticoes': repeticoes, 'cache': 'frio' if frio else 'quente', 'leilao_id': leilao.id,
+        'volumes': volumes_atuais(), 'cenarios': resultados,
+    }
+
+def comparar_relatorios(base, atual):
+    # Diferença por cenário entre dois relatórios: [(nome, {métrica: (antes, depois, variação_%)})].
+    comparacao = []
+    for nome, medidas in atual['cenarios'].items():
+        anteriores = base.get('cenarios', {}).get(nome)
+        if not anteriores: continue
+        comparacao.append((nome, {
+            metrica: (anteriores[metrica], medidas[metrica], round((medidas[metrica] - anteriores[metrica]) * 100 / anteriores[metrica], 1) if anteriores[metrica] else None)
+            for metrica in ('p50_ms', 'p95_ms', 'consultas', 'pico_memoria_kb')
+        }))
+    for nome, medidas in atual.get('inicializacao', {}).items():
+        anterior = base.get('inicializacao', {}).get(nome, {}).get('total_ms')
+        if anterior is None: continue
+        comparacao.append((f'inicializacao[{nome}]', {'total_ms': (anterior, medidas['total_ms'], round((medidas['total_ms'] - anterior) * 100 / anterior, 1) if anterior else None)}))
+    return comparacao
+
+# --- TEMPO DE INICIALIZAÇÃO ---
+# Cada processo novo (worker do gunicorn, comando do manage.py) paga a importação dos módulos
+# carregados na inicialização. Medido com "python -X importtime" em um processo separado.
+
+COMANDOS_INICIALIZACAO = {
+    'manage_check': ['manage.py', 'check'],
+    'wsgi': ['-c', 'import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'],
+}
+# Bibliotecas que só devem ser carregadas no primeiro uso (importação/exportação e API externa).
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl', 'requests', 'import_export', 'tablib')
+ORCAMENTO_INICIALIZACAO_MS = 800
+_LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+def _importtime(argumentos):
+    # Devolve {módulo: tempo acumulado em µs} dos imports de nível mais alto e o conjunto de todos os módulos.
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', *argumentos], cwd=settings.BASE_DIR,
+        capture_output=True, text=True, check=True,
+    )
+    topo = {}; modulos = set()
+    for linha in processo.stderr.splitlines():
+        encontrada = _LINHA_IMPORTTIME.match(linha)
+        if not encontrada: continue
+        _, acumulado, recuo, modulo = encontrada.groups()
+        modulos.add(modulo)
+        if len(recuo) == 1: topo[modulo] = int(acumulado)
+    return topo, modulos
+
+def medir_inicializacao(execucoes=3, mais_lentos=10):
+    # Por comando: o menor tempo total de importação entre as execuções (o menos afetado por ruído),
+    # os imports de nível mais alto mais lentos e quais módulos pesados foram carregados.
+    resultado = {}
+    for nome, argumentos in COMANDOS_INICIALIZACAO.items():
+        medidas = [_importtime(argumentos) for _ in range(execucoes)]
+        topo, modulos = min(medidas, key=lambda medida: sum(medida[0].values()))
+        resultado[nome] = {
+            'total_ms': round(sum(topo.values()) / 1000, 1),
+            'mais_lentos': {modulo: round(tempo / 1000, 1) for modulo, tempo in sorted(topo.items(), key=lambda item: -item[1])[:mais_lentos]},
+            'modulos_pesados': sorted(modulo for modulo in MODULOS_PESADOS if modulo in modulos),
+        }
+    return resultado
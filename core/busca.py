@@ -0,0 +1,80 @@
+# Arquivo: core/busca.py
+# Busca textual por placa/descrição do veículo. No SQLite com FTS5, usa um índice de texto completo
+# (tabela virtual core_veiculo_busca, com a placa) mantido por triggers sobre core_veiculo, então
+# continua em dia mesmo com bulk_create/bulk_update. Sem FTS5 (ou em outro banco), cai para LIKE.
+import re
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import OperationalError
+
+TABELA_FTS = 'core_veiculo_busca'
+TRIGGERS_FTS = [f'{TABELA_FTS}_ai', f'{TABELA_FTS}_ad', f'{TABELA_FTS}_au']
+
+# A tabela guarda a própria cópia de placa e min_veiculo e a busca devolve a placa direto. Não
+# usa content='core_veiculo': a chave primária é a placa (texto), e o rowid implícito da tabela
+# pode ser renumerado por um VACUUM, o que deixaria o índice apontando para outros veículos.
+# A remoção localiza a linha pela placa com MATCH (usa o índice) e confere o valor exato.
+_REMOVER_ANTIGO = f"""DELETE FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH 'placa:"' || replace(old.placa, '"', '""') || '"' AND placa = old.placa;"""
+_SQL_CRIACAO = [
+    f"""CREATE VIRTUAL TABLE {TABELA_FTS} USING fts5(placa, min_veiculo, tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON core_veiculo BEGIN
+        INSERT INTO {TABELA_FTS}(placa, min_veiculo) VALUES (new.placa, new.min_veiculo); END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON core_veiculo BEGIN {_REMOVER_ANTIGO} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE ON core_veiculo BEGIN {_REMOVER_ANTIGO}
+        INSERT INTO {TABELA_FTS}(placa, min_veiculo) VALUES (new.placa, new.min_veiculo); END""",
+    # Indexa os veículos que já existiam antes da criação da tabela.
+    f"INSERT INTO {TABELA_FTS}(placa, min_veiculo) SELECT placa, min_veiculo FROM core_veiculo",
+]
+
+# Alias do banco -> FTS disponível (só guarda resultados positivos; a tabela pode surgir depois).
+_fts_disponivel = {}
+
+def _definicao_tabela(cursor):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE name = %s", [TABELA_FTS])
+    linha = cursor.fetchone()
+    return linha and linha[0]
+
+def _tabela_existe(cursor):
+    return _definicao_tabela(cursor) is not None
+
+def criar_indice_busca(using='default'):
+    # Chamado no post_migrate (core/signals.py). Não faz nada fora do SQLite ou sem o módulo FTS5.
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite': return False
+    with conexao.cursor() as cursor:
+        definicao = _definicao_tabela(cursor)
+        if definicao is not None and 'content=' not in definicao: return True
+        try:
+            with transaction.atomic(using=using):
+                # Índice da versão anterior (sobre o rowid de core_veiculo): refeito do zero.
+                if definicao is not None:
+                    for trigger in TRIGGERS_FTS: cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                    cursor.execute(f"DROP TABLE {TABELA_FTS}")
+                for sql in _SQL_CRIACAO: cursor.execute(sql)
+        except OperationalError:
+            return False  # SQLite compilado sem FTS5
+    _fts_disponivel[using] = True
+    return True
+
+def fts_disponivel(using='default'):
+    if using not in _fts_disponivel:
+        conexao = connections[using]
+        if conexao.vendor != 'sqlite': return False
+        with conexao.cursor() as cursor:
+            if not _tabela_existe(cursor): return False
+        _fts_disponivel[using] = True
+    return True
+
+def _expressao_fts(termo):
+    # Cada palavra vira um prefixo entre aspas ("abc"*), o que também neutraliza a sintaxe do FTS5.
+    return ' '.join(f'"{palavra}"*' for palavra in re.findall(r'\w+', termo))
+
+def filtrar_por_texto(lotes, termo):
+    # Filtra uma queryset de Lote pela placa ou descrição do veículo.
+    termo = (termo or '').strip()
+    expressao = _expressao_fts(termo)
+    if not expressao: return lotes
+    if fts_disponivel(lotes.db):
+        return lotes.filter(veiculo_id__in=RawSQL(f"SELECT placa FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [expressao]))
+    return lotes.filter(Q(veiculo_id__istartswith=termo) | Q(veiculo__min_veiculo__icontains=termo))
@@ -0,0 +1,99 @@
+# Arquivo: core/cache_dashboard.py
+# Cache dos contextos dos dashboards, por (view, período, leilão), sobre o django.core.cache.
+# As chaves carregam números de versão que os sinais incrementam quando um Arremate, Visita ou
+# Lote muda, então a invalidação é exata: só os dashboards afetados deixam de ser encontrados.
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Comitente, Leilao
+
+# Tempo de vida (segundos) de cada dashboard em cache, mesmo sem alterações.
+TTL_DASHBOARD = {'dashboard': 60, 'dashboard_recepcao': 120, 'dashboard_leilao': 60, 'analise_precos': 300}
+# Proteção contra "estouro" de cache: só quem obtém a trava recalcula; os demais esperam.
+TEMPO_TRAVA = 30
+ESPERA_MAXIMA = 10.0
+INTERVALO_ESPERA = 0.05
+
+VERSAO_GLOBAL = 'dashboard:versao:global'   # muda a cada alteração em qualquer leilão
+VERSAO_TODOS = 'dashboard:versao:todos'     # muda quando tudo precisa ser descartado
+PREFIXO_VERSAO_LEILAO = 'dashboard:versao:leilao:'
+ALTERADO_EM = 'dashboard:alterado_em'       # momento da última invalidação (Last-Modified da API)
+
+def _versao(chave):
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, 1, None); versao = cache.get(chave, 1)
+    return versao
+
+def _incrementar(chave):
+    try: cache.incr(chave)
+    except ValueError: cache.set(chave, 2, None)
+
+def invalidar_dashboards(leilao_ids=None):
+    # leilao_ids=None descarta os dashboards de todos os leilões.
+    _incrementar(VERSAO_GLOBAL); cache.set(ALTERADO_EM, timezone.now(), None)
+    if leilao_ids is None:
+        _incrementar(VERSAO_TODOS); return
+    for leilao_id in set(leilao_ids):
+        if leilao_id: _incrementar(f'{PREFIXO_VERSAO_LEILAO}{leilao_id}')
+
+def ultima_alteracao():
+    # Sem registro (cache recém-criado ou reiniciado), vale o momento da primeira consulta.
+    cache.add(ALTERADO_EM, timezone.now(), None)
+    return cache.get(ALTERADO_EM) or timezone.now()
+
+def invalidar_apos_commit(leilao_ids=None):
+    # Invalidar antes do commit deixaria outra requisição gravar no cache os dados antigos.
+    transaction.on_commit(lambda: invalidar_dashboards(leilao_ids))
+
+def _chave(view, periodo, leilao_id):
+    # A data entra na chave porque "hoje", "semana" e "mês" mudam na virada do dia.
+    versoes = f"{_versao(VERSAO_TODOS)}.{_versao(f'{PREFIXO_VERSAO_LEILAO}{leilao_id}')}" if leilao_id else str(_versao(VERSAO_GLOBAL))
+    return f"dashboard:{view}:{periodo}:{leilao_id or '-'}:{timezone.localdate():%Y%m%d}:v{versoes}"
+
+def obter_ou_calcular(view, periodo, leilao_id, calcular):
+    chave = _chave(view, periodo, leilao_id)
+    contexto = cache.get(chave)
+    if contexto is not None: return contexto
+    trava = f'{chave}:trava'
+    if cache.add(trava, 1, TEMPO_TRAVA):
+        try:
+            contexto = calcular()
+            cache.set(chave, contexto, TTL_DASHBOARD.get(view, 60))
+        finally:
+            cache.delete(trava)
+        return contexto
+    # Outra requisição já está recalculando este dashboard: espera o resultado dela.
+    prazo = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < prazo:
+        time.sleep(INTERVALO_ESPERA)
+        contexto = cache.get(chave)
+        if contexto is not None: return contexto
+        if not cache.get(trava): break
+    return calcular()
+
+# --- LISTAS DE SELEÇÃO DOS FILTROS ---
+# Comitentes e leilões mudam pouco; ficam no cache até um sinal (ou a importação) descartá-los.
+CHAVE_OPCOES_COMITENTES = 'opcoes:comitentes'
+CHAVE_OPCOES_LEILOES = 'opcoes:leiloes'
+CHAVE_LEILOES_ATIVOS = 'opcoes:leiloes_ativos'
+
+def opcoes_comitentes():
+    return cache.get_or_set(CHAVE_OPCOES_COMITENTES, lambda: list(Comitente.objects.order_by('nome').values_list('id', 'nome')), None)
+
+def opcoes_leiloes():
+    return cache.get_or_set(CHAVE_OPCOES_LEILOES, lambda: list(Leilao.objects.order_by('-data_leilao_principal').values_list('id', 'nome_evento')), None)
+
+def leiloes_ativos():
+    # {id: nome} dos leilões que aceitam check-in de visitas (os de hoje em diante), na ordem das
+    # datas. O dia vai junto no valor, então a lista é refeita na virada do dia mesmo sem alterações.
+    hoje = timezone.localdate()
+    valor = cache.get(CHAVE_LEILOES_ATIVOS)
+    if valor is None or valor[0] != hoje:
+        valor = (hoje, dict(Leilao.objects.filter(data_leilao_principal__gte=hoje).order_by('data_leilao_principal', 'id').values_list('id', 'nome_evento')))
+        cache.set(CHAVE_LEILOES_ATIVOS, valor, None)
+    return valor[1]
+
+def invalidar_opcoes(*chaves):
+    transaction.on_commit(lambda: cache.delete_many(chaves))
@@ -0,0 +1,216 @@
+# Arquivo: core/clientes.py
+# Diretório de clientes sobre a API externa: sessão HTTP com keep-alive e pool de conexões,
+# consulta dos formatos do documento em paralelo (vale o primeiro que encontrar o cliente)
+# e cache com TTL dos nomes encontrados, incluindo os documentos não encontrados.
+# Antes da API, o nome é procurado no cadastro local (modelo Cliente), com uma consulta indexada.
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Replace, Trim
+from .models import Arremate, Cliente, Visita
+
+TTL_CLIENTE = 24 * 3600
+TTL_CLIENTE_NAO_ENCONTRADO = 10 * 60
+TTL_TOKEN = 1800
+TIMEOUT_AUTENTICACAO = 15
+TIMEOUT_CONSULTA = 10
+MAXIMO_CONEXOES = 10
+
+CHAVE_TOKEN = 'api_auth_token'
+PREFIXO_CACHE = 'cliente:'
+NAO_ENCONTRADO = ''  # valor guardado no cache para documentos sem cadastro
+
+class ErroAutenticacao(Exception):
+    pass
+
+def normalizar_documento(doc):
+    return doc.replace('.', '').replace('-', '').replace('/', '').strip()
+
+def formatos_documento(doc):
+    doc_limpo = normalizar_documento(doc)
+    formatos_para_tentar = [doc_limpo]
+    if len(doc_limpo) == 11:
+        formatos_para_tentar.append(f"{doc_limpo[:3]}.{doc_limpo[3:6]}.{doc_limpo[6:9]}-{doc_limpo[9:]}")
+    elif len(doc_limpo) == 14:
+        formatos_para_tentar.append(f"{doc_limpo[:2]}.{doc_limpo[2:5]}.{doc_limpo[5:8]}/{doc_limpo[8:12]}-{doc_limpo[12:]}")
+    if doc not in formatos_para_tentar:
+        formatos_para_tentar.append(doc)
+    return formatos_para_tentar
+
+# --- CADASTRO LOCAL (modelo Cliente) ---
+
+def normalizar_nome(nome):
+    sem_acentos = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acentos.lower().split())
+
+def novo_cliente(documento, nome=''):
+    # Para bulk_create, que não dispara o sinal que preenche nome_busca.
+    return Cliente(documento=normalizar_documento(documento), nome=nome or '', nome_busca=normalizar_nome(nome)[:255])
+
+def _prefixo(campo, prefixo):
+    # Busca por prefixo como intervalo (campo >= 'abc' AND campo < 'abc\uffff'): usa o índice
+    # B-tree em qualquer banco, ao contrário de LIKE/ILIKE.
+    return {f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + '\uffff'}
+
+def buscar_clientes_locais(termo, limite=20):
+    termo = (termo or '').strip()
+    if not termo: return Cliente.objects.none()
+    documento = normalizar_documento(termo)
+    if documento.isdigit():
+        return Cliente.objects.filter(**_prefixo('documento', documento)).order_by('documento')[:limite]
+    return Cliente.objects.filter(**_prefixo('nome_busca', normalizar_nome(termo))).order_by('nome_busca')[:limite]
+
+def nome_cliente_local(doc):
+    return Cliente.objects.filter(documento=normalizar_documento(doc)).exclude(nome='').values_list('nome', flat=True).first()
+
+def descartar_cache_clientes(documentos):
+    # Um cliente cadastrado (ou renomeado) invalida o nome em cache, inclusive o "não encontrado".
+    # Depois do commit: antes dele, uma consulta concorrente ainda gravaria o valor antigo.
+    chaves = [PREFIXO_CACHE + normalizar_documento(doc) for doc in documentos]
+    if chaves: transaction.on_commit(lambda: cache.delete_many(chaves))
+
+def registrar_cliente(doc, nome=''):
+    # Cria ou atualiza o cliente; um nome vazio não apaga o nome já cadastrado.
+    cliente, criado = Cliente.objects.get_or_create(documento=normalizar_documento(doc), defaults={'nome': nome or ''})
+    if not criado and nome and cliente.nome != nome:
+        cliente.nome = nome; cliente.save()
+    return cliente
+
+def resolver_clientes(documentos_e_nomes):
+    # Versão em massa de registrar_cliente: recebe {documento: nome} e devolve {documento: cliente_id}
+    # com um lookup IN e um bulk_create.
+    nomes = {normalizar_documento(doc): nome for doc, nome in documentos_e_nomes.items() if doc}
+    ids = dict(Cliente.objects.filter(documento__in=list(nomes)).values_list('documento', 'id'))
+    novos = [novo_cliente(doc, nome) for doc, nome in nomes.items() if doc not in ids]
+    if novos:
+        Cliente.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+        descartar_cache_clientes([cliente.documento for cliente in novos])
+        ids.update(Cliente.objects.filter(documento__in=[cliente.documento for cliente in novos]).values_list('documento', 'id'))
+    return ids
+
+def _documento_sql(campo):
+    # Mesma normalização de normalizar_documento, feita no banco.
+    expressao = Trim(F(campo) if isinstance(campo, str) else campo)
+    for caractere in ('.', '-', '/'): expressao = Replace(expressao, Value(caractere), Value(''))
+    return expressao
+
+def backfill_clientes():
+    # Cria os clientes a partir das visitas e arremates existentes e preenche o campo cliente
+    # dessas linhas. Devolve (clientes_criados, visitas_ligadas, arremates_ligados).
+    nomes = {}
+    for modelo in (Visita, Arremate):
+        for documento, nome in modelo.objects.annotate(doc=_documento_sql('cpf_cliente')).values('doc').annotate(nome=Max('nome_cliente')).values_list('doc', 'nome'):
+            if documento and (nome or not nomes.get(documento)): nomes[documento] = nome or ''
+    with transaction.atomic():
+        existentes = set(Cliente.objects.values_list('documento', flat=True))
+        novos = [novo_cliente(doc, nome) for doc, nome in nomes.items() if doc not in existentes]
+        Cliente.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+        descartar_cache_clientes([cliente.documento for cliente in novos])
+        ligados = []
+        for modelo in (Visita, Arremate):
+            cliente_id = Cliente.objects.filter(documento=_documento_sql(OuterRef('cpf_cliente'))).values('id')[:1]
+            ligados.append(modelo.objects.filter(cliente__isnull=True).update(cliente_id=Subquery(cliente_id)))
+    return len(novos), ligados[0], ligados[1]
+
+# --- API EXTERNA ---
+
+class DiretorioClientes:
+    # requests só é importado quando o diretório é criado (primeira consulta à API), não na
+    # inicialização dos workers: este módulo é carregado pelos sinais.
+    def __init__(self, base_url=None, client_id=None, client_secret=None, max_conexoes=MAXIMO_CONEXOES):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.erro_rede = requests.exceptions.RequestException
+        self.base_url = (base_url or settings.API_CLIENTES_BASE_URL or '').strip('/')
+        self.client_id = client_id or settings.API_CLIENTES_ID
+        self.client_secret = client_secret or settings.API_CLIENTES_SECRET
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes)
+        self.sessao.mount('http://', adaptador); self.sessao.mount('https://', adaptador)
+        self.executor = ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix='diretorio-clientes')
+
+    # --- AUTENTICAÇÃO ---
+    def _token(self, renovar=False):
+        token = None if renovar else cache.get(CHAVE_TOKEN)
+        if token: return token
+        auth_data = {"Client_ID": self.client_id, "Client_Secret": self.client_secret}
+        try:
+            auth_response = self.sessao.post(f"{self.base_url}/integration/api/Authenticate", json=auth_data, timeout=TIMEOUT_AUTENTICACAO)
+            auth_response.raise_for_status()
+            token_data = auth_response.json()
+        except (self.erro_rede, ValueError):
+            raise ErroAutenticacao('Falha na autenticação com a API externa. Verifique as credenciais.')
+        token = token_data.get('token') or token_data.get('access_token') or token_data.get('accessToken')
+        if not token: raise ErroAutenticacao('Token não encontrado na resposta de autenticação.')
+        cache.set(CHAVE_TOKEN, token, TTL_TOKEN)
+        return token
+
+    # --- CONSULTA ---
+    def _consultar_formato(self, formato, token):
+        # Devolve (nome ou None, resposta_definitiva); erros de rede não são respostas definitivas.
+        try:
+            resposta = self.sessao.get(f"{self.base_url}/integration/api/GetCliente/{formato}", headers={'Authorization': f'Bearer {token}'}, timeout=TIMEOUT_CONSULTA)
+        except self.erro_rede:
+            return None, False
+        if resposta.status_code in (401, 403): return None, False
+        if resposta.status_code != 200: return None, resposta.status_code == 404
+        try: item_data = resposta.json().get("Item")
+        except (ValueError, AttributeError): return None, False
+        return (item_data.get("Nome") if item_data else None), True
+
+    def _consultar_api(self, doc, token):
+        futuros = [self.executor.submit(self._consultar_formato, formato, token) for formato in formatos_documento(doc)]
+        definitivo = True
+        for futuro in as_completed(futuros):
+            nome, resposta_definitiva = futuro.result()
+            if nome:
+                for pendente in futuros: pendente.cancel()
+                return nome, True
+            definitivo = definitivo and resposta_definitiva
+        return None, definitivo
+
+    def buscar_nome(self, doc):
+        # Devolve o nome do cliente ou None. Pode levantar ErroAutenticacao.
+        chave = PREFIXO_CACHE + normalizar_documento(doc)
+        nome = cache.get(chave)
+        if nome is not None: return nome or None
+        nome = nome_cliente_local(doc)
+        if nome:
+            cache.set(chave, nome, TTL_CLIENTE); return nome
+        nome, definitivo = self._consultar_api(doc, self._token())
+        if not nome and not definitivo:
+            # Token possivelmente expirado (ou falha momentânea): renova e tenta mais uma vez.
+            nome, definitivo = self._consultar_api(doc, self._token(renovar=True))
+        if nome:
+            registrar_cliente(doc, nome); cache.set(chave, nome, TTL_CLIENTE)
+        elif definitivo: cache.set(chave, NAO_ENCONTRADO, TTL_CLIENTE_NAO_ENCONTRADO)
+        return nome
+
+    def aquecer_cache(self, documentos):
+        # Consulta em paralelo os documentos que ainda não estão no cache. Devolve quantos foram consultados.
+        documentos = {normalizar_documento(doc) for doc in documentos if doc}
+        em_cache = cache.get_many([PREFIXO_CACHE + doc for doc in documentos])
+        pendentes = [doc for doc in documentos if PREFIXO_CACHE + doc not in em_cache]
+        if not pendentes: return 0
+        self._token()
+        # Pool separado: cada busca já usa self.executor para os formatos do documento.
+        with ThreadPoolExecutor(max_workers=MAXIMO_CONEXOES) as executor:
+            list(executor.map(self.buscar_nome, pendentes))
+        return len(pendentes)
+
+    def aquecer_cache_leilao(self, leilao):
+        return self.aquecer_cache(Visita.objects.filter(leilao=leilao).values_list('cpf_cliente', flat=True).distinct())
+
+_diretorio = None
+_trava_diretorio = threading.Lock()
+
+def obter_diretorio():
+    # Uma instância por processo, para reaproveitar as conexões abertas entre requisições.
+    global _diretorio
+    with _trava_diretorio:
+        if _diretorio is None: _diretorio = DiretorioClientes()
+    return _diretorio
@@ -0,0 +1,28 @@
+# Arquivo: core/conversao.py
+# Conversões de valores digitados ou lidos de planilhas, sem dependências pesadas (usadas pelas
+# views e pela importação).
+import math
+
+def _clean_decimal(value):
+    # Aceita números (inclusive os tipos numéricos do numpy/pandas) e textos como "R$ 1.234,56".
+    # Vazio, None e NaN (célula vazia lida pelo pandas) viram 0.
+    if value is None or isinstance(value, bool): return 0.00
+    if isinstance(value, (int, float)) or hasattr(value, 'dtype'):
+        try: numero = float(value)
+        except (TypeError, ValueError): return 0.00
+        return 0.00 if math.isnan(numero) else numero
+    cleaned_value = str(value).replace('R$', '').strip().replace('.', '').replace(',', '.')
+    if not cleaned_value: return 0.00
+    try: return float(cleaned_value)
+    except (ValueError, TypeError): return 0.00
+
+def valor_fipe(texto, lance_inicial):
+    # Valor FIPE numérico a partir da coluna FIPE da planilha, que traz ou o valor ("R$ 45.000,00")
+    # ou a proporção do lance inicial sobre a FIPE ("65%"). Devolve None se não der para calcular.
+    texto = str(texto or '').strip()
+    if texto.endswith('%'):
+        proporcao = _clean_decimal(texto[:-1])
+        valor = float(lance_inicial or 0) * 100 / proporcao if proporcao > 0 else 0.0
+    else:
+        valor = _clean_decimal(texto)
+    return round(valor, 2) if valor > 0 else None
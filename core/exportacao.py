@@ -0,0 +1,82 @@
+# Arquivo: core/exportacao.py
+# Geração dos relatórios de lotes em streaming, usada pela view de exportação e pelos jobs.
+# As linhas são lidas do banco em blocos (.iterator) e escritas uma a uma, então a memória
+# fica constante independente de quantos lotes forem exportados.
+import csv
+import tempfile
+from decimal import Decimal
+from django.utils import timezone
+from .busca import filtrar_por_texto
+from .conversao import valor_fipe
+from .models import Lote
+
+# Quantidade de linhas buscadas do banco por vez.
+TAMANHO_BLOCO_EXPORTACAO = 2000
+
+COLUNAS_EXPORTACAO = [
+    ('leilao__nome_evento', 'Leilão'),
+    ('numero_lote', 'Lote'),
+    ('veiculo__placa', 'Placa'),
+    ('veiculo__min_veiculo', 'Veículo'),
+    ('comitente__nome', 'Comitente'),
+    ('status', 'Status'),
+    ('lance_inicial', 'Lance Inicial (R$)'),
+    ('proporcao_fipe', 'FIPE (planilha)'),
+    ('valor_fipe', 'Valor FIPE (R$)'),
+    ('arremate__nome_cliente', 'Arrematante'),
+    ('arremate__cpf_cliente', 'CPF/CNPJ Arrematante'),
+    ('arremate__valor_arremate', 'Valor do Arremate (R$)'),
+    ('arremate__data_arremate', 'Data do Arremate'),
+]
+
+def filtrar_lotes(status=None, comitente_id=None, leilao_id=None, busca=None):
+    queryset = Lote.objects.all()
+    if status: queryset = queryset.filter(status=status)
+    if comitente_id: queryset = queryset.filter(comitente__id=comitente_id)
+    if leilao_id: queryset = queryset.filter(leilao__id=leilao_id)
+    if busca: queryset = filtrar_por_texto(queryset, busca)
+    return queryset.order_by('leilao__data_leilao_principal', 'leilao_id', 'numero_lote')
+
+def linhas_lotes(queryset):
+    # Um único SELECT com os JOINs de leilão, veículo, comitente e arremate, lido em blocos.
+    status_display = dict(Lote.STATUS_CHOICES)
+    campos = [campo for campo, _ in COLUNAS_EXPORTACAO]
+    indice_status = campos.index('status'); indice_data = campos.index('arremate__data_arremate')
+    indice_lance = campos.index('lance_inicial'); indice_texto_fipe = campos.index('proporcao_fipe'); indice_fipe = campos.index('valor_fipe')
+    for valores in queryset.values_list(*campos).iterator(chunk_size=TAMANHO_BLOCO_EXPORTACAO):
+        valores = list(valores)
+        valores[indice_status] = status_display.get(valores[indice_status], valores[indice_status])
+        # Lotes gravados antes do valor_fipe numérico: convertido do texto, como no save().
+        if valores[indice_fipe] is None:
+            valor = valor_fipe(valores[indice_texto_fipe], valores[indice_lance])
+            if valor is not None: valores[indice_fipe] = Decimal(str(valor)).quantize(Decimal('0.01'))
+        # O Excel não aceita datas com fuso horário.
+        if valores[indice_data]: valores[indice_data] = timezone.localtime(valores[indice_data]).replace(tzinfo=None)
+        yield valores
+
+def escrever_xlsx(queryset, destino):
+    # Workbook em modo write-only: as linhas vão direto para o arquivo temporário do openpyxl.
+    # openpyxl só é importado aqui, na primeira exportação, e não na inicialização dos workers.
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet('Lotes')
+    planilha.append([titulo for _, titulo in COLUNAS_EXPORTACAO])
+    for valores in linhas_lotes(queryset):
+        planilha.append(valores)
+    workbook.save(destino)
+
+def gerar_xlsx_temporario(queryset):
+    arquivo = tempfile.TemporaryFile()
+    escrever_xlsx(queryset, arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+class _Eco:
+    # Buffer "falso" para o csv.writer: devolve a linha formatada em vez de guardá-la.
+    def write(self, valor): return valor
+
+def gerar_csv(queryset):
+    escritor = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff' + escritor.writerow([titulo for _, titulo in COLUNAS_EXPORTACAO])
+    for valores in linhas_lotes(queryset):
+        yield escritor.writerow(['' if valor is None else valor for valor in valores])
@@ -0,0 +1,142 @@
+# Arquivo: core/feed.py
+# Feed ao vivo do leilão (SSE e long-poll). Os eventos são gravados na tabela EventoLeilao, na
+# mesma transação da alteração; depois do commit, os clientes conectados a este processo são
+# acordados na hora (pub/sub em memória). Clientes ligados a outros workers recebem os eventos
+# consultando o log a cada INTERVALO_POLLING segundos, então funciona com vários processos.
+# Os ids são atribuídos no INSERT, não no commit: no PostgreSQL um evento pode ficar visível depois
+# de outro com id maior. Por isso, além do cursor (maior id entregue), o cliente guarda os ids
+# "pendentes": os ids abaixo do cursor que ainda não tinham evento visível (transação aberta ou
+# desfeita). Em geral a lista é vazia; um id sai dela quando o evento aparece ou quando um evento
+# posterior já tem mais de JANELA_ATRASO (a transação dele já teria terminado).
+# Os eventos antigos são removidos pelo comando limpar_eventos (podar_eventos).
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .models import EventoLeilao, Lote
+
+INTERVALO_POLLING = 5
+TEMPO_KEEPALIVE = 20
+TEMPO_LONG_POLL = 25
+LIMITE_EVENTOS = 200
+JANELA_IDS = 1000
+JANELA_ATRASO = timedelta(seconds=30)
+MAXIMO_PENDENTES = 100
+RETENCAO_EVENTOS_DIAS = 7
+
+# leilao_id (None = todos os leilões) -> {(loop, asyncio.Event)}
+_assinantes = defaultdict(set)
+_trava = threading.Lock()
+
+def _acordar_assinantes(leilao_ids):
+    with _trava:
+        alvos = set(_assinantes.get(None, ())).union(*(_assinantes[leilao_id] for leilao_id in leilao_ids if leilao_id in _assinantes))
+    for loop, acordar in alvos:
+        try: loop.call_soon_threadsafe(acordar.set)
+        except RuntimeError: pass  # loop já encerrado
+
+def publicar_eventos(eventos):
+    # Recebe instâncias de EventoLeilao ainda não salvas (usado também pelos caminhos em massa).
+    eventos = list(eventos)
+    if not eventos: return
+    EventoLeilao.objects.bulk_create(eventos)
+    leilao_ids = {evento.leilao_id for evento in eventos}
+    transaction.on_commit(lambda: _acordar_assinantes(leilao_ids))
+
+def publicar_evento(leilao_id, tipo, dados):
+    publicar_eventos([EventoLeilao(leilao_id=leilao_id, tipo=tipo, dados=dados)])
+
+def evento_status_lote(leilao_id, lote_id, numero_lote, placa, status):
+    return EventoLeilao(leilao_id=leilao_id, tipo='LOTE_STATUS', dados={
+        'lote_id': lote_id, 'numero_lote': numero_lote, 'placa': placa,
+        'status': status, 'status_display': dict(Lote.STATUS_CHOICES).get(status, status),
+    })
+
+@contextmanager
+def _assinatura(leilao_id):
+    item = (asyncio.get_running_loop(), asyncio.Event())
+    with _trava: _assinantes[leilao_id].add(item)
+    try:
+        yield item[1]
+    finally:
+        with _trava:
+            _assinantes[leilao_id].discard(item)
+            if not _assinantes[leilao_id]: del _assinantes[leilao_id]
+
+def _eventos_desde(leilao_id, desde, pendentes=()):
+    # Os eventos depois do cursor e os dos ids pendentes que já ficaram visíveis.
+    queryset = EventoLeilao.objects.order_by('id')
+    if leilao_id: queryset = queryset.filter(leilao_id=leilao_id)
+    filtro = Q(id__gt=desde)
+    if pendentes: filtro |= Q(id__in=pendentes)
+    return queryset.filter(filtro)[:LIMITE_EVENTOS]
+
+async def ultimo_evento_id():
+    return await EventoLeilao.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+async def _sem_expirados(faltando, desde):
+    # Descarta os ids abaixo do último evento criado há mais de JANELA_ATRASO e limita a lista.
+    if not faltando: return set()
+    limite = await EventoLeilao.objects.filter(id__gt=min(faltando), criado_em__lt=timezone.now() - JANELA_ATRASO).aaggregate(maior=Max('id'))
+    faltando = sorted(evento_id for evento_id in faltando if evento_id > max(limite['maior'] or 0, desde - JANELA_IDS))
+    return set(faltando[-MAXIMO_PENDENTES:])
+
+async def pendentes_iniciais(desde):
+    # Cursor sem lista de pendentes (conexão nova): os ids recentes até o cursor ainda sem evento.
+    visiveis = {evento_id async for evento_id in EventoLeilao.objects.filter(id__gt=desde - JANELA_IDS, id__lte=desde).values_list('id', flat=True)}
+    return await _sem_expirados(set(range(max(desde - JANELA_IDS, 0) + 1, desde + 1)) - visiveis, desde)
+
+async def atualizar_pendentes(leilao_id, desde, novo_desde, pendentes, entregues):
+    # Depois de entregar `entregues` e avançar o cursor de desde para novo_desde: os pendentes de
+    # antes e os ids pulados no caminho, menos os entregues e, no feed de um leilão, os dos outros.
+    inicio = max(desde, novo_desde - JANELA_IDS)
+    faltando = (set(pendentes) | set(range(inicio + 1, novo_desde + 1))) - entregues
+    if faltando and leilao_id:
+        filtro = Q(id__gt=inicio, id__lte=novo_desde)
+        if pendentes: filtro |= Q(id__in=pendentes)
+        outros = EventoLeilao.objects.filter(filtro).exclude(leilao_id=leilao_id)
+        # Caso comum: todos os ids pulados são de outros leilões, e basta contar.
+        if await outros.acount() == len(faltando): return set()
+        faltando -= {evento_id async for evento_id in outros.values_list('id', flat=True)}
+    return await _sem_expirados(faltando, novo_desde)
+
+async def aguardar_eventos(leilao_id, desde, tempo_maximo, pendentes=()):
+    # Devolve os eventos novos (ver _eventos_desde) assim que existirem, ou [] depois de tempo_maximo segundos.
+    loop = asyncio.get_running_loop(); prazo = loop.time() + tempo_maximo
+    with _assinatura(leilao_id) as acordar:
+        while True:
+            acordar.clear()
+            eventos = [evento async for evento in _eventos_desde(leilao_id, desde, pendentes)]
+            restante = prazo - loop.time()
+            if eventos or restante <= 0: return eventos
+            try: await asyncio.wait_for(acordar.wait(), min(INTERVALO_POLLING, restante))
+            except asyncio.TimeoutError: pass
+
+def podar_eventos(dias=RETENCAO_EVENTOS_DIAS):
+    # Remove os eventos com mais de `dias` dias; clientes tão atrasados recebem só o que sobrou.
+    queryset = EventoLeilao.objects.filter(criado_em__lt=timezone.now() - timedelta(days=dias))
+    return queryset._raw_delete(queryset.db)
+
+def serializar_evento(evento):
+    return {'id': evento.id, 'leilao_id': evento.leilao_id, 'tipo': evento.tipo, 'criado_em': evento.criado_em.isoformat(), **evento.dados}
+
+async def fluxo_sse(leilao_id, desde):
+    # Os pendentes ficam só no servidor; numa reconexão (Last-Event-ID) são calculados de novo.
+    pendentes = await pendentes_iniciais(desde)
+    yield f"retry: {INTERVALO_POLLING * 1000}\n\n"
+    while True:
+        eventos = await aguardar_eventos(leilao_id, desde, TEMPO_KEEPALIVE, pendentes)
+        if not eventos:
+            pendentes = await _sem_expirados(pendentes, desde)
+            yield ": keep-alive\n\n"; continue
+        novo_desde = max([desde] + [evento.id for evento in eventos])
+        pendentes = await atualizar_pendentes(leilao_id, desde, novo_desde, pendentes, {evento.id for evento in eventos})
+        for evento in eventos:
+            # Um evento atrasado tem id menor que o cursor; o id do SSE continua sendo o maior entregue.
+            desde = max(desde, evento.id)
+            yield f"id: {desde}\nevent: {evento.tipo.lower()}\ndata: {json.dumps(serializar_evento(evento))}\n\n"
@@ -0,0 +1,54 @@
+# Arquivo: core/funil.py
+# Funil de conversão (visitantes x arrematantes) calculado no banco com EXISTS e COUNT DISTINCT,
+# devolvendo só as contagens, sem trazer os CPFs/CNPJs para o Python. O agrupamento é pelo
+# cliente (FK inteira); linhas antigas precisam do comando backfill_clientes.
+from django.db.models import Count, Exists, OuterRef, Q
+from .models import Visita, Arremate
+
+def calcular_funil(visitas, arremates):
+    # Recebe as querysets de Visita e Arremate já filtradas (período, leilão, comitente...).
+    arrematou = Exists(arremates.filter(cliente_id=OuterRef('cliente_id')))
+    totais_visitas = visitas.aggregate(
+        visitantes=Count('cliente_id', distinct=True),
+        visitantes_que_arremataram=Count('cliente_id', distinct=True, filter=Q(arrematou)),
+    )
+    arrematantes = arremates.aggregate(total=Count('cliente_id', distinct=True))['total']
+    return montar_funil(totais_visitas['visitantes'], arrematantes, totais_visitas['visitantes_que_arremataram'])
+
+def montar_funil(visitantes, arrematantes, intersecao):
+    # Também usado com as contagens lidas dos arquivos de leilões arquivados (core/arquivamento.py).
+    return {
+        'visitantes': visitantes,
+        'arrematantes': arrematantes,
+        'visitantes_que_arremataram': intersecao,
+        'visitantes_nao_arremataram': visitantes - intersecao,
+        'arrematantes_nao_visitaram': arrematantes - intersecao,
+        'taxa_conversao': (intersecao / visitantes * 100) if visitantes > 0 else 0,
+    }
+
+def funil_do_leilao(leilao):
+    return calcular_funil(Visita.objects.filter(leilao=leilao), Arremate.objects.filter(lote__leilao=leilao))
+
+def funil_por_comitente(leilao):
+    # Uma única consulta agrupada: para cada comitente, quantos arrematantes distintos houve
+    # e quantos deles visitaram o leilão. A conversão é sobre o total de visitantes do leilão.
+    visitas = Visita.objects.filter(leilao=leilao)
+    visitantes = visitas.aggregate(total=Count('cliente_id', distinct=True))['total']
+    visitou = Exists(visitas.filter(cliente_id=OuterRef('cliente_id')))
+    linhas = (
+        Arremate.objects.filter(lote__leilao=leilao).values('lote__comitente_id', 'lote__comitente__nome')
+        .annotate(arrematantes=Count('cliente_id', distinct=True), visitantes_que_arremataram=Count('cliente_id', distinct=True, filter=Q(visitou)))
+        .order_by('lote__comitente__nome')
+    )
+    return [
+        linha_funil_comitente(linha['lote__comitente_id'], linha['lote__comitente__nome'], linha['arrematantes'], linha['visitantes_que_arremataram'], visitantes)
+        for linha in linhas
+    ]
+
+def linha_funil_comitente(comitente_id, comitente, arrematantes, visitantes_que_arremataram, visitantes):
+    return {
+        'comitente_id': comitente_id, 'comitente': comitente,
+        'arrematantes': arrematantes, 'visitantes_que_arremataram': visitantes_que_arremataram,
+        'arrematantes_nao_visitaram': arrematantes - visitantes_que_arremataram,
+        'taxa_conversao': (visitantes_que_arremataram / visitantes * 100) if visitantes > 0 else 0,
+    }
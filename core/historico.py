@@ -0,0 +1,92 @@
+# Arquivo: core/historico.py
+# Histórico de status dos lotes (modelo HistoricoStatusLote). Cada caminho que muda Lote.status grava
+# aqui, na mesma transação: os caminhos em massa (core/lotes.py, core/importacao.py,
+# core/resultados.py) com bulk_create e os save() de Lote pelo sinal em core/signals.py.
+# As consultas (status em um instante, tempo de permanência por comitente) são feitas no banco.
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, Exists, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import HistoricoStatusLote, Lote
+
+TAMANHO_LOTE_BULK = 500
+
+# Faixas do histograma de permanência: (nome, limite superior); a última faixa não tem limite.
+FAIXAS_PERMANENCIA = (
+    ('ate_1h', timedelta(hours=1)), ('ate_1d', timedelta(days=1)), ('ate_3d', timedelta(days=3)),
+    ('ate_7d', timedelta(days=7)), ('ate_30d', timedelta(days=30)), ('acima_30d', None),
+)
+
+def transicao_status(lote_id, leilao_id, status_anterior, status, momento=None):
+    # Linha ainda não salva, para registrar_transicoes (mesmo padrão de evento_status_lote no feed).
+    return HistoricoStatusLote(lote_id=lote_id, leilao_id=leilao_id, status_anterior=status_anterior or '', status=status, momento=momento or timezone.now())
+
+def registrar_transicoes(transicoes):
+    transicoes = list(transicoes)
+    if transicoes: HistoricoStatusLote.objects.bulk_create(transicoes, batch_size=TAMANHO_LOTE_BULK)
+
+# --- CONSULTAS ---
+
+def _evento_seguinte(ate=None):
+    # Eventos do mesmo lote posteriores ao da linha externa (desempate pelo id, na ordem de gravação).
+    seguintes = HistoricoStatusLote.objects.filter(lote_id=OuterRef('lote_id')).filter(
+        Q(momento__gt=OuterRef('momento')) | Q(momento=OuterRef('momento'), id__gt=OuterRef('id'))
+    )
+    return seguintes.filter(momento__lte=ate) if ate is not None else seguintes
+
+def contagem_status_em(momento, leilao_id=None):
+    # {status: quantidade de lotes} como estava no instante informado: para cada lote, o último
+    # evento até aquele instante (NOT EXISTS de um evento posterior, pelo índice (lote, momento)).
+    eventos = HistoricoStatusLote.objects.filter(momento__lte=momento)
+    if leilao_id is not None: eventos = eventos.filter(leilao_id=leilao_id)
+    ultimos = eventos.filter(~Exists(_evento_seguinte(momento)))
+    return dict(ultimos.values('status').annotate(total=Count('id')).order_by().values_list('status', 'total'))
+
+def permanencia_por_comitente(status, leilao_id=None, desde=None, ate=None):
+    # Tempo que os lotes ficaram em "status" (da entrada até o evento seguinte do mesmo lote), por
+    # comitente: quantidade, média, mínimo, máximo e histograma em FAIXAS_PERMANENCIA, tudo em uma
+    # consulta agregada. desde/ate filtram o momento de entrada; lotes que ainda estão no status
+    # entram só em "em_andamento".
+    entradas = HistoricoStatusLote.objects.filter(status=status)
+    if leilao_id is not None: entradas = entradas.filter(leilao_id=leilao_id)
+    if desde is not None: entradas = entradas.filter(momento__gte=desde)
+    if ate is not None: entradas = entradas.filter(momento__lt=ate)
+    entradas = entradas.annotate(saida=Subquery(_evento_seguinte().order_by('momento', 'id').values('momento')[:1])).annotate(
+        duracao=ExpressionWrapper(F('saida') - F('momento'), output_field=DurationField()),
+    )
+    faixas = {}; anterior = None
+    for nome, limite in FAIXAS_PERMANENCIA:
+        filtro = Q(saida__isnull=False)
+        if anterior is not None: filtro &= Q(duracao__gt=anterior)
+        if limite is not None: filtro &= Q(duracao__lte=limite)
+        faixas[nome] = Count('id', filter=filtro); anterior = limite
+    linhas = entradas.values('lote__comitente_id', 'lote__comitente__nome').annotate(
+        concluidas=Count('saida'), em_andamento=Count('id', filter=Q(saida__isnull=True)),
+        media=Avg('duracao', output_field=DurationField()), minimo=Min('duracao'), maximo=Max('duracao'), **faixas,
+    ).order_by('lote__comitente__nome')
+    return [{
+        'comitente_id': linha['lote__comitente_id'], 'comitente': linha['lote__comitente__nome'],
+        'concluidas': linha['concluidas'], 'em_andamento': linha['em_andamento'],
+        'media': linha['media'], 'minimo': linha['minimo'], 'maximo': linha['maximo'],
+        'faixas': {nome: linha[nome] for nome, _ in FAIXAS_PERMANENCIA},
+    } for linha in linhas]
+
+# --- CARGA INICIAL ---
+
+def backfill_historico():
+    # Lotes criados antes do histórico ganham um evento com o status atual (na data do arremate,
+    # se houver; senão, agora). Antes desse evento, o lote não aparece em contagem_status_em.
+    # Devolve a quantidade de eventos criados.
+    agora = timezone.now(); criados = 0; ultimo_id = 0
+    sem_historico = Lote.objects.filter(~Exists(HistoricoStatusLote.objects.filter(lote_id=OuterRef('id')))).order_by('id')
+    with transaction.atomic():
+        # Em blocos pela chave primária: a memória não depende da quantidade de lotes.
+        while True:
+            bloco = list(sem_historico.filter(id__gt=ultimo_id).values_list('id', 'leilao_id', 'status', 'arremate__data_arremate')[:TAMANHO_LOTE_BULK])
+            if not bloco: break
+            registrar_transicoes(
+                transicao_status(lote_id, leilao_id, None, status, data_arremate if status != 'DISPONIVEL' and data_arremate else agora)
+                for lote_id, leilao_id, status, data_arremate in bloco
+            )
+            criados += len(bloco); ultimo_id = bloco[-1][0]
+    return criados
@@ -0,0 +1,177 @@
+# Arquivo: core/importacao.py
+# Motor de importação em lote das planilhas de veículos/lotes.
+import csv
+import io
+import openpyxl
+import pandas as pd
+from decimal import Decimal
+from django.db import transaction
+from .conversao import _clean_decimal, valor_fipe
+from .models import Comitente, Veiculo, Lote
+from .cache_dashboard import invalidar_apos_commit, invalidar_opcoes, CHAVE_OPCOES_COMITENTES
+from .historico import registrar_transicoes, transicao_status
+
+# Quantidade de linhas por comando bulk_create/bulk_update.
+TAMANHO_LOTE_BULK = 500
+
+# Quantidade de linhas lidas da planilha por vez no modo streaming.
+TAMANHO_BLOCO_LEITURA = 2000
+
+COLUNAS_PLANILHA = ('PLACA', 'LOTES', 'VEICULOS', 'COMITENTES', 'LANCE INICIAL', 'FIPE')
+
+class ImportacaoInterrompida(Exception):
+    pass
+
+def _texto(coluna):
+    return coluna.fillna('').astype(str).str.strip()
+
+def normalizar_planilha(df, linha_inicial=2):
+    # Normaliza o DataFrame inteiro de uma vez (operações vetorizadas), sem iterar linha a linha.
+    df = df.copy(); df.columns = df.columns.astype(str).str.strip()
+    for coluna in COLUNAS_PLANILHA:
+        if coluna not in df.columns: df[coluna] = None
+    normalizado = pd.DataFrame(index=df.index)
+    # linha_inicial=None indica que o índice do DataFrame já traz o número da linha na planilha.
+    normalizado['linha'] = df.index if linha_inicial is None else range(linha_inicial, linha_inicial + len(df))
+    normalizado['placa'] = _texto(df['PLACA']).str.upper()
+    normalizado['numero_lote'] = pd.to_numeric(df['LOTES'], errors='coerce')
+    normalizado['min_veiculo'] = _texto(df['VEICULOS'])
+    normalizado['comitente'] = _texto(df['COMITENTES'])
+    normalizado['lance_inicial'] = df['LANCE INICIAL'].map(_clean_decimal).round(2)
+    normalizado['proporcao_fipe'] = _texto(df['FIPE'])
+    normalizado['valor_fipe'] = [valor_fipe(texto, lance) for texto, lance in zip(normalizado['proporcao_fipe'], normalizado['lance_inicial'])]
+    return normalizado
+
+def _validar_linhas(normalizado, erros):
+    placa_vazia = normalizado['placa'] == ''
+    placa_longa = normalizado['placa'].str.len() > Veiculo._meta.get_field('placa').max_length
+    lote_invalido = ~placa_vazia & ~placa_longa & (normalizado['numero_lote'].isna() | (normalizado['numero_lote'] < 0))
+    comitente_vazio = ~placa_vazia & ~placa_longa & ~lote_invalido & (normalizado['comitente'] == '')
+    validas = ~(placa_vazia | placa_longa | lote_invalido | comitente_vazio)
+    lote_repetido = validas & normalizado['numero_lote'].where(validas).duplicated(keep='last')
+    mensagens = []
+    for linha in normalizado.loc[placa_vazia, 'linha']: mensagens.append((linha, "Placa está vazia. Linha ignorada."))
+    for linha in normalizado.loc[placa_longa, 'linha']: mensagens.append((linha, "Placa com mais de 10 caracteres. Linha ignorada."))
+    for linha in normalizado.loc[lote_invalido, 'linha']: mensagens.append((linha, "Número do lote inválido. Linha ignorada."))
+    for linha in normalizado.loc[comitente_vazio, 'linha']: mensagens.append((linha, "Comitente está vazio. Linha ignorada."))
+    for linha, numero in normalizado.loc[lote_repetido, ['linha', 'numero_lote']].itertuples(index=False):
+        mensagens.append((linha, f"Lote {int(numero)} repetido na planilha; mantida a última ocorrência."))
+    erros.extend(f"Linha {linha}: {mensagem}" for linha, mensagem in sorted(mensagens))
+    return normalizado[validas & ~lote_repetido].astype({'numero_lote': int})
+
+def _resolver_comitentes(nomes):
+    comitentes = dict(Comitente.objects.filter(nome__in=nomes).values_list('nome', 'id'))
+    novos = [Comitente(nome=nome) for nome in nomes if nome not in comitentes]
+    if novos:
+        Comitente.objects.bulk_create(novos, batch_size=TAMANHO_LOTE_BULK)
+        invalidar_opcoes(CHAVE_OPCOES_COMITENTES)
+        comitentes.update(Comitente.objects.filter(nome__in=[c.nome for c in novos]).values_list('nome', 'id'))
+    return comitentes
+
+def _gravar_veiculos(linhas):
+    descricoes = dict(zip(linhas['placa'], linhas['min_veiculo']))
+    existentes = Veiculo.objects.in_bulk(list(descricoes))
+    novos = [Veiculo(placa=placa, min_veiculo=descricao) for placa, descricao in descricoes.items() if placa not in existentes]
+    alterados = []
+    for placa, veiculo in existentes.items():
+        if descricoes[placa] and veiculo.min_veiculo != descricoes[placa]:
+            veiculo.min_veiculo = descricoes[placa]; alterados.append(veiculo)
+    Veiculo.objects.bulk_create(novos, batch_size=TAMANHO_LOTE_BULK)
+    Veiculo.objects.bulk_update(alterados, ['min_veiculo'], batch_size=TAMANHO_LOTE_BULK)
+
+def _gravar_lotes(linhas, leilao, comitentes):
+    existentes = {lote.numero_lote: lote for lote in Lote.objects.filter(leilao=leilao, numero_lote__in=linhas['numero_lote'].tolist())}
+    novos = []; alterados = []
+    for placa, numero, comitente, lance, fipe, valor in linhas[['placa', 'numero_lote', 'comitente', 'lance_inicial', 'proporcao_fipe', 'valor_fipe']].itertuples(index=False):
+        numero = int(numero)
+        dados = {
+            'veiculo_id': placa, 'comitente_id': comitentes[comitente], 'lance_inicial': Decimal(str(lance)), 'proporcao_fipe': fipe,
+            'valor_fipe': None if pd.isna(valor) else Decimal(str(valor)),
+        }
+        lote = existentes.get(numero)
+        if lote is None:
+            novos.append(Lote(leilao=leilao, numero_lote=numero, status='DISPONIVEL', **dados))
+        else:
+            # Lotes já existentes mantêm o status (não desfaz arremates já registrados).
+            for campo, valor in dados.items(): setattr(lote, campo, valor)
+            alterados.append(lote)
+    Lote.objects.bulk_create(novos, batch_size=TAMANHO_LOTE_BULK)
+    if novos:
+        # Criação dos lotes no histórico de status; nem todo banco devolve as chaves no bulk_create.
+        criados = Lote.objects.filter(leilao=leilao, numero_lote__in=[lote.numero_lote for lote in novos]).values_list('id', flat=True)
+        registrar_transicoes(transicao_status(lote_id, leilao.id, None, 'DISPONIVEL') for lote_id in criados)
+    Lote.objects.bulk_update(alterados, ['veiculo', 'comitente', 'lance_inicial', 'proporcao_fipe', 'valor_fipe'], batch_size=TAMANHO_LOTE_BULK)
+
+def importar_lotes(df, leilao, linha_inicial=2):
+    # Importa a planilha para o leilão informado. Retorna (quantidade_importada, lista_de_erros).
+    # Todas as escritas acontecem em uma única transação, com um lookup IN por tabela.
+    erros = []
+    linhas = _validar_linhas(normalizar_planilha(df, linha_inicial), erros)
+    if linhas.empty: return 0, erros
+    with transaction.atomic():
+        comitentes = _resolver_comitentes(linhas['comitente'].unique().tolist())
+        _gravar_veiculos(linhas)
+        _gravar_lotes(linhas, leilao, comitentes)
+        # bulk_create/bulk_update não disparam sinais; invalida os dashboards explicitamente.
+        invalidar_apos_commit([leilao.id])
+    return len(linhas), erros
+
+# --- LEITURA EM BLOCOS (STREAMING) ---
+
+def _linhas_xlsx(arquivo):
+    workbook = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _linhas_csv(arquivo):
+    fluxo = io.TextIOWrapper(getattr(arquivo, 'file', arquivo), encoding='utf-8-sig', newline='')
+    try:
+        amostra = fluxo.readline(); fluxo.seek(0)
+        # Planilhas exportadas no Brasil costumam usar ';' como separador.
+        delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+        yield from csv.reader(fluxo, delimiter=delimitador)
+    finally:
+        fluxo.detach()
+
+def ler_planilha_em_blocos(arquivo, nome_arquivo, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    # Lê .xlsx (openpyxl read-only) ou .csv linha a linha e devolve DataFrames de tamanho fixo,
+    # sem nunca carregar a planilha inteira na memória.
+    linhas = _linhas_csv(arquivo) if str(nome_arquivo).lower().endswith('.csv') else _linhas_xlsx(arquivo)
+    cabecalho = next(linhas, None)
+    if cabecalho is None: return
+    cabecalho = [str(coluna).strip() if coluna is not None else '' for coluna in cabecalho]
+    bloco = []
+    for numero_linha, valores in enumerate(linhas, start=2):
+        # Linhas totalmente vazias (comuns no fim de planilhas formatadas) são ignoradas.
+        if not any(valor not in (None, '') for valor in valores): continue
+        valores = list(valores)[:len(cabecalho)]
+        bloco.append((numero_linha, valores + [None] * (len(cabecalho) - len(valores))))
+        if len(bloco) >= tamanho_bloco:
+            yield _bloco_para_dataframe(bloco, cabecalho); bloco = []
+    if bloco:
+        yield _bloco_para_dataframe(bloco, cabecalho)
+
+def _bloco_para_dataframe(bloco, cabecalho):
+    # O índice do DataFrame guarda o número da linha na planilha, usado nas mensagens de erro.
+    return pd.DataFrame.from_records([valores for _, valores in bloco], columns=cabecalho, index=[linha for linha, _ in bloco])
+
+def importar_lotes_streaming(arquivo, nome_arquivo, leilao, tamanho_bloco=TAMANHO_BLOCO_LEITURA, progresso=None):
+    # Importa a planilha bloco a bloco; cada bloco é gravado em sua própria transação, o que
+    # mantém a memória limitada, não prende a escrita do SQLite durante o arquivo inteiro e deixa o
+    # andamento visível via callback progresso(linhas_lidas, quantidade_importada, quantidade_de_erros).
+    # Repetir a importação é seguro: lotes são atualizados pelo número, veículos pela placa e
+    # comitentes pelo nome. Uma falha no meio levanta ImportacaoInterrompida dizendo o que já foi gravado.
+    sucesso_total = 0; erros = []; linhas_lidas = 0
+    for df in ler_planilha_em_blocos(arquivo, nome_arquivo, tamanho_bloco):
+        try:
+            sucesso, erros_bloco = importar_lotes(df, leilao, linha_inicial=None)
+        except Exception as erro:
+            raise ImportacaoInterrompida(
+                f"{erro}. A importação parou depois da linha {df.index[0] - 1}: {sucesso_total} lotes já foram gravados. "
+                "Envie a mesma planilha de novo para concluir; os lotes já gravados são atualizados, sem duplicar."
+            ) from erro
+        sucesso_total += sucesso; erros.extend(erros_bloco); linhas_lidas += len(df)
+        if progresso: progresso(linhas_lidas, sucesso_total, len(erros))
+    return sucesso_total, erros
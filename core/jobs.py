@@ -0,0 +1,96 @@
+# Arquivo: core/jobs.py
+# Fila de tarefas simples, sem broker externo: os jobs ficam na tabela Job e o comando
+# "manage.py processar_jobs" os reserva com um UPDATE condicional (seguro com vários workers).
+# Um job em execução sem sinal de vida (atualizado_em, renovado a cada progresso) há mais de
+# TEMPO_SEM_SINAL (worker encerrado no meio) volta para a fila, até MAXIMO_TENTATIVAS vezes; o
+# resultado do worker antigo, se ele ainda terminar, é descartado.
+import os
+from datetime import timedelta
+from django.core.files import File
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from .models import Job, Leilao
+from .exportacao import filtrar_lotes, gerar_xlsx_temporario
+
+# Quantidade máxima de mensagens de erro guardadas por job.
+MAXIMO_ERROS_JOB = 500
+# A exportação não informa progresso: o prazo cobre uma exportação inteira.
+TEMPO_SEM_SINAL = timedelta(hours=1)
+MAXIMO_TENTATIVAS = 3
+
+def enfileirar_importacao(arquivo, leilao, usuario=None):
+    job = Job(tipo='IMPORTACAO', parametros={'leilao_id': leilao.id, 'nome_arquivo': arquivo.name}, criado_por=usuario)
+    job.arquivo_entrada.save(os.path.basename(arquivo.name), arquivo, save=False)
+    job.save()
+    return job
+
+def enfileirar_exportacao(filtros, usuario=None):
+    return Job.objects.create(tipo='EXPORTACAO', parametros=filtros, criado_por=usuario)
+
+def recuperar_jobs_travados():
+    # Jobs em EXECUTANDO cujo worker parou: voltam para PENDENTE ou, esgotadas as tentativas, viram ERRO.
+    travados = Job.objects.filter(status='EXECUTANDO', atualizado_em__lt=timezone.now() - TEMPO_SEM_SINAL)
+    desistidos = travados.filter(tentativas__gte=MAXIMO_TENTATIVAS).update(
+        status='ERRO', mensagem=f'Job interrompido {MAXIMO_TENTATIVAS} vezes sem concluir.', concluido_em=timezone.now(),
+    )
+    return desistidos + travados.update(status='PENDENTE', iniciado_em=None, atualizado_em=None, progresso=0)
+
+def reservar_proximo_job():
+    # Tenta reservar o job pendente mais antigo; se outro worker chegou antes, tenta o próximo.
+    recuperar_jobs_travados()
+    while True:
+        job_id = Job.objects.filter(status='PENDENTE').order_by('criado_em', 'id').values_list('id', flat=True).first()
+        if job_id is None: return None
+        agora = timezone.now()
+        if Job.objects.filter(id=job_id, status='PENDENTE').update(status='EXECUTANDO', iniciado_em=agora, atualizado_em=agora, tentativas=F('tentativas') + 1):
+            return Job.objects.get(id=job_id)
+
+def _atualizar_progresso(job, linhas_lidas, sucesso, quantidade_erros):
+    # Só na execução vigente; renova o sinal de vida, então uma importação longa não volta para a fila.
+    Job.objects.filter(id=job.id, status='EXECUTANDO', iniciado_em=job.iniciado_em).update(
+        progresso=linhas_lidas, mensagem=f"{sucesso} lotes importados, {quantidade_erros} erros até agora.", atualizado_em=timezone.now(),
+    )
+
+def _executar_importacao(job):
+    # Importado só no worker que executa a importação: core.importacao carrega o pandas.
+    from .importacao import importar_lotes_streaming
+    leilao = Leilao.objects.get(id=job.parametros['leilao_id'])
+    nome_arquivo = job.parametros.get('nome_arquivo') or job.arquivo_entrada.name
+    progresso = lambda linhas, sucesso, erros: _atualizar_progresso(job, linhas, sucesso, erros)
+    with job.arquivo_entrada.open('rb') as arquivo:
+        sucesso_count, erros = importar_lotes_streaming(arquivo, nome_arquivo, leilao, progresso=progresso)
+    job.mensagem = f'{sucesso_count} lotes importados/atualizados com sucesso no leilão {leilao.nome_evento}.'
+    job.erros = erros[:MAXIMO_ERROS_JOB]
+
+def _executar_exportacao(job):
+    queryset = filtrar_lotes(job.parametros.get('status'), job.parametros.get('comitente'), job.parametros.get('leilao'), job.parametros.get('busca'))
+    with gerar_xlsx_temporario(queryset) as arquivo:
+        job.arquivo_resultado.save(f"relatorio_veiculos_{job.id}.xlsx", File(arquivo), save=False)
+    job.mensagem = 'Relatório pronto para download.'
+
+EXECUTORES = {'IMPORTACAO': _executar_importacao, 'EXPORTACAO': _executar_exportacao}
+
+def executar_job(job):
+    try:
+        EXECUTORES[job.tipo](job)
+        job.status = 'CONCLUIDO'
+    except Exception as e:
+        job.status = 'ERRO'; job.mensagem = f'Erro ao processar o job: {e}'
+    job.concluido_em = timezone.now()
+    # O progresso é atualizado direto no banco durante a execução; não sobrescreve aqui. Só grava se
+    # esta execução ainda é a vigente (o job não foi devolvido à fila e reservado de novo).
+    Job.objects.filter(id=job.id, status='EXECUTANDO', iniciado_em=job.iniciado_em).update(
+        status=job.status, mensagem=job.mensagem, erros=job.erros, arquivo_resultado=job.arquivo_resultado.name, concluido_em=job.concluido_em,
+    )
+    return job
+
+def serializar_job(job):
+    dados = {
+        'id': job.id, 'tipo': job.tipo, 'status': job.status, 'status_display': job.get_status_display(),
+        'progresso': job.progresso, 'mensagem': job.mensagem, 'erros': job.erros[:10], 'total_erros': len(job.erros),
+        'concluido': job.status in ('CONCLUIDO', 'ERRO'), 'url_download': None,
+    }
+    if job.status == 'CONCLUIDO' and job.arquivo_resultado:
+        dados['url_download'] = reverse('download_job', args=[job.id])
+    return dados
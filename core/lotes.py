@@ -0,0 +1,91 @@
+# Arquivo: core/lotes.py
+# Transições de status dos lotes em massa (ações do admin e tela de pós-venda). Cada operação roda
+# em uma transação com um número fixo de comandos, independente de quantos lotes forem afetados.
+# Como update() e _raw_delete() não disparam sinais, os eventos do feed, os resumos diários e o
+# cache dos dashboards são atualizados aqui explicitamente, e cada mudança entra no histórico de
+# status (core/historico.py) na mesma transação.
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cache_dashboard import invalidar_apos_commit
+from .feed import evento_status_lote, publicar_eventos
+from .historico import registrar_transicoes, transicao_status
+from .models import Arremate, Lote
+from .resumos import agendar_recalculo, dia_local
+
+# Status de destino -> status de origem permitidos.
+TRANSICOES = {
+    'PAGAMENTO_CONFIRMADO': {'ARREMATADO'},
+    'RETIRADO': {'PAGAMENTO_CONFIRMADO'},
+    # Devolução com multa: o arrematante desiste antes ou depois de pagar.
+    'RETORNADO': {'ARREMATADO', 'PAGAMENTO_CONFIRMADO'},
+}
+# Cancelar o arremate devolve o lote à venda; um veículo já retirado não volta.
+STATUS_CANCELAVEIS = {'ARREMATADO', 'PAGAMENTO_CONFIRMADO', 'RETORNADO'}
+
+class TransicaoInvalida(Exception):
+    pass
+
+class LoteIndisponivel(Exception):
+    pass
+
+def transicionar_lotes(lotes, novo_status):
+    # Move para novo_status os lotes cujo status atual permite a transição; os demais são ignorados.
+    # Devolve (quantidade_atualizada, quantidade_ignorada).
+    if novo_status not in TRANSICOES: raise TransicaoInvalida(f"Transição para '{novo_status}' não permitida.")
+    origens = TRANSICOES[novo_status]
+    with transaction.atomic():
+        # of=('self',): o queryset do changelist pode ter joins (filtros por comitente, leilão), e a
+        # trava deve pegar só as linhas dos lotes, não as de Leilao, Comitente e Veiculo.
+        linhas = list(lotes.order_by().select_for_update(of=('self',)).values_list('id', 'leilao_id', 'numero_lote', 'veiculo_id', 'status'))
+        validas = [linha for linha in linhas if linha[4] in origens]
+        if validas:
+            Lote.objects.filter(id__in=[linha[0] for linha in validas], status__in=origens).update(status=novo_status)
+            publicar_eventos(evento_status_lote(leilao_id, lote_id, numero, placa, novo_status) for lote_id, leilao_id, numero, placa, _ in validas)
+            registrar_transicoes(transicao_status(lote_id, leilao_id, anterior, novo_status) for lote_id, leilao_id, _, _, anterior in validas)
+            invalidar_apos_commit({linha[1] for linha in validas})
+    return len(validas), len(linhas) - len(validas)
+
+def cancelar_arremates(lotes):
+    # Apaga os arremates dos lotes e os devolve para DISPONIVEL sem passar pelos sinais de Arremate
+    # (que fariam um save() por lote). Devolve (quantidade_cancelada, quantidade_ignorada).
+    with transaction.atomic():
+        linhas = list(lotes.order_by().select_for_update(of=('self',)).values_list('id', 'leilao_id', 'numero_lote', 'veiculo_id', 'status'))
+        validas = [linha for linha in linhas if linha[4] in STATUS_CANCELAVEIS]
+        if validas:
+            lote_ids = [linha[0] for linha in validas]
+            arremates = Arremate.objects.filter(lote_id__in=lote_ids)
+            baldes = {(leilao_id, dia_local(data)) for leilao_id, data in arremates.values_list('lote__leilao_id', 'data_arremate')}
+            arremates._raw_delete(arremates.db)
+            Lote.objects.filter(id__in=lote_ids).update(status='DISPONIVEL')
+            publicar_eventos(evento_status_lote(leilao_id, lote_id, numero, placa, 'DISPONIVEL') for lote_id, leilao_id, numero, placa, _ in validas)
+            registrar_transicoes(transicao_status(lote_id, leilao_id, anterior, 'DISPONIVEL') for lote_id, leilao_id, _, _, anterior in validas)
+            for balde in baldes: agendar_recalculo(*balde)
+            invalidar_apos_commit({linha[1] for linha in validas})
+    return len(validas), len(linhas) - len(validas)
+
+# --- VENDA (ARREMATE) DE UM LOTE ---
+
+def _data_arremate(valor):
+    if not valor: return timezone.now()
+    data = parse_datetime(valor) if isinstance(valor, str) else valor
+    if data is None: raise ValueError(f"Data do arremate inválida: {valor}")
+    return timezone.make_aware(data) if timezone.is_naive(data) else data
+
+def vender_lote(lote, cpf_cliente, nome_cliente, valor_arremate, data_arremate=None):
+    # Registra o arremate de um lote DISPONIVEL. O primeiro comando da transação é o UPDATE
+    # condicional: só um de dois vendedores simultâneos consegue mudar o status; o outro recebe
+    # LoteIndisponivel. No SQLite, começar pela escrita também evita o erro de "database is locked"
+    # ao promover uma transação de leitura para escrita.
+    data_arremate = _data_arremate(data_arremate)
+    with transaction.atomic():
+        if not Lote.objects.filter(id=lote.id, status='DISPONIVEL').update(status='ARREMATADO'):
+            raise LoteIndisponivel(f"O lote {lote.numero_lote} ({lote.veiculo_id}) não está mais disponível.")
+        lote.status = lote._status_publicado = 'ARREMATADO'
+        publicar_eventos([evento_status_lote(lote.leilao_id, lote.id, lote.numero_lote, lote.veiculo_id, 'ARREMATADO')])
+        registrar_transicoes([transicao_status(lote.id, lote.leilao_id, 'DISPONIVEL', 'ARREMATADO')])
+        # Os sinais de Arremate cuidam do resumo diário, do cache e do evento ARREMATE.
+        return Arremate.objects.create(
+            lote=lote, cpf_cliente=cpf_cliente.replace('.', '').replace('-', '').replace('/', '').strip(),
+            nome_cliente=nome_cliente, valor_arremate=valor_arremate, data_arremate=data_arremate,
+        )
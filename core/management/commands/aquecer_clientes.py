@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.clientes import obter_diretorio, ErroAutenticacao
+from core.models import Leilao
+
+class Command(BaseCommand):
+    help = 'Pré-carrega no cache os nomes de todos os clientes que visitaram um leilão (consulta à API externa).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('leilao_id', type=int)
+
+    def handle(self, *args, **options):
+        leilao = Leilao.objects.filter(id=options['leilao_id']).first()
+        if not leilao: raise CommandError('Leilão não encontrado.')
+        try:
+            consultados = obter_diretorio().aquecer_cache_leilao(leilao)
+        except ErroAutenticacao as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'{consultados} documentos consultados para o leilão {leilao.nome_evento}.'))
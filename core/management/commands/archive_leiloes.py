@@ -0,0 +1,20 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from core.arquivamento import LeilaoEmAndamento, arquivar_leilao, leiloes_para_arquivar
+
+class Command(BaseCommand):
+    help = 'Arquiva os leilões encerrados anteriores à data (nenhum lote arrematado ainda por retirar): visitas, lotes, arremates e histórico vão para CSVs compactados e saem do banco.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, required=True, metavar='AAAA-MM-DD', help='Arquiva os leilões encerrados com data principal anterior a esta.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for leilao in leiloes_para_arquivar(options['before']):
+            try:
+                arquivamento = arquivar_leilao(leilao); total += 1
+            except LeilaoEmAndamento as erro:
+                # Um lote mudou depois da seleção: o leilão fica para a próxima execução.
+                self.stdout.write(self.style.WARNING(str(erro))); continue
+            self.stdout.write(f"{leilao.nome_evento}: {arquivamento.lotes} lotes, {arquivamento.visitas} visitas e {arquivamento.arremates} arremates arquivados em {arquivamento.pasta}.")
+        self.stdout.write(self.style.SUCCESS(f'{total} leilões arquivados.'))
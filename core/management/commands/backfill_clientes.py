@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.clientes import backfill_clientes
+
+class Command(BaseCommand):
+    help = 'Cria o cadastro local de clientes a partir das visitas e arremates e liga essas linhas ao cliente.'
+
+    def handle(self, *args, **options):
+        criados, visitas, arremates = backfill_clientes()
+        self.stdout.write(self.style.SUCCESS(f'{criados} clientes criados; {visitas} visitas e {arremates} arremates ligados.'))
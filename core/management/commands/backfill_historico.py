@@ -0,0 +1,8 @@
+from django.core.management.base import BaseCommand
+from core.historico import backfill_historico
+
+class Command(BaseCommand):
+    help = 'Cria o evento inicial do histórico de status para os lotes cadastrados antes do histórico existir.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'{backfill_historico()} eventos de histórico criados.'))
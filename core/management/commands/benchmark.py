@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmark import LINHAS_UPLOAD, comparar_relatorios, medir_inicializacao, medir_views
+from core.models import Leilao
+
+class Command(BaseCommand):
+    help = ('Mede as views mais pesadas (dashboards, listagem, upload, exportação e gestão de lotes) pelo cliente de '
+            'testes do Django e gera um relatório JSON com p50/p95, número de consultas e pico de memória, além do '
+            'tempo de inicialização (python -X importtime) do manage.py e da aplicação WSGI.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=10, help='Execuções medidas por cenário (além de uma de aquecimento).')
+        parser.add_argument('--leilao', type=int, help='Leilão usado nos cenários por leilão (padrão: o que tem mais lotes).')
+        parser.add_argument('--cenario', action='append', dest='cenarios', help='Mede apenas o cenário informado, ex.: dashboard ou dashboard[mes] (pode repetir).')
+        parser.add_argument('--linhas-upload', type=int, default=LINHAS_UPLOAD, help='Linhas da planilha enviada no cenário de importação.')
+        parser.add_argument('--cache-quente', action='store_true', help='Não limpa o cache entre as requisições (mede o caminho com cache).')
+        parser.add_argument('--saida', help='Arquivo onde gravar o relatório JSON (padrão: saída padrão).')
+        parser.add_argument('--sem-inicializacao', action='store_true', help='Não mede o tempo de inicialização.')
+        parser.add_argument('--comparar', help='Relatório JSON anterior para comparar com esta execução.')
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1: raise CommandError('--repeticoes deve ser pelo menos 1.')
+        leilao = None
+        if options['leilao']:
+            leilao = Leilao.objects.filter(id=options['leilao']).first()
+            if not leilao: raise CommandError('Leilão não encontrado.')
+        base = None
+        if options['comparar']:
+            try: base = json.loads(Path(options['comparar']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e: raise CommandError(f'Não foi possível ler {options["comparar"]}: {e}')
+        try:
+            relatorio = medir_views(
+                options['repeticoes'], leilao, frio=not options['cache_quente'], linhas_upload=options['linhas_upload'],
+                apenas=options['cenarios'], progresso=lambda nome, r: self.stderr.write(f"{nome}: p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms, {r['consultas']} consultas, {r['pico_memoria_kb']} KB"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not options['sem_inicializacao']:
+            relatorio['inicializacao'] = medir_inicializacao()
+            for nome, medida in relatorio['inicializacao'].items():
+                pesados = ', '.join(medida['modulos_pesados']) or 'nenhum'
+                self.stderr.write(f"inicializacao[{nome}]: {medida['total_ms']} ms, módulos pesados: {pesados}")
+        conteudo = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            Path(options['saida']).write_text(conteudo + '\n', encoding='utf-8')
+            self.stderr.write(self.style.SUCCESS(f"Relatório gravado em {options['saida']}."))
+        else:
+            self.stdout.write(conteudo)
+        if base:
+            if base.get('banco') != relatorio['banco']:
+                self.stderr.write(self.style.WARNING(f"Perfis de banco diferentes: {base.get('banco')} x {relatorio['banco']}."))
+            # A comparação vai para stderr, para não misturar com o JSON da saída padrão.
+            for nome, metricas in comparar_relatorios(base, relatorio):
+                variacoes = ', '.join(f'{metrica} {antes} -> {depois} ({"n/d" if variacao is None else f"{variacao:+}%"})' for metrica, (antes, depois, variacao) in metricas.items())
+                self.stderr.write(f'{nome}: {variacoes}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.feed import RETENCAO_EVENTOS_DIAS, podar_eventos
+
+class Command(BaseCommand):
+    help = 'Remove os eventos do feed ao vivo (EventoLeilao) mais antigos que a retenção.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=RETENCAO_EVENTOS_DIAS, help='Mantém os eventos dos últimos N dias.')
+
+    def handle(self, *args, **options):
+        total = podar_eventos(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{total} eventos removidos.'))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from core.jobs import reservar_proximo_job, executar_job
+
+class Command(BaseCommand):
+    help = 'Worker da fila de jobs (importações e exportações): consulta a tabela Job e executa os pendentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera entre consultas quando a fila está vazia.')
+        parser.add_argument('--uma-vez', action='store_true', help='Processa os jobs pendentes e encerra.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Worker de jobs iniciado.')
+        while True:
+            job = reservar_proximo_job()
+            if job is None:
+                if options['uma_vez']: break
+                time.sleep(options['intervalo']); continue
+            self.stdout.write(f'Executando {job}...')
+            job = executar_job(job)
+            self.stdout.write(f'{job}: {job.mensagem}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.resumos import reconstruir_resumos
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos diários (visitas, arremates e totais por comitente) usados pelos dashboards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leilao', type=int, action='append', dest='leiloes', help='Reconstrói apenas o leilão informado (pode repetir).')
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumos(options['leiloes'])
+        self.stdout.write(self.style.SUCCESS(f'{total} resumos diários reconstruídos.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmark import VOLUMES_PADRAO, limpar_benchmark, popular_banco, volumes_em_escala
+
+class Command(BaseCommand):
+    help = ('Gera uma massa de dados em volume realista para o benchmark das views (por padrão 200 leilões, '
+            '500 mil lotes, 2 milhões de visitas e 300 mil arremates, com clientes recorrentes).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0, help='Fator aplicado a todos os volumes padrão (ex.: 0.01 para uma massa pequena).')
+        for nome, valor in VOLUMES_PADRAO.items():
+            parser.add_argument(f'--{nome}', type=int, help=f'Quantidade de {nome} (padrão: {valor} x escala).')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório (a mesma semente gera a mesma massa).')
+        parser.add_argument('--limpar', action='store_true', help='Remove a massa de benchmark existente antes de gerar outra.')
+        parser.add_argument('--apenas-limpar', action='store_true', help='Remove a massa de benchmark existente e encerra.')
+
+    def handle(self, *args, **options):
+        if options['limpar'] or options['apenas_limpar']:
+            self.stdout.write(f'{limpar_benchmark()} leilões de benchmark removidos.')
+            if options['apenas_limpar']: return
+        volumes = volumes_em_escala(options['escala'], **{nome: options[nome] for nome in VOLUMES_PADRAO})
+        self.stdout.write('Gerando ' + ', '.join(f'{valor} {nome}' for nome, valor in volumes.items()) + '...')
+        try:
+            totais = popular_banco(volumes, options['semente'], progresso=lambda feitos, total: self.stdout.write(f'  {feitos}/{total} leilões'))
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{totais['leiloes']} leilões, {totais['lotes']} lotes, {totais['visitas']} visitas, "
+            f"{totais['arremates']} arremates e {totais['clientes']} clientes gerados."
+        ))
@@ -38,32 +38,200 @@ class Lote(models.Model):
     numero_lote = models.PositiveIntegerField(verbose_name="Número do Lote")
     lance_inicial = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     proporcao_fipe = models.CharField(max_length=20, verbose_name="Valor FIPE", blank=True)
+    # proporcao_fipe convertido em valor (core/conversao.py: valor_fipe), na importação e no save().
+    valor_fipe = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, verbose_name="Valor FIPE (R$)")
     status = models.CharField(max_length=25, choices=STATUS_CHOICES, default='DISPONIVEL')
 
     class Meta:
         # Garante que um mesmo veículo não possa ter o mesmo número de lote no mesmo leilão.
         unique_together = ('leilao', 'numero_lote')
         ordering = ['numero_lote']
+        # Índices dos filtros mais usados pelas views (verificados por PlanoDeConsultaTests em core/tests.py).
+        indexes = [
+            models.Index(fields=['leilao', 'status', 'numero_lote']),
+            # Terminam em (leilao, numero_lote), a ordem da listagem paginada por cursor.
+            models.Index(fields=['comitente', 'leilao', 'numero_lote']),
+            models.Index(fields=['status', 'leilao', 'numero_lote']),
+            # Parcial: só os lotes à venda, já na ordem de exibição.
+            models.Index(fields=['numero_lote'], condition=models.Q(status='DISPONIVEL'), name='core_lote_disponivel_idx'),
+        ]
 
     def __str__(self):
-        return f"Lote {self.numero_lote} ({self.veiculo.placa}) no Leilão '{self.leilao.nome_evento}'"
+        # veiculo_id já é a placa (chave primária do Veiculo), sem consultar a tabela de veículos.
+        return f"Lote {self.numero_lote} ({self.veiculo_id}) no Leilão '{self.leilao.nome_evento}'"
 
 
+# Cadastro local de clientes, chaveado pelo documento normalizado (só dígitos/letras, sem pontuação).
+# Alimentado pelas visitas, arremates e consultas à API externa (core/clientes.py).
+class Cliente(models.Model):
+    documento = models.CharField(max_length=18, unique=True, verbose_name="CPF/CNPJ")
+    nome = models.CharField(max_length=255, blank=True)
+    # Nome em minúsculas e sem acentos, para a busca por prefixo usar o índice.
+    nome_busca = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['nome']
+
+    def __str__(self): return f"{self.nome} ({self.documento})"
+
 class Visita(models.Model):
     leilao = models.ForeignKey(Leilao, on_delete=models.CASCADE, related_name="visitas")
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name="visitas")
     cpf_cliente = models.CharField(max_length=18, verbose_name="CPF/CNPJ do Cliente")
     nome_cliente = models.CharField(max_length=255, verbose_name="Nome do Cliente", blank=True, null=True)
     data_visita = models.DateTimeField(auto_now_add=True, verbose_name="Data e Hora da Visita")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['leilao', 'data_visita']),
+            models.Index(fields=['data_visita']),
+            models.Index(fields=['cpf_cliente']),
+        ]
+
     def __str__(self): return f"Visita de {self.cpf_cliente} ao leilão '{self.leilao.nome_evento}'"
 
 # --- MODELO ARREMATE ATUALIZADO ---
 class Arremate(models.Model):
     # Agora um arremate está ligado a um LOTE específico, não a um VEÍCULO genérico.
     lote = models.OneToOneField(Lote, on_delete=models.CASCADE, related_name="arremate")
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name="arremates")
     cpf_cliente = models.CharField(max_length=18, verbose_name="CPF/CNPJ do Cliente")
     nome_cliente = models.CharField(max_length=255, verbose_name="Nome do Cliente", blank=True, null=True)
     valor_arremate = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Valor do Arremate")
     data_arremate = models.DateTimeField(verbose_name="Data do Arremate", default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_arremate']),
+            models.Index(fields=['cpf_cliente']),
+        ]
+
     def __str__(self):
-        return f"Arremate do {self.lote} por {self.nome_cliente}"
\ No newline at end of file
+        return f"Arremate do {self.lote} por {self.nome_cliente}"
+
+# --- RESUMOS DIÁRIOS (ROLLUPS) PARA OS DASHBOARDS ---
+# Mantidos incrementalmente pelos sinais de Visita/Arremate (core/signals.py) e reconstruídos
+# pelo comando "manage.py reconstruir_resumos".
+class ResumoDiarioLeilao(models.Model):
+    leilao = models.ForeignKey(Leilao, on_delete=models.CASCADE, related_name='resumos_diarios')
+    dia = models.DateField()
+    visitas = models.PositiveIntegerField(default=0)
+    cpfs_distintos = models.PositiveIntegerField(default=0, verbose_name="Visitantes Distintos")
+    arremates = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('leilao', 'dia')
+        ordering = ['dia']
+        # Os dashboards gerais filtram só por período, de todos os leilões.
+        indexes = [models.Index(fields=['dia'])]
+
+    def __str__(self): return f"Resumo de {self.dia:%d/%m/%Y} do leilão {self.leilao_id}"
+
+class ResumoDiarioComitente(models.Model):
+    leilao = models.ForeignKey(Leilao, on_delete=models.CASCADE, related_name='resumos_comitentes')
+    comitente = models.ForeignKey(Comitente, on_delete=models.CASCADE, related_name='resumos_diarios')
+    dia = models.DateField()
+    arremates = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('leilao', 'dia', 'comitente')
+        ordering = ['dia']
+
+    def __str__(self): return f"Resumo de {self.dia:%d/%m/%Y} do comitente {self.comitente_id} no leilão {self.leilao_id}"
+
+
+# --- FEED AO VIVO DO LEILÃO ---
+# Log de eventos (mudanças de status de lote e novos arremates) lido pelo feed SSE/long-poll.
+class EventoLeilao(models.Model):
+    TIPO_CHOICES = [
+        ('LOTE_STATUS', 'Mudança de Status do Lote'),
+        ('ARREMATE', 'Novo Arremate'),
+    ]
+
+    leilao = models.ForeignKey(Leilao, on_delete=models.CASCADE, related_name='eventos')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    dados = models.JSONField(default=dict)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        # criado_em: janela de eventos atrasados do feed e limpeza dos antigos (limpar_eventos).
+        indexes = [models.Index(fields=['leilao', 'id']), models.Index(fields=['criado_em'])]
+
+    def __str__(self): return f"{self.get_tipo_display()} no leilão {self.leilao_id} (#{self.pk})"
+
+
+# --- HISTÓRICO DE STATUS DOS LOTES (core/historico.py) ---
+# Log só de inclusão: uma linha por mudança de status, gravada na mesma transação da mudança.
+# status_anterior vazio indica a criação do lote. leilao repete lote.leilao para o índice por período.
+class HistoricoStatusLote(models.Model):
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='historico_status')
+    leilao = models.ForeignKey(Leilao, on_delete=models.CASCADE, related_name='historico_status_lotes')
+    status_anterior = models.CharField(max_length=25, choices=Lote.STATUS_CHOICES, blank=True)
+    status = models.CharField(max_length=25, choices=Lote.STATUS_CHOICES)
+    momento = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['leilao', 'momento']),
+            # Próximo evento do mesmo lote (tempo de permanência) e último até um instante.
+            models.Index(fields=['lote', 'momento']),
+        ]
+
+    def __str__(self): return f"Lote {self.lote_id}: {self.status_anterior or '-'} -> {self.status} em {self.momento:%d/%m/%Y %H:%M}"
+
+# --- LEILÕES ARQUIVADOS (core/arquivamento.py) ---
+# Resumo que fica no banco quando as visitas, lotes, arremates e histórico de um leilão encerrado
+# vão para os arquivos em settings.ARQUIVO_LEILOES_DIR. Os resumos diários do leilão continuam no banco.
+class LeilaoArquivado(models.Model):
+    leilao = models.OneToOneField(Leilao, on_delete=models.CASCADE, primary_key=True, related_name='arquivamento')
+    pasta = models.CharField(max_length=100, verbose_name="Pasta do Arquivo")
+    arquivado_em = models.DateTimeField(default=timezone.now)
+    visitas = models.PositiveIntegerField(default=0)
+    visitantes = models.PositiveIntegerField(default=0, verbose_name="Visitantes Distintos")
+    lotes = models.PositiveIntegerField(default=0)
+    arremates = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Leilões arquivados"
+
+    def __str__(self): return f"Leilão {self.leilao_id} arquivado em {self.arquivado_em:%d/%m/%Y}"
+
+# --- FILA DE TAREFAS EM SEGUNDO PLANO ---
+class Job(models.Model):
+    TIPO_CHOICES = [
+        ('IMPORTACAO', 'Importação de Planilha'),
+        ('EXPORTACAO', 'Exportação de Veículos'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Em Execução'),
+        ('CONCLUIDO', 'Concluído'),
+        ('ERRO', 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    parametros = models.JSONField(default=dict, blank=True)
+    arquivo_entrada = models.FileField(upload_to='jobs/entrada/', blank=True)
+    arquivo_resultado = models.FileField(upload_to='jobs/resultado/', blank=True)
+    progresso = models.PositiveIntegerField(default=0, verbose_name="Linhas Processadas")
+    mensagem = models.TextField(blank=True)
+    erros = models.JSONField(default=list, blank=True)
+    criado_por = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    # Sinal de vida do worker: renovado a cada atualização de progresso (core/jobs.py).
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    tentativas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-criado_em']
+        indexes = [models.Index(fields=['status', 'criado_em'])]
+
+    def __str__(self): return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,51 @@
+# Arquivo: core/paginacao.py
+# Paginação por cursor (keyset): em vez de COUNT(*) + OFFSET, cada página continua a partir da
+# chave da última linha da página anterior, com uma busca no índice. A página 500 custa o mesmo
+# que a primeira. O cursor é opaco para o usuário (JSON em base64).
+import base64
+import json
+from django.db.models import Q
+
+TAMANHO_PAGINA = 25
+
+def codificar_cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(list(valores)).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, quantidade):
+    # Devolve a lista de valores do cursor, ou None se ele for inválido.
+    if not cursor: return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != quantidade or not all(isinstance(v, int) for v in valores): return None
+    return valores
+
+def _apos(campos, valores, operador):
+    # (a, b) > (x, y) escrito como a >= x AND (a > x OR b > y): o primeiro termo delimita a busca no
+    # índice, ao contrário de um OR puro.
+    campo, valor = campos[0], valores[0]
+    if len(campos) == 1: return Q(**{f'{campo}__{operador}': valor})
+    return Q(**{f'{campo}__{operador}e': valor}) & (Q(**{f'{campo}__{operador}': valor}) | _apos(campos[1:], valores[1:], operador))
+
+class PaginaCursor:
+    def __init__(self, itens, cursor_anterior, cursor_proxima):
+        self.itens = itens; self.cursor_anterior = cursor_anterior; self.cursor_proxima = cursor_proxima
+
+    def __iter__(self): return iter(self.itens)
+    def __len__(self): return len(self.itens)
+
+def paginar_por_cursor(queryset, campos, depois=None, antes=None, tamanho=TAMANHO_PAGINA):
+    # campos: colunas inteiras, em ordem crescente, que juntas identificam a linha (ex.: leilão + lote).
+    chave = lambda item: [getattr(item, campo) for campo in campos]
+    valores_antes = decodificar_cursor(antes, len(campos))
+    if valores_antes is not None:
+        itens = list(queryset.filter(_apos(campos, valores_antes, 'lt')).order_by(*[f'-{campo}' for campo in campos])[:tamanho + 1])
+        tem_anterior = len(itens) > tamanho; itens = itens[:tamanho][::-1]
+        return PaginaCursor(itens, codificar_cursor(chave(itens[0])) if tem_anterior else None, codificar_cursor(chave(itens[-1])) if itens else None)
+    valores_depois = decodificar_cursor(depois, len(campos))
+    if valores_depois is not None: queryset = queryset.filter(_apos(campos, valores_depois, 'gt'))
+    itens = list(queryset.order_by(*campos)[:tamanho + 1])
+    tem_proxima = len(itens) > tamanho; itens = itens[:tamanho]
+    anterior = codificar_cursor(chave(itens[0])) if valores_depois is not None and itens else None
+    return PaginaCursor(itens, anterior, codificar_cursor(chave(itens[-1])) if tem_proxima else None)
@@ -0,0 +1,236 @@
+# Arquivo: core/perfil.py
+# Perfil das requisições em produção (opt-in, ligado por PERFIL_REQUISICOES no settings): por
+# requisição, a view resolvida, o tempo total, as consultas SQL (quantidade, tempo e as mais
+# lentas, via execute_wrappers das conexões) e o tempo de renderização dos templates.
+# Funciona nas views síncronas e nas assíncronas; respostas em streaming (SSE) e o long-poll do
+# feed não entram nos histogramas, pois o tempo delas é o da espera por eventos.
+# Cada processo agrega histogramas por view, lidos no endpoint de staff api/perfil/; uma amostra
+# das requisições (e todas as lentas) vai para o log "core.perfil". Com o cabeçalho X-Perfil,
+# um usuário staff recebe o cProfile (ou pyinstrument, se instalado) daquela única requisição.
+import contextvars
+import cProfile
+import heapq
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.template.backends.django import Template as TemplateDjango
+from django.utils import timezone
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) das faixas dos histogramas; a última faixa é "acima de 5000 ms".
+FAIXAS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+TAMANHO_SQL_REGISTRADO = 500
+LINHAS_CPROFILE = 60
+# Views de long-poll: a resposta espera por eventos novos, então o tempo não é de processamento.
+VIEWS_SEM_MEDICAO = {'eventos_api', 'eventos_leilao_api'}
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+_registro_atual = contextvars.ContextVar('perfil_registro', default=None)
+
+class RegistroRequisicao:
+    __slots__ = ('consultas', 'tempo_sql', 'tempo_templates', 'mais_lentas', 'limite_lentas')
+
+    def __init__(self, limite_lentas):
+        self.consultas = 0; self.tempo_sql = 0.0; self.tempo_templates = 0.0
+        self.mais_lentas = []; self.limite_lentas = limite_lentas
+
+    def __call__(self, execute, sql, params, many, context):
+        # Assinatura de connection.execute_wrapper.
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.consultas += 1; self.tempo_sql += duracao
+            # Heap mínimo de tamanho fixo com as consultas mais lentas; o contador desempata.
+            item = (duracao, self.consultas, sql[:TAMANHO_SQL_REGISTRADO])
+            if len(self.mais_lentas) < self.limite_lentas: heapq.heappush(self.mais_lentas, item)
+            elif self.limite_lentas: heapq.heappushpop(self.mais_lentas, item)
+
+    def consultas_lentas(self):
+        return [{'ms': round(duracao * 1000, 2), 'sql': sql} for duracao, _, sql in sorted(self.mais_lentas, reverse=True)]
+
+# --- CONSULTAS SQL ---
+# Um wrapper fixo em cada conexão, que só mede quando há uma requisição em andamento no contexto.
+# Pelo contextvar, vale também para as consultas das views assíncronas, que rodam em outra thread
+# (sync_to_async) com a conexão daquela thread.
+
+def _medir_sql(execute, sql, params, many, context):
+    registro = _registro_atual.get()
+    if registro is None: return execute(sql, params, many, context)
+    return registro(execute, sql, params, many, context)
+
+def _instalar_na_conexao(connection, **kwargs):
+    if _medir_sql not in connection.execute_wrappers: connection.execute_wrappers.append(_medir_sql)
+
+def instalar_medicao_sql():
+    connection_created.connect(_instalar_na_conexao, dispatch_uid='core.perfil.medir_sql')
+    for conexao in connections.all(initialized_only=True): _instalar_na_conexao(conexao)
+
+# --- TEMPO DE TEMPLATES ---
+# Só o render de nível mais alto (o do backend) é medido: includes e herança já estão dentro dele.
+# Consultas de querysets avaliados no template entram também no tempo de templates.
+
+_render_original = None
+_trava_instalacao = threading.Lock()
+
+def _render_medido(self, *args, **kwargs):
+    registro = _registro_atual.get()
+    if registro is None: return _render_original(self, *args, **kwargs)
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, *args, **kwargs)
+    finally:
+        registro.tempo_templates += time.perf_counter() - inicio
+
+def instalar_medicao_templates():
+    global _render_original
+    with _trava_instalacao:
+        if _render_original is None:
+            _render_original = TemplateDjango.render
+            TemplateDjango.render = _render_medido
+
+# --- HISTOGRAMAS POR VIEW (por processo) ---
+
+class Histogramas:
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self.trava:
+            self.views = {}; self.desde = timezone.now()
+
+    def registrar(self, view, tempo_ms, registro):
+        faixa = next((indice for indice, limite in enumerate(FAIXAS_MS) if tempo_ms <= limite), len(FAIXAS_MS))
+        with self.trava:
+            dados = self.views.get(view)
+            if dados is None:
+                dados = self.views[view] = {'requisicoes': 0, 'faixas': [0] * (len(FAIXAS_MS) + 1), 'tempo_ms': 0.0, 'max_ms': 0.0, 'consultas': 0, 'sql_ms': 0.0, 'templates_ms': 0.0}
+            dados['requisicoes'] += 1; dados['faixas'][faixa] += 1
+            dados['tempo_ms'] += tempo_ms; dados['max_ms'] = max(dados['max_ms'], tempo_ms)
+            dados['consultas'] += registro.consultas
+            dados['sql_ms'] += registro.tempo_sql * 1000; dados['templates_ms'] += registro.tempo_templates * 1000
+
+    @staticmethod
+    def _percentil(faixas, total, percentual):
+        # Limite superior da faixa que contém o percentil (None se cair na última faixa, sem limite).
+        acumulado = 0
+        for indice, quantidade in enumerate(faixas):
+            acumulado += quantidade
+            if acumulado * 100 >= total * percentual: return FAIXAS_MS[indice] if indice < len(FAIXAS_MS) else None
+        return None
+
+    def resumo(self):
+        with self.trava:
+            views = {nome: dict(dados, faixas=list(dados['faixas'])) for nome, dados in self.views.items()}
+            desde = self.desde
+        resultado = {}
+        for nome, dados in sorted(views.items(), key=lambda item: -item[1]['tempo_ms']):
+            total = dados['requisicoes']
+            resultado[nome] = {
+                'requisicoes': total,
+                'histograma': dict(zip([f'<={limite}ms' for limite in FAIXAS_MS] + [f'>{FAIXAS_MS[-1]}ms'], dados['faixas'])),
+                'p50_ms': self._percentil(dados['faixas'], total, 50), 'p95_ms': self._percentil(dados['faixas'], total, 95),
+                'media_ms': round(dados['tempo_ms'] / total, 2), 'max_ms': round(dados['max_ms'], 2),
+                'consultas_media': round(dados['consultas'] / total, 2),
+                'sql_media_ms': round(dados['sql_ms'] / total, 2), 'templates_media_ms': round(dados['templates_ms'] / total, 2),
+            }
+        return {'processo': os.getpid(), 'desde': desde.isoformat(timespec='seconds'), 'views': resultado}
+
+histogramas = Histogramas()
+
+# --- PERFIL DE UMA REQUISIÇÃO (cProfile / pyinstrument) ---
+
+CABECALHO_PERFIL = 'X-Perfil'
+
+def _resposta_cprofile(perfilador):
+    saida = io.StringIO()
+    pstats.Stats(perfilador, stream=saida).sort_stats('cumulative').print_stats(LINHAS_CPROFILE)
+    return HttpResponse(saida.getvalue(), content_type='text/plain; charset=utf-8')
+
+class PerfilRequisicoesMiddleware:
+    # Síncrono e assíncrono: primeiro da lista, um middleware só síncrono faria o Django adaptar
+    # toda a pilha, e cada fluxo do feed ao vivo ocuparia uma thread enquanto estivesse aberto.
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response): markcoroutinefunction(self)
+        self.amostragem = _configuracao('PERFIL_AMOSTRAGEM', 0.01)
+        self.limite_lento_ms = _configuracao('PERFIL_LIMITE_LENTO_MS', 1000)
+        self.consultas_lentas = _configuracao('PERFIL_CONSULTAS_LENTAS', 5)
+        instalar_medicao_sql(); instalar_medicao_templates()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self): return self.__acall__(request)
+        registro, token, inicio = self._iniciar(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _registro_atual.reset(token)
+        return self._concluir(request, response, registro, inicio)
+
+    async def __acall__(self, request):
+        registro, token, inicio = self._iniciar(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _registro_atual.reset(token)
+        return self._concluir(request, response, registro, inicio)
+
+    def _iniciar(self, request):
+        registro = RegistroRequisicao(self.consultas_lentas)
+        request._perfilador = None
+        return registro, _registro_atual.set(registro), time.perf_counter()
+
+    def _concluir(self, request, response, registro, inicio):
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        if request._perfilador is not None: return self._encerrar_perfilador(request._perfilador)
+        view = request.resolver_match.view_name if request.resolver_match else 'nao_resolvida'
+        # Em streaming, o tempo medido é só o dos cabeçalhos; no long-poll, o da espera.
+        if response.streaming or view in VIEWS_SEM_MEDICAO: return response
+        histogramas.registrar(view, tempo_ms, registro)
+        if tempo_ms >= self.limite_lento_ms or random.random() < self.amostragem:
+            logger.info(json.dumps({
+                'view': view, 'metodo': request.method, 'caminho': request.path, 'status': response.status_code,
+                'tempo_ms': round(tempo_ms, 2), 'consultas': registro.consultas, 'sql_ms': round(registro.tempo_sql * 1000, 2),
+                'templates_ms': round(registro.tempo_templates * 1000, 2), 'consultas_lentas': registro.consultas_lentas(),
+            }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Aqui o usuário já está autenticado: só staff pode pedir o perfil de uma requisição.
+        modo = request.headers.get(CABECALHO_PERFIL, '').lower()
+        if not modo or not request.user.is_staff: return None
+        if modo == 'pyinstrument' and PyinstrumentProfiler is not None:
+            request._perfilador = PyinstrumentProfiler(); request._perfilador.start()
+        else:
+            request._perfilador = cProfile.Profile(); request._perfilador.enable()
+        return None
+
+    @staticmethod
+    def _encerrar_perfilador(perfilador):
+        # O perfil substitui a resposta da view.
+        if isinstance(perfilador, cProfile.Profile):
+            perfilador.disable(); return _resposta_cprofile(perfilador)
+        perfilador.stop()
+        return HttpResponse(perfilador.output_text(unicode=True), content_type='text/plain; charset=utf-8')
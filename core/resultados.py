@@ -0,0 +1,170 @@
+# Arquivo: core/resultados.py
+# Importação da planilha de resultados de um leilão online: cada linha é uma venda (lote ou placa,
+# CPF/CNPJ, nome, valor e data). A conciliação casa as linhas com os lotes do leilão usando uma
+# única consulta e devolve a prévia (vendas a registrar, linhas sem correspondência, conflitos e
+# inválidas). Ao aplicar, todos os arremates e as mudanças de status são gravados em massa, em uma
+# transação: ou a planilha inteira entra, ou nada entra.
+# Importado só pela view de resultados: core.importacao (leitura em blocos) carrega o pandas.
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .cache_dashboard import invalidar_apos_commit
+from .clientes import normalizar_documento, resolver_clientes
+from .conversao import _clean_decimal
+from .feed import evento_status_lote, publicar_eventos
+from .historico import registrar_transicoes, transicao_status
+from .importacao import TAMANHO_BLOCO_LEITURA, TAMANHO_LOTE_BULK, ler_planilha_em_blocos
+from .lotes import LoteIndisponivel, _data_arremate
+from .models import Arremate, EventoLeilao, Lote
+from .resumos import agendar_recalculo, dia_local
+
+# Campo -> nomes de coluna aceitos (o primeiro encontrado na planilha é usado).
+COLUNAS_RESULTADOS = {
+    'numero_lote': ('LOTES', 'LOTE'),
+    'placa': ('PLACA',),
+    'documento': ('CPF/CNPJ', 'CPF', 'CNPJ'),
+    'nome': ('NOME', 'ARREMATANTE'),
+    'valor': ('VALOR', 'VALOR ARREMATE', 'LANCE VENCEDOR'),
+    'data': ('DATA', 'DATA ARREMATE'),
+}
+CENTAVO = Decimal('0.01')
+FORMATOS_DATA = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+Venda = namedtuple('Venda', 'linha lote_id numero_lote placa documento nome valor data')
+
+def _vazio(valor):
+    # None, texto vazio ou NaN (célula vazia lida pelo pandas).
+    return valor is None or valor != valor or (isinstance(valor, str) and not valor.strip())
+
+def _numero_lote(valor):
+    if _vazio(valor): return None
+    try: numero = float(str(valor).strip().replace(',', '.'))
+    except ValueError: raise ValueError(f"Número do lote inválido: {valor}")
+    if numero < 0 or numero != int(numero): raise ValueError(f"Número do lote inválido: {valor}")
+    return int(numero)
+
+def _documento(valor):
+    if _vazio(valor): return ''
+    if isinstance(valor, (int, float)) or hasattr(valor, 'dtype'):
+        # CPF/CNPJ lido como número perde os zeros à esquerda.
+        documento = str(int(valor))
+        return documento.zfill(11) if len(documento) <= 11 else documento.zfill(14)
+    return normalizar_documento(str(valor))
+
+def _data_resultado(valor):
+    if _vazio(valor): return timezone.now()
+    if isinstance(valor, date) and not isinstance(valor, datetime): valor = datetime.combine(valor, datetime.min.time())
+    if isinstance(valor, str):
+        for formato in FORMATOS_DATA:
+            try: valor = datetime.strptime(valor.strip(), formato); break
+            except ValueError: continue
+        else:
+            valor = valor.strip()
+    if hasattr(valor, 'to_pydatetime'): valor = valor.to_pydatetime()
+    return _data_arremate(valor)
+
+def _colunas(df):
+    cabecalho = {str(coluna).strip().upper(): coluna for coluna in df.columns}
+    return {campo: next((cabecalho[nome] for nome in nomes if nome in cabecalho), None) for campo, nomes in COLUNAS_RESULTADOS.items()}
+
+def _lotes_do_leilao(leilao):
+    # Uma consulta para o leilão inteiro (com o arremate já registrado, se houver): a memória usada
+    # depende da quantidade de lotes do leilão, não do tamanho da planilha.
+    por_numero = {}; por_placa = defaultdict(list)
+    for lote in Lote.objects.filter(leilao=leilao).values_list('id', 'numero_lote', 'veiculo_id', 'status', 'arremate__cpf_cliente', 'arremate__valor_arremate').iterator():
+        por_numero[lote[1]] = lote; por_placa[lote[2]].append(lote)
+    return por_numero, por_placa
+
+def conciliar_resultados(arquivo, nome_arquivo, leilao, aplicar=False, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    # Devolve o relatório da conciliação; com aplicar=True grava as vendas encontradas.
+    # Linhas que já correspondem a um arremate registrado (mesmo documento e valor) são contadas
+    # como "ja_registradas" e ignoradas, o que torna seguro reenviar a mesma planilha.
+    por_numero, por_placa = _lotes_do_leilao(leilao)
+    relatorio = {'linhas': 0, 'vendas': [], 'ja_registradas': 0, 'sem_correspondencia': [], 'conflitos': [], 'invalidas': [], 'valor_total': Decimal('0.00'), 'gravadas': 0}
+    linha_do_lote = {}
+    for df in ler_planilha_em_blocos(arquivo, nome_arquivo, tamanho_bloco):
+        colunas = _colunas(df)
+        if colunas['numero_lote'] is None and colunas['placa'] is None:
+            raise ValueError('A planilha precisa de uma coluna LOTES ou PLACA.')
+        valores = {campo: df[coluna].tolist() if coluna is not None else [None] * len(df) for campo, coluna in colunas.items()}
+        for posicao, linha in enumerate(df.index):
+            relatorio['linhas'] += 1
+            _conciliar_linha(linha, {campo: lista[posicao] for campo, lista in valores.items()}, por_numero, por_placa, linha_do_lote, relatorio)
+    if aplicar and relatorio['vendas']:
+        relatorio['gravadas'] = registrar_vendas(leilao, relatorio['vendas'])
+    return relatorio
+
+def _conciliar_linha(linha, dados, por_numero, por_placa, linha_do_lote, relatorio):
+    prefixo = f"Linha {linha}:"
+    placa = '' if _vazio(dados['placa']) else str(dados['placa']).strip().upper()
+    try: numero = _numero_lote(dados['numero_lote'])
+    except ValueError as e: relatorio['invalidas'].append(f"{prefixo} {e}"); return
+    if numero is None and not placa:
+        relatorio['invalidas'].append(f"{prefixo} sem número do lote e sem placa."); return
+    # Casamento pelo número do lote (conferindo a placa, se informada) ou só pela placa.
+    if numero is not None:
+        lote = por_numero.get(numero)
+        if lote is None:
+            relatorio['sem_correspondencia'].append(f"{prefixo} lote {numero} não existe neste leilão."); return
+        if placa and lote[2] != placa:
+            relatorio['conflitos'].append(f"{prefixo} o lote {numero} é da placa {lote[2]}, não {placa}."); return
+    else:
+        candidatos = por_placa.get(placa, [])
+        if not candidatos:
+            relatorio['sem_correspondencia'].append(f"{prefixo} placa {placa} não está em nenhum lote deste leilão."); return
+        if len(candidatos) > 1:
+            relatorio['conflitos'].append(f"{prefixo} a placa {placa} está em {len(candidatos)} lotes; informe o número do lote."); return
+        lote = candidatos[0]
+    lote_id, numero, placa, status, documento_registrado, valor_registrado = lote
+    if lote_id in linha_do_lote:
+        relatorio['conflitos'].append(f"{prefixo} lote {numero} repetido na planilha (já aparece na linha {linha_do_lote[lote_id]})."); return
+    linha_do_lote[lote_id] = linha
+    # Dados da venda.
+    documento = _documento(dados['documento'])
+    if len(documento) not in (11, 14) or not documento.isdigit():
+        relatorio['invalidas'].append(f"{prefixo} CPF/CNPJ inválido no lote {numero}."); return
+    valor = Decimal(str(_clean_decimal(dados['valor']))).quantize(CENTAVO)
+    if valor <= 0:
+        relatorio['invalidas'].append(f"{prefixo} valor do arremate inválido no lote {numero}."); return
+    try: data = _data_resultado(dados['data'])
+    except ValueError as e: relatorio['invalidas'].append(f"{prefixo} {e}"); return
+    if status != 'DISPONIVEL':
+        if documento_registrado == documento and valor_registrado == valor:
+            relatorio['ja_registradas'] += 1
+        else:
+            relatorio['conflitos'].append(f"{prefixo} o lote {numero} já está com status '{dict(Lote.STATUS_CHOICES).get(status, status)}'.")
+        return
+    nome = '' if _vazio(dados['nome']) else str(dados['nome']).strip()[:255]
+    relatorio['vendas'].append(Venda(linha, lote_id, numero, placa, documento, nome, valor, data))
+    relatorio['valor_total'] += valor
+
+def registrar_vendas(leilao, vendas):
+    # Grava as vendas em uma transação: UPDATE condicional dos status em blocos, bulk_create dos
+    # arremates e dos eventos do feed. Se algum lote deixou de estar DISPONIVEL desde a prévia,
+    # nada é gravado (LoteIndisponivel).
+    with transaction.atomic():
+        for inicio in range(0, len(vendas), TAMANHO_LOTE_BULK):
+            lote_ids = [venda.lote_id for venda in vendas[inicio:inicio + TAMANHO_LOTE_BULK]]
+            if Lote.objects.filter(id__in=lote_ids, status='DISPONIVEL').update(status='ARREMATADO') != len(lote_ids):
+                raise LoteIndisponivel('Algum lote da planilha foi vendido depois da conciliação; nada foi gravado. Confira a prévia novamente.')
+        # bulk_create não dispara os sinais de Arremate: cliente, feed, resumos e cache são tratados aqui.
+        clientes = resolver_clientes({venda.documento: venda.nome for venda in vendas})
+        Arremate.objects.bulk_create([
+            Arremate(lote_id=venda.lote_id, cliente_id=clientes.get(venda.documento), cpf_cliente=venda.documento,
+                     nome_cliente=venda.nome or None, valor_arremate=venda.valor, data_arremate=venda.data)
+            for venda in vendas
+        ], batch_size=TAMANHO_LOTE_BULK)
+        eventos = []
+        for venda in vendas:
+            eventos.append(evento_status_lote(leilao.id, venda.lote_id, venda.numero_lote, venda.placa, 'ARREMATADO'))
+            eventos.append(EventoLeilao(leilao_id=leilao.id, tipo='ARREMATE', dados={
+                'lote_id': venda.lote_id, 'numero_lote': venda.numero_lote, 'placa': venda.placa,
+                'nome_cliente': venda.nome or None, 'valor_arremate': str(venda.valor),
+            }))
+        publicar_eventos(eventos)
+        registrar_transicoes(transicao_status(venda.lote_id, leilao.id, 'DISPONIVEL', 'ARREMATADO') for venda in vendas)
+        for dia in {dia_local(venda.data) for venda in vendas}: agendar_recalculo(leilao.id, dia)
+        invalidar_apos_commit([leilao.id])
+    return len(vendas)
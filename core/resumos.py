@@ -0,0 +1,84 @@
+# Arquivo: core/resumos.py
+# Resumos diários por leilão (visitas, visitantes distintos, arremates, valor total e totais por
+# comitente). Os dashboards leem estas tabelas em vez de varrer Visita/Arremate a cada acesso.
+from datetime import datetime, time, timedelta
+from functools import partial
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .cache_dashboard import invalidar_apos_commit
+from .models import Leilao, Visita, Arremate, ResumoDiarioLeilao, ResumoDiarioComitente
+
+def dia_local(momento):
+    return timezone.localtime(momento).date()
+
+def intervalo_do_dia(dia):
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, inicio + timedelta(days=1)
+
+def recalcular_resumo(leilao_id, dia):
+    # Recalcula um único "balde" (leilão, dia) a partir das linhas daquele dia.
+    with transaction.atomic():
+        # A trava na linha do leilão enfileira os recálculos concorrentes do mesmo leilão, e as
+        # contagens, lidas depois dela, já incluem o que as transações anteriores gravaram.
+        if not Leilao.objects.select_for_update().filter(pk=leilao_id).exists(): return
+        inicio, fim = intervalo_do_dia(dia)
+        visitas = Visita.objects.filter(leilao_id=leilao_id, data_visita__gte=inicio, data_visita__lt=fim).aggregate(visitas=Count('id'), cpfs_distintos=Count('cpf_cliente', distinct=True))
+        por_comitente = list(
+            Arremate.objects.filter(lote__leilao_id=leilao_id, data_arremate__gte=inicio, data_arremate__lt=fim)
+            .values('lote__comitente_id').annotate(arremates=Count('id'), valor_total=Sum('valor_arremate'))
+        )
+        arremates = sum(linha['arremates'] for linha in por_comitente)
+        valor_total = sum(linha['valor_total'] for linha in por_comitente)
+        # Upserts (INSERT ... ON CONFLICT) em vez de apagar e recriar: nunca violam o unique_together.
+        if visitas['visitas'] or arremates:
+            ResumoDiarioLeilao.objects.bulk_create(
+                [ResumoDiarioLeilao(leilao_id=leilao_id, dia=dia, visitas=visitas['visitas'], cpfs_distintos=visitas['cpfs_distintos'], arremates=arremates, valor_total=valor_total)],
+                update_conflicts=True, unique_fields=['leilao', 'dia'], update_fields=['visitas', 'cpfs_distintos', 'arremates', 'valor_total'],
+            )
+        else:
+            ResumoDiarioLeilao.objects.filter(leilao_id=leilao_id, dia=dia).delete()
+        comitentes = [linha['lote__comitente_id'] for linha in por_comitente]
+        ResumoDiarioComitente.objects.filter(leilao_id=leilao_id, dia=dia).exclude(comitente_id__in=comitentes).delete()
+        ResumoDiarioComitente.objects.bulk_create([
+            ResumoDiarioComitente(leilao_id=leilao_id, dia=dia, comitente_id=linha['lote__comitente_id'], arremates=linha['arremates'], valor_total=linha['valor_total'])
+            for linha in por_comitente
+        ], update_conflicts=True, unique_fields=['leilao', 'dia', 'comitente'], update_fields=['arremates', 'valor_total'])
+
+def recalcular_resumos(baldes):
+    # Usado pelos caminhos em massa (bulk_create/update), que não disparam sinais.
+    for leilao_id, dia in set(baldes):
+        recalcular_resumo(leilao_id, dia)
+
+def agendar_recalculo(leilao_id, dia):
+    # Recalcula só depois do commit: evita trabalho em transações desfeitas e em exclusões em cascata.
+    transaction.on_commit(partial(recalcular_resumo, leilao_id, dia))
+
+def reconstruir_resumos(leilao_ids=None):
+    # Reconstrói todos os resumos (ou os dos leilões informados) com duas consultas agregadas.
+    visitas = Visita.objects.annotate(dia=TruncDate('data_visita')).values('leilao_id', 'dia').annotate(visitas=Count('id'), cpfs_distintos=Count('cpf_cliente', distinct=True)).order_by()
+    arremates = Arremate.objects.annotate(dia=TruncDate('data_arremate')).values('lote__leilao_id', 'lote__comitente_id', 'dia').annotate(arremates=Count('id'), valor_total=Sum('valor_arremate')).order_by()
+    # Os resumos dos leilões arquivados (core/arquivamento.py) ficam: as linhas não estão mais no banco.
+    resumos = ResumoDiarioLeilao.objects.filter(leilao__arquivamento__isnull=True)
+    resumos_comitentes = ResumoDiarioComitente.objects.filter(leilao__arquivamento__isnull=True)
+    if leilao_ids is not None:
+        visitas = visitas.filter(leilao_id__in=leilao_ids); arremates = arremates.filter(lote__leilao_id__in=leilao_ids)
+        resumos = resumos.filter(leilao_id__in=leilao_ids); resumos_comitentes = resumos_comitentes.filter(leilao_id__in=leilao_ids)
+
+    por_dia = {}
+    for linha in visitas:
+        por_dia[(linha['leilao_id'], linha['dia'])] = ResumoDiarioLeilao(leilao_id=linha['leilao_id'], dia=linha['dia'], visitas=linha['visitas'], cpfs_distintos=linha['cpfs_distintos'])
+    novos_comitentes = []
+    for linha in arremates:
+        chave = (linha['lote__leilao_id'], linha['dia'])
+        resumo = por_dia.setdefault(chave, ResumoDiarioLeilao(leilao_id=chave[0], dia=chave[1]))
+        resumo.arremates += linha['arremates']; resumo.valor_total += linha['valor_total']
+        novos_comitentes.append(ResumoDiarioComitente(leilao_id=chave[0], dia=chave[1], comitente_id=linha['lote__comitente_id'], arremates=linha['arremates'], valor_total=linha['valor_total']))
+
+    with transaction.atomic():
+        resumos.delete(); resumos_comitentes.delete()
+        ResumoDiarioLeilao.objects.bulk_create(por_dia.values(), batch_size=1000)
+        ResumoDiarioComitente.objects.bulk_create(novos_comitentes, batch_size=1000)
+        invalidar_apos_commit(leilao_ids)
+    return len(por_dia)
@@ -1,16 +1,146 @@
-from django.db.models.signals import pre_delete
+import logging
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete, post_init
 from django.dispatch import receiver
-from .models import Arremate, Veiculo
+from django.db.models.signals import post_migrate
+from django.db.backends.signals import connection_created
+from django.conf import settings
+from .models import Arremate, Cliente, Comitente, Leilao, Lote, Visita
+from .arquivamento import arquivando
+from .busca import criar_indice_busca
+from .clientes import descartar_cache_clientes, normalizar_nome, registrar_cliente
+from .conversao import valor_fipe
+from .resumos import agendar_recalculo, dia_local
+from .cache_dashboard import invalidar_apos_commit, invalidar_opcoes, CHAVE_LEILOES_ATIVOS, CHAVE_OPCOES_COMITENTES, CHAVE_OPCOES_LEILOES
+from .feed import evento_status_lote, publicar_evento, publicar_eventos
+from .historico import registrar_transicoes, transicao_status
 
-@receiver(pre_delete, sender=Arremate)
-def reverter_status_veiculo_on_arremate_delete(sender, instance, **kwargs):
+logger = logging.getLogger(__name__)
 
+@receiver(pre_delete, sender=Arremate)
+def reverter_status_lote_on_arremate_delete(sender, instance, **kwargs):
+    # No arquivamento (core/arquivamento.py) o lote sai do banco logo depois.
+    if arquivando(): return
     try:
-        # Pega o veículo associado ao arremate que está sendo deletado
-        veiculo = instance.veiculo
+        # Pega o lote associado ao arremate que está sendo deletado
+        lote = instance.lote
         # Muda o status de volta para 'Disponível'
-        veiculo.status = 'DISPONIVEL'
-        veiculo.save()
-        print(f"Status do veículo {veiculo.placa} revertido para DISPONIVEL.")
-    except Veiculo.DoesNotExist:
-        pass
\ No newline at end of file
+        lote.status = 'DISPONIVEL'
+        lote.save()
+        logger.info("Status do lote %s revertido para DISPONIVEL.", lote.numero_lote)
+    except Lote.DoesNotExist:
+        pass
+
+# --- CADASTRO LOCAL DE CLIENTES (core/clientes.py) ---
+
+@receiver(pre_save, sender=Cliente)
+def preencher_nome_busca(sender, instance, **kwargs):
+    instance.nome_busca = normalizar_nome(instance.nome)[:255]
+
+@receiver(post_save, sender=Cliente)
+def descartar_cache_cliente(sender, instance, **kwargs):
+    descartar_cache_clientes([instance.documento])
+
+@receiver(pre_save, sender=Visita)
+@receiver(pre_save, sender=Arremate)
+def ligar_cliente(sender, instance, **kwargs):
+    if instance.cpf_cliente:
+        instance.cliente = registrar_cliente(instance.cpf_cliente, instance.nome_cliente)
+
+# --- VALOR FIPE NUMÉRICO (a importação em massa calcula o mesmo em core/importacao.py) ---
+
+@receiver(pre_save, sender=Lote)
+def calcular_valor_fipe(sender, instance, **kwargs):
+    instance.valor_fipe = valor_fipe(instance.proporcao_fipe, instance.lance_inicial)
+
+# --- MANUTENÇÃO INCREMENTAL DOS RESUMOS DIÁRIOS ---
+
+def _balde_visita(visita):
+    return (visita.leilao_id, dia_local(visita.data_visita)) if visita.data_visita else None
+
+def _balde_arremate(arremate):
+    if Arremate.lote.is_cached(arremate): leilao_id = arremate.lote.leilao_id
+    else: leilao_id = Lote.objects.filter(pk=arremate.lote_id).values_list('leilao_id', flat=True).first()
+    return (leilao_id, dia_local(arremate.data_arremate)) if leilao_id and arremate.data_arremate else None
+
+@receiver(pre_save, sender=Visita)
+@receiver(pre_save, sender=Arremate)
+def guardar_balde_anterior(sender, instance, **kwargs):
+    # Uma edição pode mover a linha de leilão/dia; guarda o balde antigo para recalculá-lo também.
+    anterior = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._balde_anterior = (_balde_visita(anterior) if sender is Visita else _balde_arremate(anterior)) if anterior else None
+
+@receiver(post_save, sender=Visita)
+@receiver(post_delete, sender=Visita)
+def atualizar_resumo_visita(sender, instance, **kwargs):
+    if arquivando(): return
+    baldes = {_balde_visita(instance), getattr(instance, '_balde_anterior', None)} - {None}
+    for balde in baldes:
+        agendar_recalculo(*balde)
+    invalidar_apos_commit([leilao_id for leilao_id, _ in baldes])
+
+@receiver(post_save, sender=Arremate)
+@receiver(post_delete, sender=Arremate)
+def atualizar_resumo_arremate(sender, instance, **kwargs):
+    if arquivando(): return
+    baldes = {_balde_arremate(instance), getattr(instance, '_balde_anterior', None)} - {None}
+    for balde in baldes:
+        agendar_recalculo(*balde)
+    invalidar_apos_commit([leilao_id for leilao_id, _ in baldes])
+
+# --- INVALIDAÇÃO DO CACHE DOS DASHBOARDS ---
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_cache_lote(sender, instance, **kwargs):
+    if arquivando(): return
+    invalidar_apos_commit([instance.leilao_id])
+
+@receiver(post_save, sender=Leilao)
+@receiver(post_delete, sender=Leilao)
+def invalidar_cache_leilao(sender, instance, **kwargs):
+    invalidar_apos_commit([instance.id])
+    invalidar_opcoes(CHAVE_OPCOES_LEILOES, CHAVE_LEILOES_ATIVOS)
+
+@receiver(post_save, sender=Comitente)
+@receiver(post_delete, sender=Comitente)
+def invalidar_opcoes_comitentes(sender, instance, **kwargs):
+    invalidar_opcoes(CHAVE_OPCOES_COMITENTES)
+
+# --- BUSCA TEXTUAL DE VEÍCULOS (core/busca.py) ---
+
+@receiver(post_migrate)
+def criar_indice_busca_veiculos(sender, using, **kwargs):
+    if sender.name == 'core': criar_indice_busca(using)
+
+# --- FEED AO VIVO (core/feed.py) ---
+
+@receiver(post_init, sender=Lote)
+def lembrar_status_lote(sender, instance, **kwargs):
+    instance._status_publicado = instance.status
+
+@receiver(post_save, sender=Lote)
+def publicar_status_lote(sender, instance, created, **kwargs):
+    if created or instance.status != instance._status_publicado:
+        publicar_eventos([evento_status_lote(instance.leilao_id, instance.id, instance.numero_lote, instance.veiculo_id, instance.status)])
+        # Histórico de status (core/historico.py): save() pelo admin e a reversão do pre_delete de Arremate.
+        registrar_transicoes([transicao_status(instance.id, instance.leilao_id, None if created else instance._status_publicado, instance.status)])
+        instance._status_publicado = instance.status
+
+@receiver(post_save, sender=Arremate)
+def publicar_novo_arremate(sender, instance, created, **kwargs):
+    if not created: return
+    lote = instance.lote
+    publicar_evento(lote.leilao_id, 'ARREMATE', {
+        'lote_id': lote.id, 'numero_lote': lote.numero_lote, 'placa': lote.veiculo_id,
+        'nome_cliente': instance.nome_cliente, 'valor_arremate': str(instance.valor_arremate),
+    })
+
+
+# --- PERFIL DO SQLITE (settings.SQLITE_PRAGMAS) ---
+
+@receiver(connection_created)
+def configurar_conexao_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite': return
+    # Direto na conexão sqlite3: a conexão do Django ainda está sendo aberta.
+    for nome, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {nome} = {valor}')
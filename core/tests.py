@@ -1,3 +1,1480 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from .cache_dashboard import invalidar_dashboards, obter_ou_calcular
+from .clientes import DiretorioClientes, backfill_clientes, buscar_clientes_locais
+from .feed import _eventos_desde, fluxo_sse, publicar_evento
+from .jobs import MAXIMO_TENTATIVAS, TEMPO_SEM_SINAL, _atualizar_progresso, executar_job, reservar_proximo_job
+from .benchmark import ORCAMENTO_INICIALIZACAO_MS, limpar_benchmark, medir_inicializacao, medir_views, popular_banco, volumes_em_escala
+from .busca import TABELA_FTS, TRIGGERS_FTS, criar_indice_busca, fts_disponivel
+from .analises import analise_precos, analisar, carregar_lotes
+from .arquivamento import LeilaoEmAndamento, arquivar_leilao, leiloes_para_arquivar, ler_arquivo
+from .conversao import _clean_decimal, valor_fipe
+from .importacao import ImportacaoInterrompida, importar_lotes, importar_lotes_streaming, ler_planilha_em_blocos
+from .perfil import PerfilRequisicoesMiddleware, histogramas
+from . import visitas
+from .paginacao import codificar_cursor, paginar_por_cursor
+from .lotes import LoteIndisponivel, cancelar_arremates, transicionar_lotes, vender_lote
+from .models import Arremate, Cliente, Comitente, EventoLeilao, HistoricoStatusLote, Job, Leilao, LeilaoArquivado, Lote, ResumoDiarioComitente, ResumoDiarioLeilao, Veiculo, Visita
+from .historico import contagem_status_em, permanencia_por_comitente, registrar_transicoes, transicao_status
+from .resultados import conciliar_resultados, registrar_vendas
+from .funil import funil_do_leilao, funil_por_comitente
+from .resumos import recalcular_resumo, reconstruir_resumos
 
-# Create your tests here.
+# --- DIRETÓRIO DE CLIENTES (API externa simulada por um servidor HTTP local) ---
+
+class _ApiClientesStub(BaseHTTPRequestHandler):
+    clientes = {'123.456.789-01': 'Maria da Silva'}
+    token_valido = 'token-1'
+    chamadas = []
+
+    def log_message(self, *args): pass
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json'); self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers(); self.wfile.write(corpo)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.chamadas.append(('auth', None))
+        self._responder(200, {'token': self.token_valido})
+
+    def do_GET(self):
+        documento = self.path.rsplit('/', 1)[-1]
+        self.chamadas.append(('cliente', documento))
+        if self.headers.get('Authorization') != f'Bearer {self.token_valido}': return self._responder(401, {})
+        if documento in self.clientes: return self._responder(200, {'Item': {'Nome': self.clientes[documento]}})
+        self._responder(404, {})
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes-clientes'}})
+class DiretorioClientesTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ApiClientesStub)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.servidor.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown(); cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear(); _ApiClientesStub.chamadas.clear(); _ApiClientesStub.token_valido = 'token-1'
+        self.diretorio = DiretorioClientes(base_url=self.base_url, client_id='id', client_secret='segredo')
+
+    def limpar_chamadas(self):
+        # Espera as consultas de formatos ainda em andamento (canceladas só do lado do cliente)
+        # para que não apareçam depois da limpeza.
+        self.diretorio.executor.shutdown(wait=True)
+        self.diretorio.executor = ThreadPoolExecutor(max_workers=4)
+        _ApiClientesStub.chamadas.clear()
+
+    def consultas(self):
+        return [documento for tipo, documento in _ApiClientesStub.chamadas if tipo == 'cliente']
+
+    def test_encontra_cliente_em_qualquer_formato_e_guarda_no_cache(self):
+        self.assertEqual(self.diretorio.buscar_nome('12345678901'), 'Maria da Silva')
+        # Os formatos são consultados em paralelo; a consulta do outro formato pode ainda estar em andamento.
+        self.assertIn('123.456.789-01', self.consultas())
+        self.limpar_chamadas()
+        self.assertEqual(self.diretorio.buscar_nome('123.456.789-01'), 'Maria da Silva')
+        self.assertEqual(_ApiClientesStub.chamadas, [])
+
+    def test_guarda_no_cache_documento_nao_encontrado(self):
+        self.assertIsNone(self.diretorio.buscar_nome('99999999999'))
+        self.limpar_chamadas()
+        self.assertIsNone(self.diretorio.buscar_nome('999.999.999-99'))
+        self.assertEqual(_ApiClientesStub.chamadas, [])
+
+    def test_renova_token_expirado(self):
+        self.diretorio.buscar_nome('00000000000')
+        self.limpar_chamadas(); _ApiClientesStub.token_valido = 'token-2'
+        self.assertEqual(self.diretorio.buscar_nome('12345678901'), 'Maria da Silva')
+        self.assertEqual(sum(1 for tipo, _ in _ApiClientesStub.chamadas if tipo == 'auth'), 1)
+
+    def test_aquecer_cache_consulta_so_documentos_pendentes(self):
+        self.diretorio.buscar_nome('12345678901')
+        self.limpar_chamadas()
+        self.assertEqual(self.diretorio.aquecer_cache(['123.456.789-01', '11111111111', '22222222222']), 2)
+        self.assertNotIn('12345678901', self.consultas())
+        self.limpar_chamadas()
+        self.assertIsNone(self.diretorio.buscar_nome('11111111111'))
+        self.assertEqual(_ApiClientesStub.chamadas, [])
+
+    def test_cliente_do_cadastro_local_dispensa_a_api(self):
+        Cliente.objects.create(documento='55555555555', nome='João Sá')
+        self.assertEqual(self.diretorio.buscar_nome('555.555.555-55'), 'João Sá')
+        self.assertEqual(_ApiClientesStub.chamadas, [])
+        self.assertEqual([c.documento for c in buscar_clientes_locais('joao s')], ['55555555555'])
+
+    def test_cadastro_na_recepcao_descarta_o_nao_encontrado(self):
+        for documento in ('99999999999', '88888888888'):
+            self.assertIsNone(self.diretorio.buscar_nome(documento))
+        self.limpar_chamadas()
+        # Check-in (cadastro em massa) e cadastro individual.
+        leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        visitas.registrar_visitas([{'leilao': leilao.id, 'cpf': '999.999.999-99', 'nome': 'Ana Souza'}])
+        Cliente.objects.create(documento='88888888888', nome='Bruno Lima')
+        self.assertEqual((self.diretorio.buscar_nome('99999999999'), self.diretorio.buscar_nome('88888888888')), ('Ana Souza', 'Bruno Lima'))
+        self.assertEqual(_ApiClientesStub.chamadas, [])
+
+    def test_nome_encontrado_na_api_vai_para_o_cadastro_local(self):
+        self.diretorio.buscar_nome('123.456.789-01')
+        self.assertEqual(Cliente.objects.get(documento='12345678901').nome, 'Maria da Silva')
+
+
+# --- PLANOS DE CONSULTA (EXPLAIN QUERY PLAN no SQLite) ---
+
+# Tabelas pequenas por natureza (listas de seleção), que podem ser lidas por inteiro.
+TABELAS_PEQUENAS = {'core_leilao', 'core_comitente'}
+VARREDURA_COMPLETA = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é específico do SQLite.')
+class PlanoDeConsultaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        comitentes = [Comitente.objects.create(nome=f'Comitente {i}') for i in range(3)]
+        cls.leiloes = [Leilao.objects.create(nome_evento=f'Leilão {i}', data_leilao_principal=datetime.date.today()) for i in range(3)]
+        for leilao in cls.leiloes:
+            for numero in range(20):
+                veiculo = Veiculo.objects.create(placa=f'L{leilao.id}P{numero}', min_veiculo='Veículo')
+                lote = Lote.objects.create(leilao=leilao, veiculo=veiculo, comitente=comitentes[numero % 3], numero_lote=numero)
+                documento = f'{numero:011d}'
+                Visita.objects.create(leilao=leilao, cpf_cliente=documento, nome_cliente=f'Cliente {numero}')
+                if numero % 4 == 0:
+                    Arremate.objects.create(lote=lote, cpf_cliente=documento, nome_cliente=f'Cliente {numero}', valor_arremate=1000)
+                    lote.status = 'ARREMATADO'; lote.save()
+        Job.objects.create(tipo='EXPORTACAO')
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def varreduras_completas(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            detalhes = [linha[-1] for linha in cursor.fetchall()]
+        tabelas = [VARREDURA_COMPLETA.match(detalhe) for detalhe in detalhes]
+        return [tabela.group(1) for tabela in tabelas if tabela and tabela.group(1) not in TABELAS_PEQUENAS]
+
+    def assertSemVarreduraCompleta(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200, url)
+        for consulta in consultas.captured_queries:
+            if not consulta['sql'].startswith('SELECT'): continue
+            with self.subTest(url=url, sql=consulta['sql'][:200]):
+                self.assertEqual(self.varreduras_completas(consulta['sql']), [])
+
+    def test_views(self):
+        leilao_id = self.leiloes[0].id
+        urls = [
+            # periodo=total fica de fora: somar os resumos de todos os dias lê a tabela inteira por definição.
+            reverse('dashboard'), reverse('dashboard') + '?periodo=semana', reverse('dashboard') + '?periodo=mes',
+            reverse('dashboard_recepcao'), reverse('selecionar_leilao_arremate'), reverse('upload_excel'),
+            reverse('lista_veiculos_leilao', args=[leilao_id]), reverse('lista_visitantes_leilao', args=[leilao_id]),
+            reverse('gerenciar_lotes'), reverse('dashboard_leilao', args=[leilao_id]),
+            reverse('lista_completa_veiculos') + '?status=DISPONIVEL', reverse('lista_completa_veiculos') + f'?comitente={Comitente.objects.first().id}',
+            reverse('lista_completa_veiculos') + f'?depois={codificar_cursor([leilao_id, 10])}',
+            reverse('lista_completa_veiculos') + f'?leilao={leilao_id}&antes={codificar_cursor([leilao_id, 10])}',
+            reverse('lista_completa_veiculos') + '?q=L1P1',
+            reverse('buscar_clientes_api') + '?q=0000', reverse('buscar_clientes_api') + '?q=clien',
+        ]
+        for url in urls:
+            self.assertSemVarreduraCompleta(url)
+
+    def test_consultas_fora_das_views(self):
+        # Feed ao vivo e worker de jobs, que rodam fora do ciclo normal de requisição.
+        consultas = [
+            _eventos_desde(self.leiloes[0].id, 0), _eventos_desde(None, 0), _eventos_desde(self.leiloes[0].id, 5000, {4999}),
+            Job.objects.filter(status='PENDENTE').order_by('criado_em', 'id').values_list('id', flat=True)[:1],
+        ]
+        for queryset in consultas:
+            sql, params = queryset.query.sql_with_params()
+            with self.subTest(sql=sql[:200]):
+                self.assertEqual(self.varreduras_completas(sql, params), [])
+
+
+# --- ORÇAMENTO DE CONSULTAS POR PÁGINA (detecta N+1) ---
+
+# Máximo de consultas por requisição, incluindo sessão e usuário. Não pode crescer com o volume de dados.
+ORCAMENTO_VIEWS = {
+    'login': 0, 'redirect_apos_login': 2, 'logout': 4,
+    'buscar_cliente_api': 3, 'buscar_clientes_api': 3, 'status_job_api': 3,
+    'eventos_api': 4, 'eventos_leilao_api': 4,
+    'dashboard': 12, 'dashboard_api': 10, 'dashboard_recepcao': 3, 'criar_leilao': 2, 'lista_completa_veiculos': 5,
+    'upload_excel': 3, 'registrar_visita': 3, 'lista_visitantes_leilao': 4, 'gerenciar_lotes': 4,
+    'exportar_veiculos': 3, 'download_job': 3, 'selecionar_leilao_arremate': 3,
+    'lista_veiculos_leilao': 4, 'registrar_arremate_final': 4, 'dashboard_leilao': 14,
+}
+# Views de streaming infinito (SSE) não entram: a resposta nunca termina. As que só aceitam POST
+# têm testes próprios.
+VIEWS_FORA_DO_ORCAMENTO = {'feed', 'feed_leilao', 'arrematar_lote_api', 'registrar_visitas_api'}
+ORCAMENTO_ADMIN = 8
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class OrcamentoDeConsultasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        cls.comitentes = [Comitente.objects.create(nome=f'Comitente {i}') for i in range(3)]
+        cls.job = Job.objects.create(tipo='EXPORTACAO', status='CONCLUIDO', criado_por=cls.usuario)
+        cls.job.arquivo_resultado.save('relatorio.xlsx', ContentFile(b'xlsx'))
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def popular(self, total):
+        # Completa o banco até "total" lotes/visitas (um quarto arrematados), em massa e sem sinais.
+        inicio = Lote.objects.count()
+        if inicio >= total: return
+        numeros = range(inicio, total)
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Veículo') for numero in numeros])
+        Lote.objects.bulk_create([
+            Lote(leilao=self.leilao, veiculo_id=f'P{numero}', comitente=self.comitentes[numero % 3], numero_lote=numero,
+                 status='ARREMATADO' if numero % 4 == 0 else 'DISPONIVEL') for numero in numeros
+        ])
+        Visita.objects.bulk_create([Visita(leilao=self.leilao, cpf_cliente=f'{numero:011d}', nome_cliente=f'Cliente {numero}') for numero in numeros])
+        lotes = Lote.objects.filter(numero_lote__gte=inicio, status='ARREMATADO')
+        Arremate.objects.bulk_create([Arremate(lote=lote, cpf_cliente=f'{lote.numero_lote:011d}', nome_cliente='Cliente', valor_arremate=1000) for lote in lotes])
+        backfill_clientes(); reconstruir_resumos()
+        publicar_evento(self.leilao.id, 'LOTE_STATUS', {'numero_lote': inicio})
+
+    def urls_das_views(self):
+        lote = Lote.objects.filter(status='DISPONIVEL').first()
+        argumentos = {
+            'status_job_api': [self.job.id], 'download_job': [self.job.id], 'eventos_leilao_api': [self.leilao.id],
+            'lista_visitantes_leilao': [self.leilao.id], 'lista_veiculos_leilao': [self.leilao.id],
+            'registrar_arremate_final': [self.leilao.id, lote.veiculo_id], 'dashboard_leilao': [self.leilao.id],
+            'analise_precos_leilao_api': [self.leilao.id],
+        }
+        consultas = {
+            'buscar_cliente_api': '?cpf=00000000001', 'buscar_clientes_api': '?q=0000', 'eventos_api': '?desde=0',
+            'eventos_leilao_api': '?desde=0', 'exportar_veiculos': '?formato=csv',
+            'lista_completa_veiculos': f'?q=veic&depois={codificar_cursor([self.leilao.id, 5])}',
+        }
+        from .urls import urlpatterns
+        for padrao in urlpatterns:
+            if padrao.name in VIEWS_FORA_DO_ORCAMENTO: continue
+            yield padrao.name, reverse(padrao.name, args=argumentos.get(padrao.name, [])) + consultas.get(padrao.name, '')
+
+    def contar_consultas(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+            if resposta.streaming: b''.join(resposta.streaming_content)
+        self.assertLess(resposta.status_code, 400, url)
+        if self.client.session.get('_auth_user_id') is None: self.client.force_login(self.usuario)
+        return len(consultas)
+
+    def test_views_e_changelists_do_admin(self):
+        contagens = {}
+        for total in (10, 100, 1000):
+            self.popular(total)
+            paginas = dict(self.urls_das_views())
+            for modelo in admin.site._registry:
+                paginas[f'admin:{modelo._meta.model_name}'] = reverse(f'admin:{modelo._meta.app_label}_{modelo._meta.model_name}_changelist')
+            for nome, url in paginas.items():
+                contagem = self.contar_consultas(url)
+                contagens.setdefault(nome, []).append(contagem)
+                with self.subTest(pagina=nome, linhas=total):
+                    self.assertLessEqual(contagem, ORCAMENTO_VIEWS.get(nome, ORCAMENTO_ADMIN))
+        for nome, valores in contagens.items():
+            with self.subTest(pagina=nome):
+                self.assertEqual(len(set(valores)), 1, f'{nome}: o número de consultas cresce com os dados ({valores}).')
+
+
+# --- TRANSIÇÕES DE STATUS EM MASSA (core/lotes.py) ---
+
+class TransicaoLotesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Comitente')
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Veículo') for numero in range(500)])
+        Lote.objects.bulk_create([
+            Lote(leilao=cls.leilao, veiculo_id=f'P{numero}', comitente=comitente, numero_lote=numero, status='ARREMATADO' if numero < 400 else 'DISPONIVEL')
+            for numero in range(500)
+        ])
+        Arremate.objects.bulk_create([Arremate(lote=lote, cpf_cliente='12345678901', valor_arremate=100) for lote in Lote.objects.filter(status='ARREMATADO')])
+        reconstruir_resumos()
+
+    def test_transicao_em_massa_com_numero_fixo_de_comandos(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(transicionar_lotes(Lote.objects.all(), 'PAGAMENTO_CONFIRMADO'), (400, 100))
+        comandos = [consulta['sql'].split()[0] for consulta in consultas.captured_queries]
+        # Um SELECT e um UPDATE; os INSERTs dos eventos e do histórico só variam com o tamanho do lote do bulk_create.
+        self.assertEqual((comandos.count('SELECT'), comandos.count('UPDATE')), (1, 1))
+        self.assertLessEqual(len(comandos), 9)
+        self.assertEqual(HistoricoStatusLote.objects.filter(status_anterior='ARREMATADO', status='PAGAMENTO_CONFIRMADO').count(), 400)
+        self.assertEqual(Lote.objects.filter(status='PAGAMENTO_CONFIRMADO').count(), 400)
+        self.assertEqual(EventoLeilao.objects.filter(dados__status='PAGAMENTO_CONFIRMADO').count(), 400)
+
+    def test_transicao_fora_da_ordem_e_ignorada(self):
+        self.assertEqual(transicionar_lotes(Lote.objects.all(), 'RETIRADO'), (0, 500))
+        self.assertFalse(Lote.objects.filter(status='RETIRADO').exists())
+
+    def test_cancelamento_sem_sinais_atualiza_resumos(self):
+        lotes = Lote.objects.filter(numero_lote__lt=300)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(cancelar_arremates(lotes), (300, 0))
+        self.assertEqual(Arremate.objects.count(), 100)
+        self.assertEqual(Lote.objects.filter(status='DISPONIVEL').count(), 400)
+        self.assertEqual(ResumoDiarioLeilao.objects.get(leilao=self.leilao).arremates, 100)
+
+
+# --- HISTÓRICO DE STATUS DOS LOTES (core/historico.py) ---
+
+class HistoricoStatusLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        cls.comitentes = [Comitente.objects.create(nome=nome) for nome in ('Banco A', 'Banco B')]
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Veículo') for numero in range(3)])
+
+    def criar_lote(self, numero, comitente=0):
+        return Lote.objects.create(leilao=self.leilao, veiculo_id=f'P{numero}', comitente=self.comitentes[comitente], numero_lote=numero)
+
+    def test_todos_os_caminhos_gravam_o_historico(self):
+        lote = self.criar_lote(0)
+        lotes = Lote.objects.filter(id=lote.id)
+        vender_lote(lote, '12345678901', 'Maria', 1000)
+        transicionar_lotes(lotes, 'PAGAMENTO_CONFIRMADO')
+        cancelar_arremates(lotes)
+        vender_lote(Lote.objects.get(id=lote.id), '12345678901', 'Maria', 1000)
+        Arremate.objects.get(lote=lote).delete()  # pre_delete devolve o lote com save()
+        lote = Lote.objects.get(id=lote.id); lote.status = 'RETORNADO'; lote.save()
+        self.assertEqual(list(lote.historico_status.order_by('id').values_list('status_anterior', 'status')), [
+            ('', 'DISPONIVEL'), ('DISPONIVEL', 'ARREMATADO'), ('ARREMATADO', 'PAGAMENTO_CONFIRMADO'),
+            ('PAGAMENTO_CONFIRMADO', 'DISPONIVEL'), ('DISPONIVEL', 'ARREMATADO'), ('ARREMATADO', 'DISPONIVEL'),
+            ('DISPONIVEL', 'RETORNADO'),
+        ])
+
+    def registrar(self, lote, *passos):
+        anterior = None
+        for status, momento in passos:
+            registrar_transicoes([transicao_status(lote.id, lote.leilao_id, anterior, status, momento)]); anterior = status
+
+    def test_contagem_de_status_em_um_instante(self):
+        lotes = [self.criar_lote(numero) for numero in range(3)]
+        HistoricoStatusLote.objects.all().delete()
+        inicio = timezone.make_aware(datetime.datetime(2024, 5, 1, 10))
+        hora = datetime.timedelta(hours=1)
+        self.registrar(lotes[0], ('DISPONIVEL', inicio), ('ARREMATADO', inicio + hora), ('PAGAMENTO_CONFIRMADO', inicio + 3 * hora))
+        self.registrar(lotes[1], ('DISPONIVEL', inicio), ('ARREMATADO', inicio + 2 * hora))
+        self.registrar(lotes[2], ('DISPONIVEL', inicio + 4 * hora))
+        self.assertEqual(contagem_status_em(inicio - hora), {})
+        self.assertEqual(contagem_status_em(inicio), {'DISPONIVEL': 2})
+        self.assertEqual(contagem_status_em(inicio + 2 * hora), {'ARREMATADO': 2})
+        self.assertEqual(contagem_status_em(inicio + 5 * hora, leilao_id=self.leilao.id), {'PAGAMENTO_CONFIRMADO': 1, 'ARREMATADO': 1, 'DISPONIVEL': 1})
+
+    def test_permanencia_por_comitente_calculada_no_banco(self):
+        lotes = [self.criar_lote(0, 0), self.criar_lote(1, 0), self.criar_lote(2, 1)]
+        HistoricoStatusLote.objects.all().delete()
+        inicio = timezone.make_aware(datetime.datetime(2024, 5, 1, 10))
+        self.registrar(lotes[0], ('ARREMATADO', inicio), ('PAGAMENTO_CONFIRMADO', inicio + datetime.timedelta(hours=2)))
+        self.registrar(lotes[1], ('ARREMATADO', inicio), ('PAGAMENTO_CONFIRMADO', inicio + datetime.timedelta(days=2)))
+        self.registrar(lotes[2], ('ARREMATADO', inicio))
+        with CaptureQueriesContext(connection) as consultas:
+            banco_a, banco_b = permanencia_por_comitente('ARREMATADO')
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual((banco_a['comitente'], banco_a['concluidas'], banco_a['em_andamento']), ('Banco A', 2, 0))
+        self.assertEqual(banco_a['media'], datetime.timedelta(days=1, hours=1))
+        self.assertEqual((banco_a['minimo'], banco_a['maximo']), (datetime.timedelta(hours=2), datetime.timedelta(days=2)))
+        self.assertEqual(banco_a['faixas'], {'ate_1h': 0, 'ate_1d': 1, 'ate_3d': 1, 'ate_7d': 0, 'ate_30d': 0, 'acima_30d': 0})
+        self.assertEqual((banco_b['concluidas'], banco_b['em_andamento'], banco_b['media']), (0, 1, None))
+
+
+# --- REGISTRO DE ARREMATE PELO FORMULÁRIO (core/views/leiloes.py) ---
+
+class ArremateFormularioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Comitente')
+        Veiculo.objects.create(placa='ABC1234', min_veiculo='Gol')
+        # A mesma placa em dois lotes do leilão (veículo que voltou ao pregão).
+        Lote.objects.bulk_create([Lote(leilao=cls.leilao, veiculo_id='ABC1234', comitente=comitente, numero_lote=numero) for numero in (1, 2)])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('registrar_arremate_final', args=[self.leilao.id, 'ABC1234'])
+
+    def test_placa_repetida_vende_o_lote_disponivel(self):
+        dados = {'cpf': '123.456.789-01', 'nome': 'Maria', 'valor_arremate': '1.500,00'}
+        self.assertEqual(self.client.get(self.url).context['lote'].numero_lote, 1)
+        self.client.post(self.url, dados); self.client.post(self.url, dados)
+        self.assertEqual(sorted(Arremate.objects.values_list('lote__numero_lote', flat=True)), [1, 2])
+        resposta = self.client.post(self.url, dados, follow=True)
+        self.assertIn('não está mais disponível', str(list(resposta.context['messages'])[-1]))
+
+    def test_cpf_vazio_e_valor_zero_sao_recusados(self):
+        for dados in ({'cpf': '', 'nome': 'Maria', 'valor_arremate': '1500'}, {'cpf': '12345678901', 'nome': 'Maria', 'valor_arremate': ''}):
+            resposta = self.client.post(self.url, dados, follow=True)
+            self.assertEqual(str(list(resposta.context['messages'])[0]), 'CPF/CNPJ e valor do arremate são obrigatórios.')
+        self.assertFalse(Arremate.objects.exists())
+
+    def test_leilao_ou_placa_inexistente_responde_404(self):
+        self.assertEqual(self.client.get(reverse('registrar_arremate_final', args=[self.leilao.id + 1, 'ABC1234'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('registrar_arremate_final', args=[self.leilao.id, 'XYZ9999'])).status_code, 404)
+
+
+# --- VENDA CONCORRENTE DE LOTES (core/lotes.py: vender_lote) ---
+
+@skipUnless(connection.vendor != 'sqlite' or not connection.is_in_memory_db(), 'Precisa de um banco compartilhado entre threads (SQLite em arquivo ou PostgreSQL).')
+class VendaConcorrenteTests(TransactionTestCase):
+    def setUp(self):
+        leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Comitente')
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Veículo') for numero in range(10)])
+        Lote.objects.bulk_create([Lote(leilao=leilao, veiculo_id=f'P{numero}', comitente=comitente, numero_lote=numero) for numero in range(10)])
+        self.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def vender(self, lote_id, cpf, largada):
+        largada.wait()
+        try:
+            vender_lote(Lote.objects.get(id=lote_id), cpf, 'Cliente', 1000)
+            return True
+        except LoteIndisponivel:
+            return False
+        finally:
+            connections.close_all()
+
+    def test_cada_lote_e_vendido_uma_unica_vez(self):
+        tentativas = [(lote_id, f'{vendedor:011d}') for lote_id in Lote.objects.values_list('id', flat=True) for vendedor in range(4)]
+        largada = threading.Barrier(8)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            resultados = list(executor.map(lambda tentativa: self.vender(*tentativa, largada), tentativas))
+        self.assertEqual(sum(resultados), 10)
+        self.assertEqual(Arremate.objects.count(), 10)
+        self.assertFalse(Lote.objects.exclude(status='ARREMATADO').exists())
+
+    def test_api_responde_409_para_lote_ja_vendido(self):
+        self.client.force_login(self.usuario)
+        lote = Lote.objects.first()
+        url = reverse('arrematar_lote_api', args=[lote.leilao_id, lote.id])
+        dados = json.dumps({'cpf': '123.456.789-01', 'nome': 'Maria', 'valor_arremate': '1500,00'})
+        self.assertEqual(self.client.post(url, dados, content_type='application/json').status_code, 201)
+        resposta = self.client.post(url, dados, content_type='application/json')
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(Arremate.objects.get().valor_arremate, 1500)
+
+
+# --- IMPORTAÇÃO DE PLANILHAS DE LOTES (core/importacao.py) ---
+
+class ImportacaoPlanilhasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+
+    def planilha(self, linhas):
+        import pandas as pd
+        return pd.DataFrame(linhas, columns=['PLACA', 'LOTES', 'VEICULOS', 'COMITENTES', 'LANCE INICIAL', 'FIPE'])
+
+    def test_linhas_invalidas_sao_relatadas_e_as_demais_gravadas(self):
+        sucesso, erros = importar_lotes(self.planilha([
+            ('abc1234', 1, 'Gol', 'Banco A', 'R$ 10.000,00', '50%'),
+            ('', 2, 'Uno', 'Banco A', '1000', ''),
+            ('ABCDEFGHIJK', 3, 'Uno', 'Banco A', '1000', ''),
+            ('XYZ0001', 'x', 'Uno', 'Banco A', '1000', ''),
+            ('XYZ0002', 4, 'Uno', '', '1000', ''),
+            ('XYZ0003', 5, 'Palio', 'Banco B', '1000', ''),
+            ('XYZ0004', 5, 'Onix', 'Banco B', '2.000,50', 'R$ 40.000,00'),
+        ]), self.leilao)
+        self.assertEqual(sucesso, 2)
+        self.assertEqual(erros, [
+            'Linha 3: Placa está vazia. Linha ignorada.',
+            'Linha 4: Placa com mais de 10 caracteres. Linha ignorada.',
+            'Linha 5: Número do lote inválido. Linha ignorada.',
+            'Linha 6: Comitente está vazio. Linha ignorada.',
+            'Linha 7: Lote 5 repetido na planilha; mantida a última ocorrência.',
+        ])
+        lotes = {lote.numero_lote: lote for lote in Lote.objects.select_related('veiculo', 'comitente')}
+        self.assertEqual((lotes[1].veiculo_id, lotes[1].lance_inicial, lotes[1].valor_fipe, lotes[1].comitente.nome), ('ABC1234', 10000, 20000, 'Banco A'))
+        self.assertEqual((lotes[5].veiculo.min_veiculo, lotes[5].lance_inicial, lotes[5].valor_fipe), ('Onix', Decimal('2000.50'), 40000))
+        self.assertEqual(HistoricoStatusLote.objects.filter(status_anterior='').count(), 2)
+
+    def test_reimportacao_atualiza_sem_mudar_o_status(self):
+        importar_lotes(self.planilha([('ABC1234', 1, 'Gol', 'Banco A', '1000', '')]), self.leilao)
+        Lote.objects.update(status='ARREMATADO')
+        sucesso, erros = importar_lotes(self.planilha([('ABC1234', 1, 'Gol G5', 'Banco A', '1500', ''), ('DEF5678', 2, 'Uno', 'Banco A', '900', '')]), self.leilao)
+        self.assertEqual((sucesso, erros), (2, []))
+        lote = Lote.objects.select_related('veiculo').get(numero_lote=1)
+        self.assertEqual((lote.status, lote.lance_inicial, lote.veiculo.min_veiculo), ('ARREMATADO', 1500, 'Gol G5'))
+        self.assertEqual((Comitente.objects.count(), Lote.objects.count()), (1, 2))
+
+    def csv(self, linhas):
+        conteudo = 'PLACA;LOTES;VEICULOS;COMITENTES;LANCE INICIAL;FIPE\n' + '\n'.join(';'.join(map(str, linha)) for linha in linhas)
+        return io.BytesIO(conteudo.encode('utf-8'))
+
+    def test_blocos_de_tamanho_fixo_mantem_o_numero_da_linha(self):
+        linhas = [('A1', 1, 'Gol', 'C', 100, ''), ('A2', 2, 'Gol', 'C', 100, ''), ('', '', '', '', '', ''), ('A3', 3, 'Gol', 'C', 100, ''), ('A4', 4, 'Gol', 'C', 100, ''), ('', 5, 'Gol', 'C', 100, '')]
+        blocos = list(ler_planilha_em_blocos(self.csv(linhas), 'lotes.csv', tamanho_bloco=2))
+        # A linha vazia (linha 4 da planilha) é pulada e não conta para o tamanho do bloco.
+        self.assertEqual([list(bloco.index) for bloco in blocos], [[2, 3], [5, 6], [7]])
+        progresso = []
+        sucesso, erros = importar_lotes_streaming(self.csv(linhas), 'lotes.csv', self.leilao, tamanho_bloco=2, progresso=lambda *args: progresso.append(args))
+        self.assertEqual(progresso, [(2, 2, 0), (4, 4, 0), (5, 4, 1)])
+        self.assertEqual((sucesso, erros), (4, ['Linha 7: Placa está vazia. Linha ignorada.']))
+
+    def test_falha_no_meio_informa_o_gravado_e_reimportar_conclui(self):
+        linhas = [(f'A{numero}', numero, 'Gol', 'C', 100, '') for numero in range(1, 6)]
+        def falhar_no_segundo_bloco(df, *args, **kwargs):
+            if df.index[0] > 3: raise RuntimeError('disco cheio')
+            return importar_lotes(df, *args, **kwargs)
+        with mock.patch('core.importacao.importar_lotes', side_effect=falhar_no_segundo_bloco):
+            with self.assertRaises(ImportacaoInterrompida) as contexto:
+                importar_lotes_streaming(self.csv(linhas), 'lotes.csv', self.leilao, tamanho_bloco=2)
+        self.assertEqual(str(contexto.exception).split('.')[0], 'disco cheio')
+        self.assertIn('parou depois da linha 3: 2 lotes já foram gravados', str(contexto.exception))
+        self.assertEqual(Lote.objects.count(), 2)
+        self.assertEqual(importar_lotes_streaming(self.csv(linhas), 'lotes.csv', self.leilao, tamanho_bloco=2), (5, []))
+        self.assertEqual((Lote.objects.count(), HistoricoStatusLote.objects.count()), (5, 5))
+
+    def test_lote_repetido_em_outro_bloco_fica_com_a_ultima_ocorrencia(self):
+        linhas = [('A1', 1, 'Gol', 'C', 100, ''), ('A2', 2, 'Gol', 'C', 100, ''), ('A3', 1, 'Uno', 'C', 300, '')]
+        sucesso, erros = importar_lotes_streaming(self.csv(linhas), 'lotes.csv', self.leilao, tamanho_bloco=2)
+        self.assertEqual((sucesso, erros), (3, []))
+        self.assertEqual(list(Lote.objects.order_by('numero_lote').values_list('numero_lote', 'veiculo_id', 'lance_inicial')), [(1, 'A3', 300), (2, 'A2', 100)])
+        self.assertEqual(HistoricoStatusLote.objects.count(), 2)
+
+    def test_xlsx_em_blocos_exatos_e_linhas_curtas(self):
+        import openpyxl
+        workbook = openpyxl.Workbook(); planilha = workbook.active
+        planilha.append(['PLACA', 'LOTES', 'VEICULOS', 'COMITENTES', 'LANCE INICIAL', 'FIPE'])
+        planilha.append(['A1', 1, 'Gol', 'C', 100, '50%']); planilha.append(['A2', 2, 'Gol', 'C'])
+        arquivo = io.BytesIO(); workbook.save(arquivo); arquivo.seek(0)
+        blocos = list(ler_planilha_em_blocos(arquivo, 'lotes.xlsx', tamanho_bloco=2))
+        self.assertEqual(len(blocos), 1)
+        self.assertEqual(blocos[0].loc[3, ['PLACA', 'LOTES']].tolist(), ['A2', 2])
+        self.assertTrue(blocos[0].loc[3, ['LANCE INICIAL', 'FIPE']].isna().all())
+        arquivo.seek(0)
+        self.assertEqual(importar_lotes_streaming(arquivo, 'lotes.xlsx', self.leilao, tamanho_bloco=2), (2, []))
+        self.assertEqual(Lote.objects.get(numero_lote=1).valor_fipe, 200)
+
+    def test_upload_mostra_o_relatorio_de_erros(self):
+        self.client.force_login(self.usuario)
+        conteudo = 'PLACA;LOTES;VEICULOS;COMITENTES;LANCE INICIAL;FIPE\nABC1234;1;Gol;Banco A;1000;\n;2;Uno;Banco A;1000;\n'
+        resposta = self.client.post(reverse('upload_excel'), {'leilao': self.leilao.id, 'excel_file': SimpleUploadedFile('lotes.csv', conteudo.encode('utf-8'))})
+        self.assertIn('1 lotes importados', resposta.context['success'])
+        self.assertEqual(resposta.context['errors'], ['Linha 3: Placa está vazia. Linha ignorada.'])
+
+
+# --- EXPORTAÇÃO DE LOTES (core/exportacao.py) ---
+
+class ExportacaoLotesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        leilao = Leilao.objects.create(nome_evento='Leilão X', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Banco A')
+        Veiculo.objects.bulk_create([Veiculo(placa='E1', min_veiculo='Gol'), Veiculo(placa='E2', min_veiculo='Uno')])
+        # FIPE como proporção, sem valor_fipe gravado (bulk_create): o valor é calculado na exportação.
+        Lote.objects.bulk_create([Lote(leilao=leilao, veiculo_id='E2', comitente=comitente, numero_lote=2, lance_inicial=500, proporcao_fipe='50%')])
+        vendido = Lote.objects.create(leilao=leilao, veiculo_id='E1', comitente=comitente, numero_lote=1, lance_inicial=1000, proporcao_fipe='R$ 20.000,00', status='ARREMATADO')
+        cls.data = timezone.make_aware(datetime.datetime(2024, 5, 1, 14, 30))
+        Arremate.objects.create(lote=vendido, cpf_cliente='12345678901', nome_cliente='Maria', valor_arremate=Decimal('1500.50'), data_arremate=cls.data)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_xlsx_com_uma_linha_por_lote(self):
+        import openpyxl
+        resposta = self.client.get(reverse('exportar_veiculos'))
+        planilha = openpyxl.load_workbook(io.BytesIO(b''.join(resposta.streaming_content))).active
+        linhas = list(planilha.iter_rows(values_only=True))
+        self.assertEqual(linhas[0][:3], ('Leilão', 'Lote', 'Placa'))
+        self.assertEqual(linhas[0][7:9], ('FIPE (planilha)', 'Valor FIPE (R$)'))
+        self.assertEqual(linhas[1], ('Leilão X', 1, 'E1', 'Gol', 'Banco A', 'Arrematado', 1000, 'R$ 20.000,00', 20000, 'Maria', '12345678901', 1500.5, datetime.datetime(2024, 5, 1, 14, 30)))
+        self.assertEqual(linhas[2], ('Leilão X', 2, 'E2', 'Uno', 'Banco A', 'Disponível', 500, '50%', 1000, None, None, None, None))
+
+    def test_csv_filtrado_por_status(self):
+        resposta = self.client.get(reverse('exportar_veiculos'), {'formato': 'csv', 'status': 'ARREMATADO'})
+        linhas = b''.join(resposta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(linhas[1], 'Leilão X;1;E1;Gol;Banco A;Arrematado;1000.00;R$ 20.000,00;20000.00;Maria;12345678901;1500.50;2024-05-01 14:30:00')
+
+
+# --- IMPORTAÇÃO DOS RESULTADOS DO LEILÃO (core/resultados.py) ---
+
+class ResultadosLeilaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Comitente')
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Veículo') for numero in range(300)])
+        Lote.objects.bulk_create([
+            Lote(leilao=cls.leilao, veiculo_id=f'P{numero}', comitente=comitente, numero_lote=numero, status='ARREMATADO' if numero == 0 else 'DISPONIVEL')
+            for numero in range(300)
+        ])
+        Arremate.objects.create(lote=Lote.objects.get(numero_lote=0), cpf_cliente='00000000000', valor_arremate=1000)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def planilha(self, linhas):
+        conteudo = 'LOTES;PLACA;CPF/CNPJ;NOME;VALOR;DATA\n' + '\n'.join(';'.join(linha) for linha in linhas)
+        return SimpleUploadedFile('resultados.csv', conteudo.encode('utf-8'))
+
+    def linhas_validas(self):
+        return [(str(numero), '', f'{numero:011d}', f'Cliente {numero}', '1.500,00', '01/05/2024 14:30') for numero in range(1, 251)]
+
+    def enviar(self, linhas, acao):
+        return self.client.post(reverse('importar_resultados'), {'leilao': self.leilao.id, 'excel_file': self.planilha(linhas), 'acao': acao})
+
+    def test_previa_lista_diferencas_sem_gravar(self):
+        linhas = self.linhas_validas()[:3] + [
+            ('0', '', '00000000000', 'Já vendido', '1.000,00', ''),   # já registrado (mesmo documento e valor)
+            ('0', '', '11111111111', 'Outro', '900,00', ''),        # repetido na planilha
+            ('999', '', '12345678901', 'X', '10,00', ''),            # lote inexistente
+            ('', 'ZZZ9999', '12345678901', 'X', '10,00', ''),       # placa inexistente
+            ('5', 'P6', '12345678901', 'X', '10,00', ''),            # placa de outro lote
+            ('', 'P7', '123', 'X', '10,00', ''),                     # documento inválido
+        ]
+        relatorio = self.enviar(linhas, 'previa').context['relatorio']
+        self.assertEqual([venda.numero_lote for venda in relatorio['vendas']], [1, 2, 3])
+        self.assertEqual(relatorio['ja_registradas'], 1)
+        self.assertEqual((len(relatorio['sem_correspondencia']), len(relatorio['conflitos']), len(relatorio['invalidas'])), (2, 2, 1))
+        self.assertEqual(relatorio['valor_total'], 4500)
+        self.assertEqual(Arremate.objects.count(), 1)
+        self.assertEqual(Lote.objects.filter(status='ARREMATADO').count(), 1)
+
+    def test_aplicar_grava_em_massa_com_numero_fixo_de_consultas(self):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            relatorio = conciliar_resultados(self.planilha(self.linhas_validas()), 'resultados.csv', self.leilao, aplicar=True)
+        self.assertEqual(relatorio['gravadas'], 250)
+        # Uma consulta para casar os lotes; o resto são comandos em massa (a quantidade não depende das linhas, só do tamanho dos blocos).
+        self.assertLessEqual(len(consultas), 20)
+        self.assertEqual(Lote.objects.filter(status='ARREMATADO').count(), 251)
+        arremate = Arremate.objects.select_related('cliente').get(lote__numero_lote=7)
+        self.assertEqual((arremate.valor_arremate, arremate.cliente.documento), (1500, '00000000007'))
+        self.assertEqual(timezone.localtime(arremate.data_arremate).strftime('%d/%m/%Y %H:%M'), '01/05/2024 14:30')
+        self.assertEqual(ResumoDiarioLeilao.objects.get(leilao=self.leilao, dia=datetime.date(2024, 5, 1)).arremates, 250)
+        self.assertEqual(EventoLeilao.objects.filter(tipo='ARREMATE', dados__valor_arremate='1500.00').count(), 250)
+        # Reenviar a mesma planilha não duplica nada.
+        relatorio = conciliar_resultados(self.planilha(self.linhas_validas()), 'resultados.csv', self.leilao, aplicar=True)
+        self.assertEqual((relatorio['gravadas'], relatorio['ja_registradas']), (0, 250))
+
+    def test_lote_vendido_apos_a_previa_desfaz_tudo(self):
+        relatorio = conciliar_resultados(self.planilha(self.linhas_validas()), 'resultados.csv', self.leilao)
+        Lote.objects.filter(numero_lote=200).update(status='ARREMATADO')
+        with self.assertRaises(LoteIndisponivel):
+            registrar_vendas(self.leilao, relatorio['vendas'])
+        self.assertEqual(Arremate.objects.count(), 1)
+        self.assertEqual(Lote.objects.filter(status='ARREMATADO').count(), 2)
+
+
+# --- RESUMOS DIÁRIOS (core/resumos.py) ---
+
+class ResumosDiariosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        cls.comitentes = [Comitente.objects.create(nome=nome) for nome in ('A', 'B')]
+        Veiculo.objects.bulk_create([Veiculo(placa=f'R{numero}', min_veiculo='Gol') for numero in range(4)])
+        cls.lotes = [Lote.objects.create(leilao=cls.leilao, veiculo_id=f'R{numero}', comitente=cls.comitentes[numero % 2], numero_lote=numero) for numero in range(4)]
+        cls.hoje = timezone.localdate()
+
+    def resumo(self):
+        resumo = ResumoDiarioLeilao.objects.filter(leilao=self.leilao, dia=self.hoje).values_list('visitas', 'cpfs_distintos', 'arremates', 'valor_total').first()
+        por_comitente = dict(ResumoDiarioComitente.objects.filter(leilao=self.leilao, dia=self.hoje).values_list('comitente__nome', 'arremates'))
+        return resumo, por_comitente
+
+    def test_recalculo_sobrescreve_linhas_existentes(self):
+        # Linhas desatualizadas: o recálculo atualiza no lugar e remove o comitente sem arremates no dia.
+        ResumoDiarioLeilao.objects.create(leilao=self.leilao, dia=self.hoje, visitas=99, arremates=99)
+        ResumoDiarioComitente.objects.bulk_create([ResumoDiarioComitente(leilao=self.leilao, dia=self.hoje, comitente=comitente, arremates=99) for comitente in self.comitentes])
+        Visita.objects.bulk_create([Visita(leilao=self.leilao, cpf_cliente=cpf) for cpf in ('1', '1', '2')])
+        Arremate.objects.bulk_create([Arremate(lote=self.lotes[numero], cpf_cliente='1', valor_arremate=1000) for numero in (0, 2)])
+        recalcular_resumo(self.leilao.id, self.hoje)
+        self.assertEqual(self.resumo(), ((3, 2, 2, 2000), {'A': 2}))
+        Visita.objects.all()._raw_delete(connection.alias); Arremate.objects.all()._raw_delete(connection.alias)
+        recalcular_resumo(self.leilao.id, self.hoje)
+        self.assertEqual(self.resumo(), (None, {}))
+
+    def baldes(self):
+        return (
+            sorted(ResumoDiarioLeilao.objects.values_list('leilao_id', 'dia', 'visitas', 'arremates')),
+            sorted(ResumoDiarioComitente.objects.values_list('leilao_id', 'dia', 'comitente__nome', 'arremates', 'valor_total')),
+        )
+
+    def test_resumos_acompanham_inclusao_mudanca_e_exclusao(self):
+        outro = Leilao.objects.create(nome_evento='Outro', data_leilao_principal=self.hoje)
+        ontem = self.hoje - datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            visita = Visita.objects.create(leilao=self.leilao, cpf_cliente='00000000001')
+            arremate = Arremate.objects.create(lote=self.lotes[1], cpf_cliente='00000000001', valor_arremate=800)
+        self.assertEqual(self.baldes(), ([(self.leilao.id, self.hoje, 1, 1)], [(self.leilao.id, self.hoje, 'B', 1, 800)]))
+        # Mudar o leilão da visita e o dia do arremate recalcula o balde antigo e o novo.
+        with self.captureOnCommitCallbacks(execute=True):
+            visita.leilao = outro; visita.save()
+            arremate.data_arremate = timezone.now() - datetime.timedelta(days=1); arremate.valor_arremate = 900; arremate.save()
+        self.assertEqual(self.baldes(), (
+            [(self.leilao.id, ontem, 0, 1), (outro.id, self.hoje, 1, 0)],
+            [(self.leilao.id, ontem, 'B', 1, 900)],
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            arremate.delete(); visita.delete()
+        self.assertEqual(self.baldes(), ([], []))
+        self.assertEqual(Lote.objects.get(id=self.lotes[1].id).status, 'DISPONIVEL')
+
+    def test_incremental_igual_a_reconstrucao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for numero, lote in enumerate(self.lotes[:3]):
+                Visita.objects.create(leilao=self.leilao, cpf_cliente=f'{numero:011d}')
+                Arremate.objects.create(lote=lote, cpf_cliente=f'{numero:011d}', valor_arremate=100 * (numero + 1))
+        incremental = self.baldes()
+        reconstruir_resumos()
+        self.assertEqual(self.baldes(), incremental)
+        self.assertEqual(incremental[1], [(self.leilao.id, self.hoje, 'A', 2, 400), (self.leilao.id, self.hoje, 'B', 1, 200)])
+
+
+# --- FILA DE JOBS (core/jobs.py) ---
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FilaJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        Veiculo.objects.create(placa='J1', min_veiculo='Gol')
+        Lote.objects.create(leilao=leilao, veiculo_id='J1', comitente=Comitente.objects.create(nome='C'), numero_lote=1)
+
+    def test_reserva_em_ordem_de_chegada(self):
+        jobs = [Job.objects.create(tipo='EXPORTACAO') for _ in range(2)]
+        Job.objects.filter(id=jobs[0].id).update(criado_em=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual([reservar_proximo_job().id, reservar_proximo_job().id, reservar_proximo_job()], [jobs[0].id, jobs[1].id, None])
+        self.assertEqual(set(Job.objects.values_list('status', 'tentativas')), {('EXECUTANDO', 1)})
+
+    def test_job_travado_volta_para_a_fila(self):
+        antigo = timezone.now() - TEMPO_SEM_SINAL - datetime.timedelta(minutes=1)
+        travado = Job.objects.create(tipo='IMPORTACAO', status='EXECUTANDO', iniciado_em=antigo, atualizado_em=antigo, tentativas=1)
+        esgotado = Job.objects.create(tipo='EXPORTACAO', status='EXECUTANDO', iniciado_em=antigo, atualizado_em=antigo, tentativas=MAXIMO_TENTATIVAS)
+        # Importação longa, mas com progresso recente: continua com o worker atual.
+        longo = Job.objects.create(tipo='IMPORTACAO', status='EXECUTANDO', iniciado_em=antigo, atualizado_em=antigo, tentativas=1)
+        _atualizar_progresso(longo, 4000, 3990, 10)
+        velho = Job.objects.get(id=travado.id)
+        self.assertEqual(reservar_proximo_job().id, travado.id)
+        self.assertEqual(Job.objects.get(id=travado.id).tentativas, 2)
+        self.assertEqual(Job.objects.get(id=esgotado.id).status, 'ERRO')
+        self.assertEqual(Job.objects.filter(id=longo.id).values_list('status', 'progresso').get(), ('EXECUTANDO', 4000))
+        # O worker antigo continua depois da nova reserva: progresso e resultado dele são descartados.
+        _atualizar_progresso(velho, 2000, 2000, 0)
+        self.assertEqual(Job.objects.get(id=travado.id).progresso, 0)
+        executar_job(velho)
+        self.assertEqual(Job.objects.get(id=travado.id).status, 'EXECUTANDO')
+
+    def test_worker_executa_a_exportacao(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(reverse('exportar_veiculos'), {'segundo_plano': '1', 'status': 'DISPONIVEL'}).status_code, 200)
+        self.assertFalse(Job.objects.exists())
+        resposta = self.client.post(reverse('exportar_veiculos') + '?status=DISPONIVEL')
+        self.assertEqual(resposta.status_code, 202)
+        call_command('processar_jobs', '--uma-vez', stdout=io.StringIO())
+        job = Job.objects.get(id=resposta.json()['id'])
+        self.assertEqual((job.status, job.parametros['status'], job.criado_por), ('CONCLUIDO', 'DISPONIVEL', self.usuario))
+        dados = self.client.get(reverse('status_job_api', args=[job.id])).json()
+        self.assertEqual(dados['url_download'], reverse('download_job', args=[job.id]))
+        self.assertEqual(self.client.get(dados['url_download']).status_code, 200)
+
+
+# --- FEED AO VIVO (core/feed.py) ---
+
+class FeedAoVivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leiloes = [Leilao.objects.create(nome_evento=nome, data_leilao_principal=datetime.date.today()) for nome in ('A', 'B')]
+        for numero in range(5): publicar_evento(cls.leiloes[numero % 2].id, 'LOTE_STATUS', {'numero_lote': numero})
+        cls.ids = list(EventoLeilao.objects.values_list('id', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def eventos(self, url, **parametros):
+        return self.client.get(url, parametros).json()
+
+    def test_eventos_em_ordem_e_filtrados_por_leilao(self):
+        resposta = self.eventos(reverse('eventos_api'), desde=self.ids[0])
+        self.assertEqual([evento['numero_lote'] for evento in resposta['eventos']], [1, 2, 3, 4])
+        self.assertEqual(resposta['ultimo_id'], self.ids[-1])
+        resposta = self.eventos(reverse('eventos_leilao_api', args=[self.leiloes[0].id]), desde=self.ids[0])
+        self.assertEqual([evento['numero_lote'] for evento in resposta['eventos']], [2, 4])
+
+    def test_evento_visivel_depois_do_cursor_e_entregue_uma_vez(self):
+        # O evento do meio ficou visível depois dos seguintes (commit mais lento): a leitura anterior o
+        # deixou em 'pendentes'. A lista só leva esses ids, nunca os já entregues.
+        resposta = self.eventos(reverse('eventos_api'), desde=self.ids[-1], pendentes=self.ids[2])
+        self.assertEqual([evento['id'] for evento in resposta['eventos']], [self.ids[2]])
+        self.assertEqual((resposta['ultimo_id'], resposta['pendentes']), (self.ids[-1], []))
+        with mock.patch('core.views.feed.TEMPO_LONG_POLL', 0.05):
+            resposta = self.eventos(reverse('eventos_api'), desde=resposta['ultimo_id'], pendentes='')
+        self.assertEqual(resposta['eventos'], [])
+
+    def test_id_sem_evento_fica_pendente_ate_expirar(self):
+        # Transação ainda aberta (ou desfeita): o id pulado volta em 'pendentes' enquanto pode aparecer.
+        EventoLeilao.objects.filter(id=self.ids[2]).delete()
+        resposta = self.eventos(reverse('eventos_api'), desde=self.ids[0], pendentes='')
+        self.assertEqual(([evento['id'] for evento in resposta['eventos']], resposta['pendentes']), ([self.ids[1], self.ids[3], self.ids[4]], [self.ids[2]]))
+        # No feed de um leilão, os ids dos outros leilões não ficam pendentes.
+        resposta = self.eventos(reverse('eventos_leilao_api', args=[self.leiloes[1].id]), desde=self.ids[0], pendentes='')
+        self.assertEqual(([evento['id'] for evento in resposta['eventos']], resposta['pendentes']), ([self.ids[1], self.ids[3]], [self.ids[2]]))
+        # Um evento posterior já com mais de JANELA_ATRASO: a transação do id pulado já teria terminado.
+        EventoLeilao.objects.filter(id=self.ids[3]).update(criado_em=timezone.now() - datetime.timedelta(minutes=1))
+        resposta = self.eventos(reverse('eventos_api'), desde=self.ids[0], pendentes='')
+        self.assertEqual(resposta['pendentes'], [])
+        self.assertEqual(self.eventos(reverse('eventos_api'))['pendentes'], [])
+
+    def test_fluxo_sse_pula_o_id_sem_evento_e_avanca_o_cursor(self):
+        EventoLeilao.objects.filter(id=self.ids[2]).delete()
+        async def ler(quantidade):
+            fluxo = fluxo_sse(None, self.ids[0])
+            try: return [await anext(fluxo) for _ in range(quantidade)]
+            finally: await fluxo.aclose()
+        mensagens = async_to_sync(ler)(4)[1:]
+        self.assertEqual([re.search(r'"id": (\d+)', mensagem).group(1) for mensagem in mensagens], [str(self.ids[numero]) for numero in (1, 3, 4)])
+        self.assertTrue(mensagens[-1].startswith(f'id: {self.ids[4]}\n'))
+
+    def test_long_poll_sem_eventos_responde_no_tempo_limite(self):
+        with mock.patch('core.views.feed.TEMPO_LONG_POLL', 0.2):
+            inicio = time.monotonic()
+            resposta = self.eventos(reverse('eventos_api'), desde=self.ids[-1])
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+        self.assertEqual((resposta['eventos'], resposta['ultimo_id']), ([], self.ids[-1]))
+        # Sem cursor: só devolve o ponto de partida.
+        self.assertEqual(self.eventos(reverse('eventos_api'))['ultimo_id'], self.ids[-1])
+
+    def test_limpeza_remove_eventos_antigos(self):
+        EventoLeilao.objects.filter(id__in=self.ids[:2]).update(criado_em=timezone.now() - datetime.timedelta(days=8))
+        saida = io.StringIO()
+        call_command('limpar_eventos', stdout=saida)
+        self.assertIn('2 eventos removidos', saida.getvalue())
+        self.assertEqual(list(EventoLeilao.objects.values_list('id', flat=True)), self.ids[2:])
+
+
+# --- FUNIL DE CONVERSÃO (core/funil.py) ---
+
+class FunilConversaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        outro = Leilao.objects.create(nome_evento='Outro', data_leilao_principal=datetime.date.today())
+        comitentes = {nome: Comitente.objects.create(nome=nome) for nome in ('A', 'B')}
+        cpf = lambda numero: f'{numero:011d}'
+        # Visitantes do leilão: 1 (duas visitas), 2 e 3; o 4 visitou só o outro leilão.
+        for numero in (1, 1, 2, 3): Visita.objects.create(leilao=cls.leilao, cpf_cliente=cpf(numero))
+        Visita.objects.create(leilao=outro, cpf_cliente=cpf(4))
+        # Arrematantes: 1 (em A e B), 4 (em A, sem visitar este leilão) e 5 (em B, sem visita nenhuma).
+        for numero_lote, (comitente, cliente) in enumerate((('A', 1), ('A', 4), ('B', 1), ('B', 5))):
+            Veiculo.objects.create(placa=f'F{numero_lote}', min_veiculo='Gol')
+            lote = Lote.objects.create(leilao=cls.leilao, veiculo_id=f'F{numero_lote}', comitente=comitentes[comitente], numero_lote=numero_lote, status='ARREMATADO')
+            Arremate.objects.create(lote=lote, cpf_cliente=cpf(cliente), valor_arremate=1000)
+
+    def test_funil_do_leilao(self):
+        self.assertEqual(funil_do_leilao(self.leilao), {
+            'visitantes': 3, 'arrematantes': 3, 'visitantes_que_arremataram': 1,
+            'visitantes_nao_arremataram': 2, 'arrematantes_nao_visitaram': 2, 'taxa_conversao': 1 / 3 * 100,
+        })
+
+    def test_funil_por_comitente(self):
+        self.assertEqual([(linha['comitente'], linha['arrematantes'], linha['visitantes_que_arremataram'], linha['arrematantes_nao_visitaram']) for linha in funil_por_comitente(self.leilao)], [
+            ('A', 2, 1, 1), ('B', 2, 1, 1),
+        ])
+
+    def test_funil_geral_considera_todos_os_leiloes(self):
+        # No dashboard geral o cliente 4 visitou (outro leilão) e arrematou.
+        self.client.force_login(self.usuario)
+        contexto = self.client.get(reverse('dashboard'), {'periodo': 'total'}).context
+        self.assertEqual((contexto['visitantes_que_arremataram'], contexto['visitantes_nao_arremataram'], contexto['arrematantes_nao_visitaram']), (2, 2, 1))
+        self.assertEqual(contexto['taxa_conversao'], 50)
+
+
+# --- CACHE DOS DASHBOARDS (core/cache_dashboard.py) ---
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes-dashboards'}})
+class CacheDashboardsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leiloes = [Leilao.objects.create(nome_evento=nome, data_leilao_principal=datetime.date.today()) for nome in ('A', 'B')]
+        Veiculo.objects.create(placa='K1', min_veiculo='Gol')
+        cls.lote = Lote.objects.create(leilao=cls.leiloes[0], veiculo_id='K1', comitente=Comitente.objects.create(nome='C'), numero_lote=1)
+
+    def setUp(self):
+        cache.clear(); self.calculos = []
+
+    def obter(self, leilao_id):
+        def calcular():
+            self.calculos.append(leilao_id); return {'leilao': leilao_id, 'calculo': len(self.calculos)}
+        return obter_ou_calcular('dashboard_leilao', None, leilao_id, calcular)
+
+    def test_invalidacao_so_do_leilao_alterado(self):
+        a, b = (leilao.id for leilao in self.leiloes)
+        for leilao_id in (a, b, None, a, b, None): self.obter(leilao_id)
+        self.assertEqual(self.calculos, [a, b, None])
+        invalidar_dashboards([a])
+        for leilao_id in (a, b, None): self.obter(leilao_id)
+        # O dashboard geral soma todos os leilões: muda junto com qualquer um deles.
+        self.assertEqual(self.calculos, [a, b, None, a, None])
+        invalidar_dashboards()
+        for leilao_id in (a, b): self.obter(leilao_id)
+        self.assertEqual(self.calculos[5:], [a, b])
+
+    def test_sinais_invalidam_depois_do_commit(self):
+        a = self.leiloes[0].id
+        self.obter(a)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Arremate.objects.create(lote=self.lote, cpf_cliente='00000000001', valor_arremate=1000)
+            # Antes do commit o valor em cache continua valendo.
+            self.assertEqual(self.obter(a)['calculo'], 1)
+        self.assertTrue(callbacks)
+        self.assertEqual(self.obter(a)['calculo'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Visita.objects.create(leilao=self.leiloes[1], cpf_cliente='00000000001')
+        self.assertEqual(self.obter(a)['calculo'], 2)
+
+    def test_rajada_de_acessos_calcula_uma_vez(self):
+        liberar = threading.Event(); chamadas = []
+        def calcular():
+            chamadas.append(1); liberar.wait(5); return {'valor': 42}
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futuros = [executor.submit(obter_ou_calcular, 'dashboard', 'hoje', None, calcular) for _ in range(8)]
+            time.sleep(0.2); liberar.set()
+            resultados = [futuro.result() for futuro in futuros]
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, [{'valor': 42}] * 8)
+
+    def test_erro_no_calculo_libera_a_trava(self):
+        def falhar(): raise RuntimeError('falhou')
+        with self.assertRaises(RuntimeError): obter_ou_calcular('dashboard', 'hoje', None, falhar)
+        self.assertEqual(obter_ou_calcular('dashboard', 'hoje', None, lambda: {'valor': 1}), {'valor': 1})
+
+
+# --- API DO DASHBOARD COM GET CONDICIONAL (core/views/dashboards.py) ---
+
+class DashboardApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        comitente = Comitente.objects.create(nome='Banco')
+        Veiculo.objects.create(placa='P1', min_veiculo='Gol')
+        lote = Lote.objects.create(leilao=cls.leilao, veiculo_id='P1', comitente=comitente, numero_lote=1)
+        Visita.objects.create(leilao=cls.leilao, cpf_cliente='00000000001', nome_cliente='Ana')
+        Arremate.objects.create(lote=lote, cpf_cliente='00000000001', nome_cliente='Ana', valor_arremate=2500)
+        reconstruir_resumos()
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def test_dados_e_cabecalhos(self):
+        resposta = self.client.get(reverse('dashboard_api'), {'periodo': 'semana'})
+        dados = resposta.json()
+        self.assertEqual((dados['periodo'], dados['visitas_periodo'], dados['total_arrematado_periodo']), ('semana', 1, 2500.0))
+        self.assertEqual(dados['funil']['visitantes_que_arremataram'], 1)
+        self.assertEqual(dados['vendas_por_dia']['valores'], [2500.0])
+        self.assertEqual(dados['top_arrematantes'], [{'cpf_cliente': '00000000001', 'nome_cliente': 'Ana', 'total_gasto': 2500.0}])
+        self.assertTrue(resposta['ETag'] and resposta['Last-Modified'])
+        self.assertIn('no-cache', resposta['Cache-Control'])
+        self.assertNotEqual(self.client.get(reverse('dashboard_api'), {'periodo': 'hoje'})['ETag'], resposta['ETag'])
+
+    def test_304_sem_alteracao_e_200_apos_visita(self):
+        url = reverse('dashboard_api') + '?periodo=hoje'
+        primeira = self.client.get(url)
+        with self.assertNumQueries(4):  # sessão, usuário e os dois maiores ids; nada do dashboard
+            resposta = self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual((resposta.status_code, resposta.content), (304, b''))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=primeira['Last-Modified']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Visita.objects.create(leilao=self.leilao, cpf_cliente='00000000002', nome_cliente='Bruno')
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['visitas_periodo'], 2)
+        self.assertNotEqual(resposta['ETag'], primeira['ETag'])
+
+    def test_escrita_sem_sinais_muda_corpo_junto_com_etag(self):
+        # Como uma escrita feita em outro processo: nenhum sinal, nenhuma invalidação do cache local.
+        url = reverse('dashboard_api') + '?periodo=hoje'
+        primeira = self.client.get(url)
+        Visita.objects.bulk_create([Visita(leilao=self.leilao, cpf_cliente='00000000003', nome_cliente='Carla')])
+        reconstruir_resumos()  # só agenda a invalidação para depois do commit, que não acontece aqui
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], primeira['ETag'])
+        self.assertEqual(resposta.json()['visitas_periodo'], 2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta['ETag']).status_code, 304)
+
+    def test_apenas_admin(self):
+        self.client.force_login(User.objects.create_user('recepcao', password='senha'))
+        self.assertEqual(self.client.get(reverse('dashboard_api')).status_code, 302)
+
+
+# --- ANÁLISE DE PREÇOS (core/analises.py) ---
+
+class AnalisePrecosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+        cls.banco = Comitente.objects.create(nome='Banco'); cls.seguradora = Comitente.objects.create(nome='Seguradora')
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Gol' if numero < 4 else 'Uno') for numero in range(6)])
+        # FIPE informada como valor (convertida no save) e como proporção (bulk_create, sem valor_fipe gravado).
+        for numero in range(4):
+            Lote.objects.create(leilao=cls.leilao, veiculo_id=f'P{numero}', comitente=cls.banco, numero_lote=numero, lance_inicial=5000, proporcao_fipe='R$ 10.000,00')
+        Lote.objects.bulk_create([Lote(leilao=cls.leilao, veiculo_id=f'P{numero}', comitente=cls.seguradora, numero_lote=numero, lance_inicial=4000, proporcao_fipe='50%') for numero in (4, 5)])
+        for numero, valor in ((0, 6000), (1, 8000), (4, 4000)):
+            Arremate.objects.create(lote=Lote.objects.get(numero_lote=numero), cpf_cliente=f'{numero:011d}', valor_arremate=valor)
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def test_valor_fipe_de_valor_ou_proporcao(self):
+        self.assertEqual(valor_fipe('R$ 45.000,00', 1000), 45000.0)
+        self.assertEqual(valor_fipe('65%', 6500), 10000.0)
+        self.assertEqual(valor_fipe('65,5%', 655), 1000.0)
+        self.assertIsNone(valor_fipe('', 1000)); self.assertIsNone(valor_fipe('0%', 1000)); self.assertIsNone(valor_fipe(None, 1000))
+        self.assertEqual(Lote.objects.get(numero_lote=0).valor_fipe, 10000)
+
+    def test_carrega_fipe_ausente_a_partir_do_texto(self):
+        # Lotes, nomes dos comitentes e, só se faltar algum valor_fipe, o texto da FIPE.
+        with self.assertNumQueries(3): df = carregar_lotes(self.leilao.id)
+        self.assertEqual(sorted(df['valor_fipe'].tolist()), [8000.0, 8000.0, 10000.0, 10000.0, 10000.0, 10000.0])
+        Lote.objects.filter(valor_fipe__isnull=True).update(valor_fipe=8000)
+        with self.assertNumQueries(2): self.assertEqual(carregar_lotes(self.leilao.id)['valor_fipe'].sum(), 56000.0)
+
+    def test_razoes_percentis_e_taxa_de_venda(self):
+        analise = analisar(carregar_lotes(self.leilao.id))
+        self.assertEqual((analise['lotes'], analise['vendidos'], analise['taxa_venda'], analise['valor_total']), (6, 3, 0.5, 18000.0))
+        self.assertEqual(analise['arremate_fipe']['p50'], 0.6)
+        banco, seguradora = analise['por_comitente']
+        self.assertEqual((banco['comitente'], banco['lotes'], banco['vendidos'], banco['taxa_venda']), ('Banco', 4, 2, 0.5))
+        self.assertEqual(banco['arremate_fipe'], {'p25': 0.65, 'p50': 0.7, 'p75': 0.75, 'p90': 0.78, 'media': 0.7})
+        self.assertEqual(banco['arremate_lance']['p50'], 1.4)
+        self.assertEqual((seguradora['arremate_fipe']['p50'], seguradora['arremate_lance']['media']), (0.5, 1.0))
+        self.assertEqual({linha['veiculo']: linha['vendidos'] for linha in analise['por_veiculo']}, {'Gol': 2, 'Uno': 1})
+
+    def test_sem_vendas_nao_gera_nan(self):
+        analise = analisar(carregar_lotes(self.leilao.id).assign(valor_arremate=float('nan')))
+        self.assertEqual((analise['vendidos'], analise['taxa_venda']), (0, 0.0))
+        self.assertEqual(analise['arremate_fipe'], {'p25': None, 'p50': None, 'p75': None, 'p90': None, 'media': None})
+        json.dumps(analise, allow_nan=False)
+
+    def test_api_e_cache(self):
+        resposta = self.client.get(reverse('analise_precos_leilao_api', args=[self.leilao.id]))
+        self.assertEqual(resposta.json()['vendidos'], 3)
+        self.assertEqual(self.client.get(reverse('analise_precos_api')).json()['lotes'], 6)
+        self.assertEqual(self.client.get(reverse('analise_precos_leilao_api', args=[self.leilao.id + 1])).status_code, 404)
+        with self.assertNumQueries(0): analise_precos(self.leilao.id)
+        # Um novo arremate invalida o cache do leilão.
+        with self.captureOnCommitCallbacks(execute=True):
+            Arremate.objects.create(lote=Lote.objects.get(numero_lote=2), cpf_cliente='00000000002', valor_arremate=9000)
+        self.assertEqual(analise_precos(self.leilao.id)['vendidos'], 4)
+
+
+# --- ARQUIVAMENTO DE LEILÕES ENCERRADOS (core/arquivamento.py) ---
+
+@override_settings(ARQUIVO_LEILOES_DIR=tempfile.mkdtemp())
+class ArquivamentoLeiloesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.antigo = Leilao.objects.create(nome_evento='Antigo', data_leilao_principal=datetime.date(2020, 1, 10))
+        cls.recente = Leilao.objects.create(nome_evento='Recente', data_leilao_principal=datetime.date.today())
+        comitentes = [Comitente.objects.create(nome='Banco'), Comitente.objects.create(nome='Seguradora')]
+        cls.pendente = Leilao.objects.create(nome_evento='Pendente', data_leilao_principal=datetime.date(2020, 2, 10))
+        Veiculo.objects.bulk_create([Veiculo(placa=f'P{numero}', min_veiculo='Gol') for numero in range(9)])
+        Lote.objects.create(leilao=cls.pendente, veiculo_id='P8', comitente=comitentes[0], numero_lote=1, status='PAGAMENTO_CONFIRMADO')
+        for numero in range(8):
+            leilao = cls.antigo if numero < 6 else cls.recente
+            # O leilão antigo está encerrado: lotes vendidos retirados, os demais nunca vendidos.
+            status = 'RETIRADO' if leilao == cls.antigo and numero % 3 == 0 else 'DISPONIVEL'
+            lote = Lote.objects.create(leilao=leilao, veiculo_id=f'P{numero}', comitente=comitentes[numero % 2], numero_lote=numero, lance_inicial=1000, proporcao_fipe='50%', status=status)
+            Visita.objects.create(leilao=leilao, cpf_cliente=f'{numero % 4:011d}', nome_cliente=f'Cliente {numero % 4}')
+            if numero % 3 == 0:
+                Arremate.objects.create(lote=lote, cpf_cliente=f'{numero % 5:011d}', nome_cliente=f'Cliente {numero % 5}', valor_arremate=1500 + numero)
+        publicar_evento(cls.antigo.id, 'LOTE_STATUS', {'numero_lote': 0})
+        reconstruir_resumos()
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def pasta(self, leilao):
+        return os.path.join(settings.ARQUIVO_LEILOES_DIR, f'leilao_{leilao.id}')
+
+    def dashboard(self, leilao):
+        cache.clear()
+        contexto = self.client.get(reverse('dashboard_leilao', args=[leilao.id])).context
+        return {
+            'totais': (contexto['total_visitas'], contexto['total_arremates'], contexto['total_valor_arrematado'], contexto['totais_por_comitente']),
+            'funil': contexto['funil'], 'funil_por_comitente': contexto['funil_por_comitente'], 'analise_precos': contexto['analise_precos'],
+            'visitantes': sorted((visita['cpf_cliente'] if isinstance(visita, dict) else visita.cpf_cliente) for visita in contexto['lista_visitantes']),
+            'arremates': [
+                (arremate['lote']['numero_lote'], arremate['lote']['veiculo']['min_veiculo'], arremate['nome_cliente'], arremate['valor_arremate']) if isinstance(arremate, dict)
+                else (arremate.lote.numero_lote, arremate.lote.veiculo.min_veiculo, arremate.nome_cliente, arremate.valor_arremate)
+                for arremate in contexto['lista_arremates']
+            ],
+        }
+
+    def test_arquiva_e_dashboard_le_do_arquivo(self):
+        antes = self.dashboard(self.antigo)
+        historico = HistoricoStatusLote.objects.filter(leilao=self.antigo).count()
+        saida = io.StringIO()
+        call_command('archive_leiloes', '--before=2021-01-01', stdout=saida)
+        self.assertIn('1 leilões arquivados', saida.getvalue())
+        for modelo, filtro in ((Visita, 'leilao'), (Lote, 'leilao'), (Arremate, 'lote__leilao'), (HistoricoStatusLote, 'leilao'), (EventoLeilao, 'leilao')):
+            self.assertFalse(modelo.objects.filter(**{filtro: self.antigo}).exists(), modelo.__name__)
+        self.assertEqual((Lote.objects.filter(leilao=self.recente).count(), Visita.objects.filter(leilao=self.recente).count()), (2, 2))
+        # Anterior à data, mas com lote ainda em andamento: fica no banco.
+        self.assertTrue(Lote.objects.filter(leilao=self.pendente).exists())
+        self.assertFalse(LeilaoArquivado.objects.filter(leilao=self.pendente).exists())
+        self.assertTrue(ResumoDiarioLeilao.objects.filter(leilao=self.antigo).exists())
+        arquivamento = LeilaoArquivado.objects.get(leilao=self.antigo)
+        self.assertEqual((arquivamento.lotes, arquivamento.visitas, arquivamento.visitantes, arquivamento.arremates, arquivamento.valor_total), (6, 6, 4, 2, 3003))
+        with gzip.open(os.path.join(self.pasta(self.antigo), 'historico.csv.gz'), 'rt') as arquivo:
+            self.assertEqual(len(arquivo.read().splitlines()), historico + 1)
+        self.assertEqual([lote['numero_lote'] for lote in ler_arquivo(arquivamento, 'lotes')], list(range(6)))
+        # dashboard_leilao e a análise de preços respondem igual, a partir dos arquivos.
+        self.assertEqual(self.dashboard(self.antigo), antes)
+        self.assertEqual(self.client.get(reverse('analise_precos_leilao_api', args=[self.antigo.id])).json()['vendidos'], 2)
+        # Os resumos do arquivado ficam mesmo numa reconstrução completa.
+        resumos = list(ResumoDiarioLeilao.objects.filter(leilao=self.antigo).values_list('visitas', 'arremates'))
+        reconstruir_resumos()
+        self.assertEqual(list(ResumoDiarioLeilao.objects.filter(leilao=self.antigo).values_list('visitas', 'arremates')), resumos)
+        # Os já arquivados não são arquivados de novo; o leilão de hoje ainda não.
+        call_command('archive_leiloes', '--before=2100-01-01', stdout=saida)
+        self.assertIn('0 leilões arquivados', saida.getvalue())
+        with self.assertRaises(LeilaoEmAndamento): arquivar_leilao(self.recente)
+
+    def test_nao_arquiva_leilao_em_andamento(self):
+        with self.assertRaises(LeilaoEmAndamento): arquivar_leilao(self.pendente)
+        Lote.objects.filter(leilao=self.antigo, numero_lote=0).update(status='ARREMATADO')
+        self.assertNotIn(self.antigo, leiloes_para_arquivar(datetime.date(2021, 1, 1)))
+        self.assertEqual(Lote.objects.filter(leilao=self.pendente).count(), 1)
+        self.assertFalse(os.path.exists(self.pasta(self.pendente)))
+
+    def test_falha_desfaz_o_arquivamento(self):
+        with mock.patch('core.arquivamento.LeilaoArquivado.objects.create', side_effect=RuntimeError('falha')):
+            with self.assertRaises(RuntimeError): arquivar_leilao(self.antigo)
+        self.assertEqual(Lote.objects.filter(leilao=self.antigo).count(), 6)
+        self.assertEqual(Arremate.objects.filter(lote__leilao=self.antigo).count(), 2)
+        self.assertFalse(LeilaoArquivado.objects.exists())
+        self.assertFalse(os.path.exists(self.pasta(self.antigo)))
+
+
+# --- LISTAGEM DE LOTES: CURSOR E BUSCA (core/paginacao.py, core/busca.py) ---
+
+class ListagemLotesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        comitente = Comitente.objects.create(nome='Comitente')
+        cls.leiloes = [Leilao.objects.create(nome_evento=f'Leilão {i}', data_leilao_principal=datetime.date.today()) for i in range(3)]
+        Veiculo.objects.bulk_create([Veiculo(placa=f'ABC{i:04d}', min_veiculo='Fiat Uno' if i % 2 else 'VW Gol') for i in range(45)])
+        Lote.objects.bulk_create([Lote(leilao=cls.leiloes[i % 3], veiculo_id=f'ABC{i:04d}', comitente=comitente, numero_lote=i) for i in range(45)])
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def chaves(self, pagina):
+        return [(lote.leilao_id, lote.numero_lote) for lote in pagina]
+
+    def test_percorre_todas_as_paginas_nos_dois_sentidos(self):
+        esperado = list(Lote.objects.order_by('leilao_id', 'numero_lote').values_list('leilao_id', 'numero_lote'))
+        paginas = [paginar_por_cursor(Lote.objects.all(), ('leilao_id', 'numero_lote'), tamanho=10)]
+        while paginas[-1].cursor_proxima:
+            paginas.append(paginar_por_cursor(Lote.objects.all(), ('leilao_id', 'numero_lote'), depois=paginas[-1].cursor_proxima, tamanho=10))
+        self.assertEqual([chave for pagina in paginas for chave in self.chaves(pagina)], esperado)
+        self.assertIsNone(paginas[0].cursor_anterior)
+        anterior = paginar_por_cursor(Lote.objects.all(), ('leilao_id', 'numero_lote'), antes=paginas[2].cursor_anterior, tamanho=10)
+        self.assertEqual(self.chaves(anterior), self.chaves(paginas[1]))
+
+    def test_cursor_invalido_volta_para_a_primeira_pagina(self):
+        pagina = paginar_por_cursor(Lote.objects.all(), ('leilao_id', 'numero_lote'), depois='nao-e-um-cursor', tamanho=10)
+        self.assertEqual(self.chaves(pagina)[0], (self.leiloes[0].id, 0))
+
+    def test_pagina_profunda_custa_o_mesmo_que_a_primeira(self):
+        self.client.force_login(self.usuario)
+        url = reverse('lista_completa_veiculos')
+        with CaptureQueriesContext(connection) as primeira: self.client.get(url)
+        with CaptureQueriesContext(connection) as profunda: self.client.get(url, {'depois': codificar_cursor([self.leiloes[2].id, 20])})
+        self.assertEqual(len(primeira), len(profunda))
+        self.assertFalse(any('COUNT(' in consulta['sql'] or 'OFFSET' in consulta['sql'] for consulta in profunda.captured_queries))
+
+    def test_busca_por_placa_e_descricao(self):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('lista_completa_veiculos'), {'q': 'abc0003'})
+        self.assertEqual([lote.veiculo_id for lote in resposta.context['pagina']], ['ABC0003'])
+        resposta = self.client.get(reverse('lista_completa_veiculos'), {'q': 'uno', 'leilao': self.leiloes[1].id})
+        self.assertTrue(resposta.context['pagina'].itens)
+        self.assertTrue(all(lote.veiculo.min_veiculo == 'Fiat Uno' and lote.leilao_id == self.leiloes[1].id for lote in resposta.context['pagina']))
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 é específico do SQLite.')
+    def test_indice_fts_acompanha_alteracoes_em_massa(self):
+        self.assertTrue(fts_disponivel())
+        Veiculo.objects.filter(placa='ABC0004').update(min_veiculo='Chevrolet Onix')
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('lista_completa_veiculos'), {'q': 'onix'})
+        self.assertEqual([lote.veiculo_id for lote in resposta.context['pagina']], ['ABC0004'])
+        Veiculo.objects.create(placa='XYZ9999', min_veiculo='Chevrolet Onix')
+        Veiculo.objects.filter(placa='XYZ9999').delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT placa FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH 'onix'")
+            self.assertEqual(cursor.fetchall(), [('ABC0004',)])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 é específico do SQLite.')
+    def test_indice_fts_da_versao_anterior_e_refeito(self):
+        # A versão anterior indexava pelo rowid de core_veiculo (content='core_veiculo').
+        with connection.cursor() as cursor:
+            for trigger in TRIGGERS_FTS: cursor.execute(f"DROP TRIGGER {trigger}")
+            cursor.execute(f"DROP TABLE {TABELA_FTS}")
+            cursor.execute(f"CREATE VIRTUAL TABLE {TABELA_FTS} USING fts5(placa, min_veiculo, content='core_veiculo', content_rowid='rowid')")
+        self.assertTrue(criar_indice_busca())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = %s", [TABELA_FTS])
+            self.assertNotIn('content=', cursor.fetchone()[0])
+            cursor.execute(f"SELECT count(*) FROM {TABELA_FTS}")
+            self.assertEqual(cursor.fetchone()[0], Veiculo.objects.count())
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('lista_completa_veiculos'), {'q': 'abc0003'})
+        self.assertEqual([lote.veiculo_id for lote in resposta.context['pagina']], ['ABC0003'])
+
+
+# --- MASSA E MEDIÇÃO DO BENCHMARK (core/benchmark.py) ---
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.volumes = volumes_em_escala(leiloes=3, lotes=60, visitas=300, arremates=30, clientes=40, comitentes=4)
+        cls.totais = popular_banco(cls.volumes)
+
+    def test_massa_gerada_nos_volumes_pedidos(self):
+        self.assertEqual(Leilao.objects.count(), 3)
+        self.assertEqual(Lote.objects.count(), 60)
+        self.assertEqual(Visita.objects.count(), 300)
+        self.assertEqual(Arremate.objects.count(), self.totais['arremates'])
+        self.assertEqual(Lote.objects.exclude(status='DISPONIVEL').count(), self.totais['arremates'])
+        # Clientes recorrentes: bem menos documentos distintos do que visitas, todos ligados ao cadastro.
+        self.assertLess(Visita.objects.values('cliente_id').distinct().count(), 40)
+        self.assertFalse(Visita.objects.filter(cliente__isnull=True).exists())
+        self.assertTrue(ResumoDiarioLeilao.objects.filter(dia=datetime.date.today()).exists())
+        # Histórico: o cadastro de cada lote e ao menos o arremate de cada lote vendido.
+        self.assertEqual(HistoricoStatusLote.objects.filter(status_anterior='').count(), 60)
+        self.assertEqual(HistoricoStatusLote.objects.filter(status='ARREMATADO').count(), self.totais['arremates'])
+
+    def test_relatorio_cobre_todos_os_cenarios(self):
+        relatorio = medir_views(repeticoes=1, linhas_upload=10)
+        self.assertEqual(relatorio['volumes']['lotes'], 60)
+        for nome in ('dashboard[hoje]', 'dashboard[total]', 'dashboard_leilao', 'lista_completa_veiculos', 'upload_excel[importacao]', 'exportar_veiculos_xls[xlsx]', 'gerenciar_lotes'):
+            self.assertEqual(relatorio['cenarios'][nome]['status'], 200, nome)
+            self.assertGreater(relatorio['cenarios'][nome]['consultas'], 0)
+        json.dumps(relatorio)
+        # Reimportar os mesmos lotes não altera a massa.
+        self.assertEqual(Lote.objects.count(), 60)
+
+    def test_limpeza_remove_so_a_massa_gerada(self):
+        leilao = Leilao.objects.create(nome_evento='Leilão real', data_leilao_principal=datetime.date.today())
+        self.assertEqual(limpar_benchmark(), 3)
+        self.assertEqual(list(Leilao.objects.all()), [leilao])
+        self.assertFalse(Lote.objects.exists() or Visita.objects.exists() or Cliente.objects.exists())
+
+
+class InicializacaoTests(SimpleTestCase):
+    def test_inicializacao_sem_bibliotecas_pesadas_e_dentro_do_orcamento(self):
+        # pandas, openpyxl e requests só são carregados no primeiro uso (importação, exportação, API externa).
+        for nome, medida in medir_inicializacao(execucoes=2).items():
+            self.assertEqual(medida['modulos_pesados'], [], nome)
+            self.assertLess(medida['total_ms'], ORCAMENTO_INICIALIZACAO_MS, nome)
+
+    def test_clean_decimal_sem_pandas(self):
+        self.assertEqual(_clean_decimal('R$ 1.234,56'), 1234.56)
+        self.assertEqual(_clean_decimal(1500), 1500.0)
+        self.assertEqual(_clean_decimal(float('nan')), 0.0)
+        self.assertEqual(_clean_decimal(''), 0.0)
+        self.assertEqual(_clean_decimal(None), 0.0)
+
+
+# --- PERFIL DAS REQUISIÇÕES (core/perfil.py) ---
+
+@override_settings(MIDDLEWARE=['core.perfil.PerfilRequisicoesMiddleware', *settings.MIDDLEWARE], PERFIL_AMOSTRAGEM=0, PERFIL_LIMITE_LENTO_MS=60_000)
+class PerfilRequisicoesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.recepcao = User.objects.create_user('recepcao', 'recepcao@example.com', 'senha')
+        Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+
+    def setUp(self):
+        cache.clear(); histogramas.zerar()
+
+    @override_settings(PERFIL_LIMITE_LENTO_MS=0)
+    def test_agrega_tempo_consultas_e_templates_por_view(self):
+        self.client.force_login(self.staff)
+        with self.assertLogs('core.perfil') as logs:
+            for _ in range(3): self.client.get(reverse('dashboard'), {'periodo': 'total'})
+            dados = self.client.get(reverse('perfil_requisicoes_api')).json()
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual(registro['view'], 'dashboard')
+        self.assertGreater(registro['consultas'], 0)
+        self.assertTrue(registro['consultas_lentas'] and len(registro['consultas_lentas']) <= 5)
+        self.assertTrue(dados['ativo'])
+        dashboard = dados['views']['dashboard']
+        self.assertEqual(dashboard['requisicoes'], 3)
+        self.assertEqual(sum(dashboard['histograma'].values()), 3)
+        self.assertGreater(dashboard['templates_media_ms'], 0)
+
+    def test_endpoint_e_perfil_so_para_staff(self):
+        self.client.force_login(self.recepcao)
+        self.assertEqual(self.client.get(reverse('perfil_requisicoes_api')).status_code, 302)
+        resposta = self.client.get(reverse('dashboard_recepcao'), headers={'X-Perfil': 'cprofile'})
+        self.assertIn('text/html', resposta['Content-Type'])
+        self.client.force_login(self.staff)
+        resposta = self.client.get(reverse('dashboard_recepcao'), headers={'X-Perfil': 'cprofile'})
+        self.assertIn('text/plain', resposta['Content-Type'])
+        self.assertIn('function calls', resposta.content.decode())
+
+    def requisicao(self, nome, *args):
+        request = RequestFactory().get(reverse(nome, args=args)); request.resolver_match = resolve(request.path)
+        return request
+
+    def test_views_assincronas_sem_adaptar_a_pilha(self):
+        async def view(request):
+            return JsonResponse({'leiloes': await Leilao.objects.acount()})
+        middleware = PerfilRequisicoesMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(json.loads(async_to_sync(middleware)(self.requisicao('dashboard_api')).content), {'leiloes': 1})
+        self.assertEqual(histogramas.resumo()['views']['dashboard_api']['consultas_media'], 1)
+        # Fluxo SSE e long-poll: o tempo é o da espera por eventos, não entra nos histogramas.
+        async def fluxo(request):
+            return StreamingHttpResponse(iter(['data: {}\n\n']), content_type='text/event-stream')
+        self.assertTrue(async_to_sync(PerfilRequisicoesMiddleware(fluxo))(self.requisicao('feed')).streaming)
+        async_to_sync(middleware)(self.requisicao('eventos_api'))
+        self.assertEqual(list(histogramas.resumo()['views']), ['dashboard_api'])
+
+
+# --- PERFIS DE BANCO (config/settings.py) ---
+
+class PerfilBancoTests(TestCase):
+    @skipUnless(connection.vendor == 'sqlite' and not connection.is_in_memory_db(), 'Perfil SQLite em arquivo.')
+    def test_pragmas_do_sqlite_em_cada_nova_conexao(self):
+        nova = connections.create_connection('default')
+        try:
+            with nova.cursor() as cursor:
+                valores = {}
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {pragma}'); valores[pragma] = cursor.fetchone()[0]
+        finally:
+            nova.close()
+        self.assertEqual(valores['journal_mode'], 'wal')
+        self.assertEqual(valores['synchronous'], 1)  # NORMAL
+        self.assertEqual(valores['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(valores['mmap_size'], settings.SQLITE_PRAGMAS['mmap_size'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Perfil PostgreSQL (DB_ENGINE=postgres).')
+    def test_conexoes_persistentes_e_cursores_no_servidor(self):
+        self.assertGreater(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+        # As exportações leem com .iterator(): com cursores no servidor, em blocos, sem carregar tudo.
+        self.assertFalse(connection.settings_dict['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertTrue(connection.features.can_use_chunked_reads)
+
+
+# --- CHECK-IN DE VISITAS (core/visitas.py) ---
+
+@override_settings(VISITAS_JANELA_MS=0)
+class CheckinVisitasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('recepcao', 'recepcao@example.com', 'senha')
+        hoje = datetime.date.today()
+        cls.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=hoje + datetime.timedelta(days=3))
+        cls.encerrado = Leilao.objects.create(nome_evento='Encerrado', data_leilao_principal=hoje - datetime.timedelta(days=1))
+
+    def setUp(self):
+        cache.clear(); self.client.force_login(self.usuario)
+
+    def enviar(self, dados):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('registrar_visitas_api'), json.dumps(dados), content_type='application/json')
+
+    def test_lote_de_checkins_com_duplicados_e_invalidos(self):
+        resposta = self.enviar({'visitas': [
+            {'leilao': self.leilao.id, 'cpf': '123.456.789-01', 'nome': 'Maria'},
+            {'leilao': self.leilao.id, 'cpf': '12345678901', 'nome': 'Maria'},
+            {'leilao': self.encerrado.id, 'cpf': '98765432100', 'nome': 'João'},
+            {'leilao': self.leilao.id, 'cpf': '123', 'nome': 'Curto'},
+            {'leilao': self.leilao.id, 'cpf': '98765432100'},
+        ]})
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual([r['status'] for r in resposta.json()['resultados']], ['registrada', 'duplicada', 'invalida', 'invalida', 'registrada'])
+        self.assertEqual(Visita.objects.count(), 2)
+        self.assertEqual(Visita.objects.get(cpf_cliente='12345678901').cliente.nome, 'Maria')
+        self.assertEqual(ResumoDiarioLeilao.objects.get(leilao=self.leilao).visitas, 2)
+        # Reenvio (ex.: a recepção não recebeu a resposta): nada é gravado de novo.
+        resposta = self.enviar({'leilao': self.leilao.id, 'cpf': '123.456.789-01', 'nome': 'Maria'})
+        self.assertEqual((resposta.status_code, resposta.json()['duplicadas']), (200, 1))
+        self.assertEqual(Visita.objects.count(), 2)
+
+    def test_requisicao_invalida(self):
+        self.assertEqual(self.client.post(reverse('registrar_visitas_api'), 'x', content_type='application/json').status_code, 400)
+        self.assertEqual(self.enviar([]).status_code, 400)
+        self.assertEqual(self.enviar({'leilao': self.encerrado.id, 'cpf': '12345678901'}).status_code, 400)
+
+    def test_formulario_usa_o_mesmo_caminho_e_lista_so_leiloes_ativos(self):
+        resposta = self.client.get(reverse('registrar_visita'))
+        self.assertEqual(resposta.context['leiloes'], [(self.leilao.id, 'Leilão')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registrar_visita'), {'leilao': self.leilao.id, 'cpf': '123.456.789-01', 'nome': 'Maria'})
+            self.client.post(reverse('registrar_visita'), {'leilao': self.leilao.id, 'cpf': '123.456.789-01', 'nome': 'Maria'})
+        self.assertEqual(Visita.objects.get().cpf_cliente, '12345678901')
+
+@skipUnless(connection.vendor != 'sqlite' or not connection.is_in_memory_db(), 'Precisa de um banco compartilhado entre threads (SQLite em arquivo ou PostgreSQL).')
+@override_settings(VISITAS_JANELA_MS=100, VISITAS_GRUPO_MAXIMO=1000)
+class GrupoCheckinVisitasTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.leilao = Leilao.objects.create(nome_evento='Leilão', data_leilao_principal=datetime.date.today())
+
+    def checkin(self, documento, largada):
+        largada.wait()
+        try: return visitas.registrar_visitas([{'leilao': self.leilao.id, 'cpf': documento, 'nome': 'Cliente'}])[0]['status']
+        finally: connections.close_all()
+
+    def test_requisicoes_simultaneas_gravadas_em_grupo_e_confirmadas(self):
+        documentos = [f'{numero:011d}' for numero in range(7)] + ['00000000000']
+        largada = threading.Barrier(len(documentos))
+        with mock.patch.object(visitas, 'gravar_checkins', wraps=visitas.gravar_checkins) as gravar:
+            with ThreadPoolExecutor(max_workers=len(documentos)) as executor:
+                status = list(executor.map(lambda documento: self.checkin(documento, largada), documentos))
+        # Quando cada requisição retorna, as suas visitas já estão gravadas.
+        self.assertEqual(sorted(status), ['duplicada'] + ['registrada'] * 7)
+        self.assertEqual(Visita.objects.count(), 7)
+        self.assertLess(gravar.call_count, len(documentos))
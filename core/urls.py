@@ -12,24 +12,40 @@ urlpatterns = [
 
     # Rota da nossa API interna para buscar clientes
     path('api/buscar-cliente/', views.buscar_cliente_api, name='buscar_cliente_api'),
+    path('api/clientes/', views.buscar_clientes_api, name='buscar_clientes_api'),
+    path('api/jobs/<int:job_id>/', views.status_job_api, name='status_job_api'),
+    path('api/perfil/', views.perfil_requisicoes_api, name='perfil_requisicoes_api'),
+    path('api/analises/', views.analise_precos_api, name='analise_precos_api'),
+    path('api/analises/leilao/<int:leilao_id>/', views.analise_precos_api, name='analise_precos_leilao_api'),
+
+    # Feed ao vivo (SSE e long-poll) de lotes vendidos e mudanças de status
+    path('api/feed/', views.feed_leilao, name='feed'),
+    path('api/feed/leilao/<int:leilao_id>/', views.feed_leilao, name='feed_leilao'),
+    path('api/eventos/', views.eventos_leilao_api, name='eventos_api'),
+    path('api/eventos/leilao/<int:leilao_id>/', views.eventos_leilao_api, name='eventos_leilao_api'),
 
     # Dashboards
     path('', views.dashboard, name='dashboard'),
     path('recepcao/', views.dashboard_recepcao, name='dashboard_recepcao'),
+    path('api/dashboard/', views.dashboard_api, name='dashboard_api'),
     
     # Ferramentas e Listagens
     path('leilao/novo/', views.criar_leilao, name='criar_leilao'),
     path('veiculos/', views.lista_completa_veiculos, name='lista_completa_veiculos'),
     path('upload/', views.upload_excel, name='upload_excel'),
+    path('upload/resultados/', views.importar_resultados, name='importar_resultados'),
     path('registrar-visita/', views.registrar_visita, name='registrar_visita'),
+    path('api/visitas/', views.registrar_visitas_api, name='registrar_visitas_api'),
     path('leilao/<int:leilao_id>/visitantes/', views.lista_visitantes_leilao, name='lista_visitantes_leilao'),
     path('gerenciar-lotes/', views.gerenciar_lotes, name='gerenciar_lotes'),
     path('veiculos/exportar/', views.exportar_veiculos_xls, name='exportar_veiculos'),
+    path('jobs/<int:job_id>/download/', views.download_job, name='download_job'),
 
     # Fluxo de Arremate
     path('arremates/', views.selecionar_leilao_arremate, name='selecionar_leilao_arremate'),
     path('leilao/<int:leilao_id>/', views.lista_veiculos_leilao, name='lista_veiculos_leilao'),
     path('leilao/<int:leilao_id>/arrematar/<str:placa_veiculo>/', views.registrar_arremate_final, name='registrar_arremate_final'),
+    path('api/leilao/<int:leilao_id>/lotes/<int:lote_id>/arrematar/', views.arrematar_lote_api, name='arrematar_lote_api'),
     
     #Rota Dashboard Especifico
     path('dashboard/leilao/<int:leilao_id>/', views.dashboard_leilao, name='dashboard_leilao'),
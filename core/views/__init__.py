@@ -0,0 +1,27 @@
+# Arquivo: core/views/__init__.py
+# Views divididas por assunto. Cada módulo só é importado quando uma de suas views é usada
+# (core/urls.py acessa views.<nome>), e as bibliotecas pesadas (pandas, openpyxl, requests)
+# ficam dentro dos serviços que as usam, carregadas no primeiro uso.
+from importlib import import_module
+
+MODULOS = {
+    'api': ('buscar_cliente_api', 'buscar_clientes_api'),
+    'dashboards': ('PERIODOS_DASHBOARD', 'dashboard', 'dashboard_api', 'dashboard_leilao', 'dashboard_recepcao', 'analise_precos_api', 'perfil_requisicoes_api'),
+    'planilhas': ('upload_excel', 'importar_resultados', 'exportar_veiculos_xls', 'status_job_api', 'download_job'),
+    'feed': ('feed_leilao', 'eventos_leilao_api'),
+    'leiloes': (
+        'redirect_apos_login', 'logout_view', 'criar_leilao', 'registrar_visita', 'registrar_visitas_api',
+        'selecionar_leilao_arremate', 'lista_veiculos_leilao', 'registrar_arremate_final', 'arrematar_lote_api',
+        'lista_completa_veiculos', 'lista_visitantes_leilao', 'gerenciar_lotes',
+    ),
+}
+_MODULO_DA_VIEW = {nome: modulo for modulo, nomes in MODULOS.items() for nome in nomes}
+
+__all__ = list(_MODULO_DA_VIEW)
+
+def __getattr__(nome):
+    modulo = _MODULO_DA_VIEW.get(nome)
+    if modulo is None: raise AttributeError(f'module {__name__!r} has no attribute {nome!r}')
+    valor = getattr(import_module(f'.{modulo}', __name__), nome)
+    globals()[nome] = valor
+    return valor
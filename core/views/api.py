@@ -0,0 +1,25 @@
+# Arquivo: core/views/api.py
+# Busca de clientes: API externa (core/clientes.py, carrega o requests no primeiro uso) e cadastro local.
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from ..clientes import obter_diretorio, buscar_clientes_locais, ErroAutenticacao
+
+# --- VIEW DE API ---
+@login_required
+def buscar_cliente_api(request):
+    doc = request.GET.get('cpf')
+    if not doc:
+        return JsonResponse({'error': 'Documento não fornecido'}, status=400)
+    try:
+        nome = obter_diretorio().buscar_nome(doc)
+    except ErroAutenticacao as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    if nome:
+        return JsonResponse({'nome': nome})
+    return JsonResponse({'error': 'Cliente não encontrado. Verifique o documento.'}, status=404)
+
+@login_required
+def buscar_clientes_api(request):
+    # Autocomplete por prefixo do CPF/CNPJ ou do nome, só no cadastro local.
+    clientes = buscar_clientes_locais(request.GET.get('q'))
+    return JsonResponse({'clientes': [{'id': c.id, 'documento': c.documento, 'nome': c.nome} for c in clientes]})
@@ -0,0 +1,13 @@
+# Arquivo: core/views/comum.py
+# Auxiliares compartilhados pelos módulos de views.
+
+# --- FUNÇÕES AUXILIARES E DE PERMISSÃO ---
+
+def is_admin(user): return user.is_superuser
+
+def _filtros_lotes(request):
+    # Filtros da listagem/exportação de lotes; ids que não são números são ignorados.
+    filtros = {'status': request.GET.get('status') or '', 'comitente': request.GET.get('comitente') or '', 'leilao': request.GET.get('leilao') or '', 'busca': (request.GET.get('q') or '').strip()}
+    for campo in ('comitente', 'leilao'):
+        if not filtros[campo].isdigit(): filtros[campo] = ''
+    return filtros
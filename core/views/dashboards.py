@@ -0,0 +1,208 @@
+# Arquivo: core/views/dashboards.py
+# Dashboards (geral, da recepção e por leilão), servidos pelo cache versionado de core/cache_dashboard.py,
+# a API JSON do dashboard geral (GET condicional), a análise de preços (core/analises.py) e os
+# histogramas do perfil de requisições.
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Max, Sum
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from ..analises import analise_precos
+from ..arquivamento import detalhes_arquivados
+from ..cache_dashboard import obter_ou_calcular, ultima_alteracao
+from ..funil import calcular_funil, funil_do_leilao, funil_por_comitente
+from ..models import Leilao, Lote, Visita, Arremate, ResumoDiarioLeilao, ResumoDiarioComitente
+from ..perfil import histogramas
+from .comum import is_admin
+
+PERIODOS_DASHBOARD = ('hoje', 'semana', 'mes', 'total')
+
+def _leiloes_com_visitas():
+    return Leilao.objects.annotate(num_visitas=Sum('resumos_diarios__visitas')).filter(num_visitas__gt=0).order_by('-data_leilao_principal')
+
+# --- VIEWS DE ADMIN (Apenas Superusuários) ---
+def _periodo(request):
+    periodo = request.GET.get('periodo', 'hoje')
+    return periodo if periodo in PERIODOS_DASHBOARD else 'hoje'
+
+@login_required
+@user_passes_test(is_admin)
+def dashboard(request):
+    periodo = _periodo(request)
+    contexto = obter_ou_calcular('dashboard', periodo, None, lambda: _contexto_dashboard(periodo))
+    return render(request, 'core/dashboard.html', contexto)
+
+def _filtros_periodo(periodo):
+    hoje = timezone.localtime().date()
+    if periodo == 'semana':
+        inicio_periodo_dt = hoje - timedelta(days=6); titulo_periodo = "nos Últimos 7 dias"
+    elif periodo == 'mes':
+        inicio_periodo_dt = hoje.replace(day=1); titulo_periodo = "neste Mês"
+    elif periodo == 'total':
+        inicio_periodo_dt = None; titulo_periodo = "Desde o Início"
+    else:
+        inicio_periodo_dt = hoje; titulo_periodo = "Hoje"
+    
+    visitas_filtradas = Visita.objects.all(); arremates_filtrados = Arremate.objects.all(); resumos_filtrados = ResumoDiarioLeilao.objects.all()
+    if inicio_periodo_dt:
+        inicio_periodo = timezone.make_aware(timezone.datetime.combine(inicio_periodo_dt, timezone.datetime.min.time()))
+        if periodo == 'hoje':
+            fim_periodo = inicio_periodo + timezone.timedelta(days=1)
+            visitas_filtradas = visitas_filtradas.filter(data_visita__gte=inicio_periodo, data_visita__lt=fim_periodo)
+            arremates_filtrados = arremates_filtrados.filter(data_arremate__gte=inicio_periodo, data_arremate__lt=fim_periodo)
+            resumos_filtrados = resumos_filtrados.filter(dia=inicio_periodo_dt)
+        else:
+            visitas_filtradas = visitas_filtradas.filter(data_visita__gte=inicio_periodo)
+            arremates_filtrados = arremates_filtrados.filter(data_arremate__gte=inicio_periodo)
+            resumos_filtrados = resumos_filtrados.filter(dia__gte=inicio_periodo_dt)
+    return titulo_periodo, visitas_filtradas, arremates_filtrados, resumos_filtrados
+
+def _dados_dashboard(periodo):
+    # KPIs, gráfico dos últimos 7 dias, top arrematantes e funil, só com tipos JSON: é o que
+    # dashboard_api devolve e a base do contexto do template.
+    titulo_periodo, visitas_filtradas, arremates_filtrados, resumos_filtrados = _filtros_periodo(periodo)
+    # CÁLCULOS DE RELAÇÃO (interseções e diferenças de CPFs feitas no banco, ver core/funil.py)
+    funil = calcular_funil(visitas_filtradas, arremates_filtrados)
+    # Totais e gráfico vêm dos resumos diários (core/resumos.py)
+    data_inicial_grafico = timezone.localtime().date() - timedelta(days=6)
+    vendas_por_dia = ResumoDiarioLeilao.objects.filter(dia__gte=data_inicial_grafico, arremates__gt=0).values('dia').annotate(total=Sum('valor_total')).order_by('dia')
+    totais_periodo = resumos_filtrados.aggregate(visitas=Sum('visitas'), total=Sum('valor_total'))
+    top_arrematantes = arremates_filtrados.filter(cliente__isnull=False).values('cliente_id', 'cliente__documento', 'cliente__nome').annotate(total_gasto=Sum('valor_arremate')).order_by('-total_gasto')[:5]
+    return {
+        'periodo': periodo, 'titulo_periodo': titulo_periodo,
+        'visitas_periodo': totais_periodo['visitas'] or 0, 'total_arrematado_periodo': float(totais_periodo['total'] or 0),
+        'total_veiculos_disponiveis': Lote.objects.filter(status='DISPONIVEL').count(),
+        'funil': funil,
+        'vendas_por_dia': {'labels': [v['dia'].strftime('%d/%m') for v in vendas_por_dia], 'valores': [float(v['total']) for v in vendas_por_dia]},
+        'top_arrematantes': [
+            {'cpf_cliente': arrematante['cliente__documento'], 'nome_cliente': arrematante['cliente__nome'], 'total_gasto': float(arrematante['total_gasto'])}
+            for arrematante in top_arrematantes
+        ],
+    }
+
+def _moeda(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _contexto_dashboard(periodo):
+    dados = _dados_dashboard(periodo)
+    _, _, arremates_filtrados, _ = _filtros_periodo(periodo)
+    funil = dados['funil']
+    todos_os_leiloes = Leilao.objects.all().order_by('-data_leilao_principal')
+    leiloes_com_visitas_total = list(_leiloes_com_visitas()[:10])
+    # O dashboard mostra só os 10 primeiros de cada lista; o contexto vai para o cache já avaliado.
+    veiculos_disponiveis = list(Lote.objects.filter(status='DISPONIVEL').select_related('veiculo').order_by('numero_lote')[:10])
+    veiculos_arrematados_periodo = list(Lote.objects.filter(status='ARREMATADO', arremate__in=arremates_filtrados).select_related('veiculo').order_by('numero_lote')[:10])
+    
+    contexto = {
+        'total_veiculos_disponiveis': dados['total_veiculos_disponiveis'], 'visitas_periodo': dados['visitas_periodo'],
+        'total_arrematado_periodo': _moeda(dados['total_arrematado_periodo']),
+        'top_arrematantes': [dict(arrematante, total_gasto_formatado=_moeda(arrematante['total_gasto'])) for arrematante in dados['top_arrematantes']],
+        'veiculos_disponiveis': veiculos_disponiveis,
+        'veiculos_arrematados_periodo': veiculos_arrematados_periodo, 'titulo_periodo': dados['titulo_periodo'],
+        'periodo_selecionado': periodo, 'leiloes_com_visitas_total': leiloes_com_visitas_total,
+        'taxa_conversao': funil['taxa_conversao'],
+        'labels_grafico': dados['vendas_por_dia']['labels'], 'data_grafico': dados['vendas_por_dia']['valores'],
+        'visitantes_que_arremataram': funil['visitantes_que_arremataram'],
+        'visitantes_nao_arremataram': funil['visitantes_nao_arremataram'],
+        'arrematantes_nao_visitaram': funil['arrematantes_nao_visitaram'],
+        'todos_os_leiloes': list(todos_os_leiloes),
+    }
+    return contexto
+
+# --- API DO DASHBOARD (GET condicional) ---
+# O gráfico e os KPIs do dashboard são atualizados por polling (static/js/dashboard_chart.js). A
+# marca da resposta muda quando os dashboards são invalidados (core/cache_dashboard.py), quando
+# entra uma visita ou arremate (maiores ids, que pegam também escritas de outros processos com
+# cache local) e na virada do dia. Sem mudança, a resposta é um 304 sem corpo. O corpo fica no
+# cache sob a própria marca, então um ETag novo nunca acompanha dados calculados antes dele.
+
+def _marca_dashboard(request):
+    if not hasattr(request, '_marca_dashboard'):
+        ultima_visita = Visita.objects.aggregate(ultima=Max('id'))['ultima']
+        ultimo_arremate = Arremate.objects.aggregate(ultimo=Max('id'))['ultimo']
+        alterado_em = max(ultima_alteracao(), timezone.make_aware(datetime.combine(timezone.localdate(), time.min)))
+        etag = f"{_periodo(request)}-{timezone.localdate():%Y%m%d}-{alterado_em.timestamp():.6f}-{ultima_visita or 0}-{ultimo_arremate or 0}"
+        request._marca_dashboard = (etag, alterado_em)
+    return request._marca_dashboard
+
+@login_required
+@user_passes_test(is_admin)
+@condition(etag_func=lambda request: _marca_dashboard(request)[0], last_modified_func=lambda request: _marca_dashboard(request)[1])
+def dashboard_api(request):
+    periodo = _periodo(request)
+    resposta = JsonResponse(obter_ou_calcular('dashboard_api', _marca_dashboard(request)[0], None, lambda: _dados_dashboard(periodo)))
+    # O navegador sempre revalida (If-None-Match) em vez de reaproveitar a resposta sem perguntar.
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+@login_required
+@user_passes_test(is_admin)
+def dashboard_leilao(request, leilao_id):
+    # Pega o objeto do leilão específico
+    leilao = Leilao.objects.select_related('arquivamento').get(id=leilao_id)
+    contexto = obter_ou_calcular('dashboard_leilao', None, leilao.id, lambda: _contexto_dashboard_leilao(leilao))
+    return render(request, 'core/dashboard_leilao.html', contexto)
+
+def _contexto_dashboard_leilao(leilao):
+    # Filtra as visitas e arremates APENAS deste leilão
+    visitas_do_leilao = Visita.objects.filter(leilao=leilao)
+    arremates_do_leilao = Arremate.objects.filter(lote__leilao=leilao)
+
+    # KPIs e totais por comitente vêm dos resumos diários
+    totais = ResumoDiarioLeilao.objects.filter(leilao=leilao).aggregate(visitas=Sum('visitas'), arremates=Sum('arremates'), total=Sum('valor_total'))
+    total_visitas = totais['visitas'] or 0
+    total_arremates = totais['arremates'] or 0
+    total_valor_arrematado = totais['total'] or 0.00
+    totais_por_comitente = list(ResumoDiarioComitente.objects.filter(leilao=leilao).values('comitente__nome').annotate(arremates=Sum('arremates'), total=Sum('valor_total')).order_by('-total'))
+
+    arquivamento = getattr(leilao, 'arquivamento', None)
+    if arquivamento is None:
+        # Pega a lista detalhada de visitantes e arrematantes deste leilão
+        detalhes = {
+            'funil': funil_do_leilao(leilao), 'funil_por_comitente': funil_por_comitente(leilao),
+            'lista_visitantes': list(visitas_do_leilao.order_by('-data_visita')),
+            'lista_arremates': list(arremates_do_leilao.select_related('lote__veiculo').order_by('-data_arremate')),
+        }
+    else:
+        # Leilão arquivado: as visitas e arremates não estão mais no banco (core/arquivamento.py).
+        detalhes = detalhes_arquivados(arquivamento)
+
+    contexto = {
+        'leilao': leilao,
+        'total_visitas': total_visitas,
+        'total_arremates': total_arremates,
+        'total_valor_arrematado': f"{total_valor_arrematado:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+        'totais_por_comitente': totais_por_comitente,
+        **detalhes,
+        'arquivamento': arquivamento,
+        'analise_precos': analise_precos(leilao.id, arquivamento),
+    }
+    return contexto
+
+@login_required
+@user_passes_test(is_admin)
+def analise_precos_api(request, leilao_id=None):
+    # Arremate/FIPE, arremate/lance inicial e taxa de venda, geral, por comitente e por veículo;
+    # sem leilao_id, de todos os leilões.
+    arquivamento = None
+    if leilao_id is not None: arquivamento = getattr(get_object_or_404(Leilao.objects.select_related('arquivamento'), id=leilao_id), 'arquivamento', None)
+    return JsonResponse(dict(analise_precos(leilao_id, arquivamento), leilao_id=leilao_id))
+
+# --- VIEWS DA RECEPÇÃO E GERAIS ---
+@login_required
+def dashboard_recepcao(request):
+    contexto = obter_ou_calcular('dashboard_recepcao', None, None, lambda: {'leiloes_com_visitas_total': list(_leiloes_com_visitas())})
+    return render(request, 'core/dashboard_recepcao.html', contexto)
+
+# --- PERFIL DAS REQUISIÇÕES ---
+@staff_member_required
+def perfil_requisicoes_api(request):
+    # Histogramas por view do processo que atendeu a requisição (core/perfil.py). POST com "zerar" reinicia a contagem.
+    if request.method == 'POST' and request.POST.get('zerar'): histogramas.zerar()
+    ativo = 'core.perfil.PerfilRequisicoesMiddleware' in settings.MIDDLEWARE
+    return JsonResponse(dict(histogramas.resumo(), ativo=ativo))
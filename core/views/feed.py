@@ -0,0 +1,38 @@
+# Arquivo: core/views/feed.py
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from ..feed import fluxo_sse, aguardar_eventos, atualizar_pendentes, pendentes_iniciais, ultimo_evento_id, serializar_evento, MAXIMO_PENDENTES, TEMPO_LONG_POLL
+
+# --- FEED AO VIVO (views assíncronas: conexões ociosas não prendem um worker quando servidas via ASGI) ---
+def _evento_inicial(request):
+    desde = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    return int(desde) if desde and desde.isdigit() else None
+
+@login_required
+async def feed_leilao(request, leilao_id=None):
+    desde = _evento_inicial(request)
+    if desde is None: desde = await ultimo_evento_id()
+    response = StreamingHttpResponse(fluxo_sse(leilao_id, desde), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'; response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _pendentes(request):
+    pendentes = request.GET.get('pendentes')
+    if pendentes is None: return None
+    return {int(evento_id) for evento_id in pendentes.split(',')[:MAXIMO_PENDENTES] if evento_id.isdigit()}
+
+@login_required
+async def eventos_leilao_api(request, leilao_id=None):
+    # Alternativa long-poll ao SSE: responde assim que houver eventos novos (ou após o tempo limite).
+    # O cliente devolve 'ultimo_id' em ?desde= e 'pendentes' em ?pendentes= (ids abaixo do cursor
+    # ainda sem evento, ver core/feed.py; quase sempre vazio).
+    desde = _evento_inicial(request)
+    if desde is None:
+        desde = await ultimo_evento_id()
+        return JsonResponse({'eventos': [], 'ultimo_id': desde, 'pendentes': sorted(await pendentes_iniciais(desde))})
+    pendentes = _pendentes(request)
+    if pendentes is None: pendentes = await pendentes_iniciais(desde)
+    eventos = await aguardar_eventos(leilao_id, desde, TEMPO_LONG_POLL, pendentes)
+    novo_desde = max([desde] + [evento.id for evento in eventos])
+    pendentes = await atualizar_pendentes(leilao_id, desde, novo_desde, pendentes, {evento.id for evento in eventos})
+    return JsonResponse({'eventos': [serializar_evento(evento) for evento in eventos], 'ultimo_id': novo_desde, 'pendentes': sorted(pendentes)})
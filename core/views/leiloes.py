@@ -0,0 +1,199 @@
+# Arquivo: core/views/leiloes.py
+# Operação dos leilões: login, cadastro, check-in da recepção, arremates e gestão de lotes.
+import json
+from urllib.parse import urlencode
+from django.contrib import messages
+from django.contrib.auth import logout
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.http import require_POST
+from ..cache_dashboard import leiloes_ativos, opcoes_comitentes, opcoes_leiloes
+from ..conversao import _clean_decimal
+from ..exportacao import filtrar_lotes
+from ..lotes import cancelar_arremates, transicionar_lotes, vender_lote, LoteIndisponivel, TransicaoInvalida, TRANSICOES
+from ..models import Leilao, Lote, Visita
+from ..paginacao import paginar_por_cursor
+from ..visitas import registrar_visitas, ColetorIndisponivel, MAXIMO_POR_REQUISICAO, REGISTRADA, DUPLICADA, INVALIDA
+from .comum import is_admin, _filtros_lotes
+
+@login_required
+def redirect_apos_login(request):
+    if request.user.is_superuser: return redirect('dashboard')
+    else: return redirect('dashboard_recepcao')
+
+@login_required
+def logout_view(request):
+    logout(request)
+    return redirect('login')
+
+@login_required
+@user_passes_test(is_admin)
+def criar_leilao(request):
+    if request.method == 'POST':
+        nome_evento = request.POST.get('nome_evento'); data_principal = request.POST.get('data_principal')
+        Leilao.objects.create(nome_evento=nome_evento, data_leilao_principal=data_principal)
+        messages.success(request, f"Leilão '{nome_evento}' criado com sucesso!")
+        return redirect('dashboard')
+    return render(request, 'core/criar_leilao.html')
+
+# --- VIEWS DA RECEPÇÃO E GERAIS ---
+@login_required
+def registrar_visita(request):
+    if request.method == 'POST':
+        leilao_id = request.POST.get('leilao'); cpf_cliente = request.POST.get('cpf'); nome_cliente = request.POST.get('nome')
+        if leilao_id and cpf_cliente and nome_cliente:
+            # Mesmo caminho da API de check-in (core/visitas.py): validação, deduplicação e gravação em grupo.
+            try:
+                resultado = registrar_visitas([{'leilao': leilao_id, 'cpf': cpf_cliente, 'nome': nome_cliente}])[0]
+            except ColetorIndisponivel as e:
+                resultado = {'status': INVALIDA, 'erro': str(e)}
+            if resultado['status'] == INVALIDA: messages.error(request, resultado['erro'])
+            elif resultado['status'] == DUPLICADA: messages.info(request, f"{nome_cliente} já tinha o check-in registrado hoje neste leilão.")
+            else: messages.success(request, f"Visita de {nome_cliente} registrada com sucesso!")
+        else:
+            messages.error(request, "Todos os campos são obrigatórios.")
+        return redirect('registrar_visita')
+    contexto = {'leiloes': list(leiloes_ativos().items())}
+    return render(request, 'core/registrar_visita.html', contexto)
+
+@login_required
+@require_POST
+def registrar_visitas_api(request):
+    # Check-in pela recepção: um objeto {"leilao", "cpf", "nome"}, uma lista deles ou {"visitas": [...]}.
+    # Só responde depois que as visitas foram gravadas (commit); reenviar é seguro, pois repetições
+    # do mesmo documento no mesmo leilão e dia voltam como "duplicada".
+    try: dados = json.loads(request.body or b'null')
+    except ValueError: return JsonResponse({'error': 'JSON inválido.'}, status=400)
+    itens = dados.get('visitas') if isinstance(dados, dict) and 'visitas' in dados else dados
+    if isinstance(itens, dict): itens = [itens]
+    if not isinstance(itens, list) or not itens: return JsonResponse({'error': 'Nenhum check-in enviado.'}, status=400)
+    if len(itens) > MAXIMO_POR_REQUISICAO: return JsonResponse({'error': f'Envie no máximo {MAXIMO_POR_REQUISICAO} check-ins por requisição.'}, status=400)
+    try: resultados = registrar_visitas(itens)
+    except ColetorIndisponivel as e: return JsonResponse({'error': str(e)}, status=503)
+    totais = {status: sum(1 for resultado in resultados if resultado['status'] == status) for status in (REGISTRADA, DUPLICADA, INVALIDA)}
+    status_http = 400 if totais[INVALIDA] == len(resultados) else 201 if totais[REGISTRADA] else 200
+    return JsonResponse({'registradas': totais[REGISTRADA], 'duplicadas': totais[DUPLICADA], 'invalidas': totais[INVALIDA], 'resultados': resultados}, status=status_http)
+
+@login_required
+def selecionar_leilao_arremate(request):
+    todos_os_leiloes = Leilao.objects.all().order_by('-data_leilao_principal')
+    contexto = { 'leiloes': todos_os_leiloes }
+    return render(request, 'core/selecionar_leilao.html', contexto)
+
+@login_required
+def lista_veiculos_leilao(request, leilao_id):
+    leilao = get_object_or_404(Leilao, id=leilao_id)
+    lotes_disponiveis = Lote.objects.filter(leilao=leilao, status='DISPONIVEL').select_related('veiculo', 'comitente').order_by('numero_lote')
+    contexto = { 'leilao': leilao, 'lotes': lotes_disponiveis }
+    return render(request, 'core/lista_veiculos.html', contexto)
+
+@login_required
+def registrar_arremate_final(request, leilao_id, placa_veiculo):
+    leilao = get_object_or_404(Leilao, id=leilao_id)
+    # A mesma placa pode estar em mais de um lote do leilão (core/resultados.py): vale o primeiro
+    # ainda disponível; sem nenhum, o primeiro lote, só para a mensagem de indisponível.
+    lotes = Lote.objects.select_related('veiculo').filter(leilao=leilao, veiculo_id=placa_veiculo)
+    lote = lotes.filter(status='DISPONIVEL').first() or lotes.first()
+    if lote is None: raise Http404("Lote não encontrado neste leilão.")
+    if lote.status != 'DISPONIVEL':
+        messages.error(request, f"O lote {lote.numero_lote} ({lote.veiculo.placa}) não está mais disponível.")
+        return redirect('lista_veiculos_leilao', leilao_id=leilao.id)
+    if request.method == 'POST':
+        cpf_cliente = request.POST.get('cpf', '').strip(); valor_arremate = _clean_decimal(request.POST.get('valor_arremate'))
+        if not cpf_cliente or valor_arremate <= 0:
+            messages.error(request, "CPF/CNPJ e valor do arremate são obrigatórios.")
+            return redirect('registrar_arremate_final', leilao_id=leilao.id, placa_veiculo=placa_veiculo)
+        try:
+            vender_lote(lote, cpf_cliente, request.POST.get('nome'), valor_arremate, request.POST.get('data_arremate'))
+        except LoteIndisponivel as e:
+            messages.error(request, str(e))
+            return redirect('lista_veiculos_leilao', leilao_id=leilao.id)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('registrar_arremate_final', leilao_id=leilao.id, placa_veiculo=placa_veiculo)
+        messages.success(request, f"Arremate do lote {lote.numero_lote} ({lote.veiculo.placa}) registrado com sucesso!")
+        return redirect('lista_veiculos_leilao', leilao_id=leilao.id)
+    contexto = { 'leilao': leilao, 'lote': lote }
+    return render(request, 'core/registrar_arremate_form.html', contexto)
+
+@login_required
+@require_POST
+def arrematar_lote_api(request, leilao_id, lote_id):
+    # Registro de arremate para a tela do pregão (JSON ou formulário), sem renderizar página.
+    try: dados = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except ValueError: return JsonResponse({'error': 'JSON inválido.'}, status=400)
+    lote = Lote.objects.filter(id=lote_id, leilao_id=leilao_id).first()
+    if not lote: return JsonResponse({'error': 'Lote não encontrado neste leilão.'}, status=404)
+    cpf_cliente = str(dados.get('cpf') or ''); valor_arremate = _clean_decimal(dados.get('valor_arremate'))
+    if not cpf_cliente or valor_arremate <= 0:
+        return JsonResponse({'error': 'CPF/CNPJ e valor do arremate são obrigatórios.'}, status=400)
+    try:
+        arremate = vender_lote(lote, cpf_cliente, dados.get('nome'), valor_arremate, dados.get('data_arremate'))
+    except LoteIndisponivel as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'arremate_id': arremate.id, 'lote_id': lote.id, 'numero_lote': lote.numero_lote, 'status': lote.status}, status=201)
+
+@login_required
+def lista_completa_veiculos(request):
+    filtros = _filtros_lotes(request)
+    status_filtro = filtros['status']; comitente_filtro_id = filtros['comitente']; leilao_filtro_id = filtros['leilao']
+    todos_os_comitentes = opcoes_comitentes(); todos_os_leiloes = opcoes_leiloes()
+    titulo_pagina = "Todos os Veículos"
+    if status_filtro:
+        try: titulo_pagina = f"Veículos com Status '{dict(Lote.STATUS_CHOICES)[status_filtro]}'"
+        except KeyError: pass
+    if comitente_filtro_id:
+        titulo_pagina += f" (Comitente: {dict(todos_os_comitentes).get(int(comitente_filtro_id), '?')})"
+    if leilao_filtro_id:
+        titulo_pagina += f" (Leilão: {dict(todos_os_leiloes).get(int(leilao_filtro_id), '?')})"
+    lotes = filtrar_lotes(status_filtro, comitente_filtro_id, leilao_filtro_id, filtros['busca']).select_related('veiculo', 'comitente', 'leilao')
+    # Paginação por cursor na ordem (leilão, lote): sem COUNT(*) nem OFFSET.
+    pagina = paginar_por_cursor(lotes, ('leilao_id', 'numero_lote'), depois=request.GET.get('depois'), antes=request.GET.get('antes'))
+    contexto = {
+        'pagina': pagina, 'titulo_pagina': titulo_pagina, 'status_filtro': status_filtro, 'comitente_filtro_id': comitente_filtro_id,
+        'leilao_filtro_id': leilao_filtro_id, 'busca': filtros['busca'], 'parametros': urlencode({'q' if campo == 'busca' else campo: valor for campo, valor in filtros.items() if valor}),
+        'todos_os_comitentes': todos_os_comitentes, 'todos_os_leiloes': todos_os_leiloes, 'todos_os_status': Lote.STATUS_CHOICES,
+    }
+    return render(request, 'core/lista_completa_veiculos.html', contexto)
+
+@login_required
+def lista_visitantes_leilao(request, leilao_id):
+    leilao = Leilao.objects.get(id=leilao_id)
+    visitas = Visita.objects.filter(leilao=leilao).order_by('-data_visita')
+    contexto = {'leilao': leilao, 'visitas': visitas}
+    return render(request, 'core/lista_visitantes.html', contexto)
+
+@login_required
+def gerenciar_lotes(request):
+    if request.method == 'POST':
+        lote_id = request.POST.get('lote_id')
+        acao = request.POST.get('acao')
+        lote = Lote.objects.select_related('veiculo').get(id=lote_id)
+        lotes = Lote.objects.filter(id=lote.id)
+
+        # Mesmas regras de transição das ações em massa do admin (core/lotes.py).
+        if acao == 'cancelar':
+            if cancelar_arremates(lotes)[0]:
+                messages.success(request, f"Arremate do lote {lote.numero_lote} ({lote.veiculo.placa}) foi cancelado.")
+            else:
+                messages.error(request, f"O arremate do lote {lote.numero_lote} ({lote.veiculo.placa}) não pode ser cancelado no status '{lote.get_status_display()}'.")
+        else:
+            novo_status = request.POST.get('novo_status')
+            try: alterados, _ = transicionar_lotes(lotes, novo_status)
+            except TransicaoInvalida as e: alterados = 0; messages.error(request, str(e))
+            if alterados:
+                lote.status = novo_status
+                messages.success(request, f"Status do lote {lote.numero_lote} ({lote.veiculo.placa}) atualizado para '{lote.get_status_display()}'.")
+            elif novo_status in TRANSICOES:
+                messages.error(request, f"O lote {lote.numero_lote} ({lote.veiculo.placa}) não pode passar de '{lote.get_status_display()}' para esse status.")
+
+        return redirect('gerenciar_lotes')
+
+    lotes = Lote.objects.select_related('veiculo', 'leilao').order_by('leilao__data_leilao_principal', 'numero_lote')
+    lotes_aguardando_pagamento = lotes.filter(status='ARREMATADO')
+    lotes_aguardando_retirada = lotes.filter(status='PAGAMENTO_CONFIRMADO')
+    contexto = {'aguardando_pagamento': lotes_aguardando_pagamento, 'aguardando_retirada': lotes_aguardando_retirada}
+    return render(request, 'core/gerenciar_lotes.html', contexto)
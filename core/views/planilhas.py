@@ -0,0 +1,92 @@
+# Arquivo: core/views/planilhas.py
+# Importação e exportação de planilhas e os jobs em segundo plano. O pandas (importação) e o
+# openpyxl (exportação) só são carregados quando uma planilha é de fato processada.
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse, Http404
+from django.shortcuts import render
+from ..exportacao import filtrar_lotes, gerar_xlsx_temporario, gerar_csv
+from ..jobs import enfileirar_importacao, enfileirar_exportacao, serializar_job
+from ..lotes import LoteIndisponivel
+from ..models import Leilao, Job
+from .comum import is_admin, _filtros_lotes
+
+@login_required
+@user_passes_test(is_admin)
+def upload_excel(request):
+    contexto = {'leiloes': Leilao.objects.all().order_by('-data_leilao_principal')}
+    if request.method == 'POST':
+        excel_file = request.FILES.get('excel_file'); leilao_id = request.POST.get('leilao')
+        if not excel_file:
+            contexto['error'] = 'Nenhum arquivo foi enviado.'
+            return render(request, 'core/upload_excel.html', contexto)
+        leilao = Leilao.objects.filter(id=leilao_id).first() if leilao_id else None
+        if not leilao:
+            contexto['error'] = 'Selecione o leilão de destino dos lotes.'
+            return render(request, 'core/upload_excel.html', contexto)
+        if request.POST.get('segundo_plano'):
+            contexto['job'] = enfileirar_importacao(excel_file, leilao, request.user)
+            return render(request, 'core/upload_excel.html', contexto)
+        # core.importacao carrega o pandas: só na primeira importação feita pela própria requisição.
+        from ..importacao import importar_lotes_streaming
+        try:
+            sucesso_count, erros = importar_lotes_streaming(excel_file, excel_file.name, leilao)
+            contexto['success'] = f'{sucesso_count} lotes importados/atualizados com sucesso no leilão {leilao.nome_evento}.'
+            contexto['errors'] = erros
+            return render(request, 'core/upload_excel.html', contexto)
+        except Exception as e:
+            contexto['error'] = f'Erro ao processar a planilha: {e}'
+            return render(request, 'core/upload_excel.html', contexto)
+    return render(request, 'core/upload_excel.html', contexto)
+
+@login_required
+@user_passes_test(is_admin)
+def importar_resultados(request):
+    # Planilha de resultados do leilão online (core/resultados.py): "previa" só concilia, "aplicar" grava.
+    contexto = {'leiloes': Leilao.objects.all().order_by('-data_leilao_principal')}
+    if request.method == 'POST':
+        excel_file = request.FILES.get('excel_file'); leilao_id = request.POST.get('leilao')
+        leilao = Leilao.objects.filter(id=leilao_id).first() if leilao_id else None
+        if not excel_file or not leilao:
+            contexto['error'] = 'Selecione o leilão e a planilha de resultados.'
+            return render(request, 'core/importar_resultados.html', contexto)
+        from ..resultados import conciliar_resultados
+        aplicar = request.POST.get('acao') == 'aplicar'
+        try:
+            contexto['relatorio'] = conciliar_resultados(excel_file, excel_file.name, leilao, aplicar=aplicar)
+        except LoteIndisponivel as e:
+            contexto['error'] = str(e)
+        except Exception as e:
+            contexto['error'] = f'Erro ao processar a planilha: {e}'
+        contexto.update({'leilao_selecionado': leilao, 'aplicado': aplicar})
+    return render(request, 'core/importar_resultados.html', contexto)
+
+@login_required
+def exportar_veiculos_xls(request):
+    # GET baixa o relatório na hora; POST (com os mesmos filtros na query string) cria um job.
+    filtros = _filtros_lotes(request)
+    if request.method == 'POST':
+        job = enfileirar_exportacao(filtros, request.user)
+        return JsonResponse(serializar_job(job), status=202)
+    queryset = filtrar_lotes(filtros['status'], filtros['comitente'], filtros['leilao'], filtros['busca'])
+    if request.GET.get('formato') == 'csv':
+        response = StreamingHttpResponse(gerar_csv(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="relatorio_veiculos.csv"'
+        return response
+    # FileResponse envia o arquivo temporário em blocos e o fecha ao final.
+    return FileResponse(gerar_xlsx_temporario(queryset), as_attachment=True, filename='relatorio_veiculos.xlsx', content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+# --- JOBS EM SEGUNDO PLANO ---
+def _obter_job_do_usuario(request, job_id):
+    job = Job.objects.filter(id=job_id).first()
+    if not job or (job.criado_por_id != request.user.id and not request.user.is_superuser): raise Http404
+    return job
+
+@login_required
+def status_job_api(request, job_id):
+    return JsonResponse(serializar_job(_obter_job_do_usuario(request, job_id)))
+
+@login_required
+def download_job(request, job_id):
+    job = _obter_job_do_usuario(request, job_id)
+    if job.status != 'CONCLUIDO' or not job.arquivo_resultado: raise Http404
+    return FileResponse(job.arquivo_resultado.open('rb'), as_attachment=True, filename='relatorio_veiculos.xlsx')
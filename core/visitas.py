@@ -0,0 +1,144 @@
+# Arquivo: core/visitas.py
+# Check-in de visitas em alto volume (API api/visitas/ e formulário da recepção). Os check-ins das
+# requisições simultâneas de um processo são agrupados em uma janela curta (tempo ou tamanho) e
+# gravados juntos, com um bulk_create em uma única transação ("group commit"). Cada requisição só
+# é respondida depois do commit do grupo que contém os seus check-ins.
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .cache_dashboard import invalidar_apos_commit, leiloes_ativos
+from .clientes import normalizar_documento, resolver_clientes
+from .models import Visita
+from .resumos import agendar_recalculo, intervalo_do_dia
+
+# Máximo de check-ins aceitos em uma única requisição.
+MAXIMO_POR_REQUISICAO = 500
+# Tempo máximo que uma requisição espera o commit do seu grupo antes de desistir.
+ESPERA_MAXIMA = 10.0
+
+REGISTRADA = 'registrada'
+DUPLICADA = 'duplicada'
+INVALIDA = 'invalida'
+
+class ColetorIndisponivel(Exception):
+    pass
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+def validar_checkin(dados):
+    # Devolve (leilao_id, documento, nome) ou levanta ValueError com a mensagem para o atendente.
+    if not isinstance(dados, dict): raise ValueError('Check-in deve ser um objeto JSON.')
+    leilao_id = dados.get('leilao')
+    try: leilao_id = int(leilao_id)
+    except (TypeError, ValueError): raise ValueError('Leilão inválido.')
+    if leilao_id not in leiloes_ativos(): raise ValueError('Leilão inexistente ou já encerrado.')
+    documento = normalizar_documento(str(dados.get('cpf') or ''))
+    if len(documento) not in (11, 14) or not documento.isdigit(): raise ValueError('CPF/CNPJ inválido.')
+    nome = str(dados.get('nome') or '').strip()[:255]
+    return leilao_id, documento, nome
+
+def gravar_checkins(checkins):
+    # Grava uma lista de (leilao_id, documento, nome) em uma transação e devolve o status de cada um.
+    # Um mesmo documento só conta uma visita por leilão e por dia: repetições são "duplicadas".
+    hoje = timezone.localdate(); inicio, fim = intervalo_do_dia(hoje)
+    with transaction.atomic():
+        vistos = set(Visita.objects.filter(
+            leilao_id__in={leilao_id for leilao_id, _, _ in checkins}, cpf_cliente__in={documento for _, documento, _ in checkins},
+            data_visita__gte=inicio, data_visita__lt=fim,
+        ).values_list('leilao_id', 'cpf_cliente'))
+        resultados = []; novas = []
+        for leilao_id, documento, nome in checkins:
+            if (leilao_id, documento) in vistos:
+                resultados.append(DUPLICADA); continue
+            vistos.add((leilao_id, documento))
+            novas.append(Visita(leilao_id=leilao_id, cpf_cliente=documento, nome_cliente=nome or None))
+            resultados.append(REGISTRADA)
+        if novas:
+            # bulk_create não dispara os sinais: cliente, resumos e cache são tratados aqui.
+            clientes = resolver_clientes({visita.cpf_cliente: visita.nome_cliente or '' for visita in novas})
+            for visita in novas: visita.cliente_id = clientes.get(visita.cpf_cliente)
+            Visita.objects.bulk_create(novas)
+            leiloes = {visita.leilao_id for visita in novas}
+            for leilao_id in leiloes: agendar_recalculo(leilao_id, hoje)
+            invalidar_apos_commit(leiloes)
+    return resultados
+
+class _Pedido:
+    __slots__ = ('checkins', 'concluido', 'resultados', 'erro')
+
+    def __init__(self, checkins):
+        self.checkins = checkins; self.concluido = threading.Event(); self.resultados = None; self.erro = None
+
+class ColetorVisitas:
+    # Uma thread por processo grava os grupos; as requisições ficam bloqueadas até o commit.
+    def __init__(self, janela_ms, tamanho_maximo):
+        self.janela_ms = janela_ms; self.janela = janela_ms / 1000; self.tamanho_maximo = tamanho_maximo
+        self.condicao = threading.Condition(); self.pendentes = []; self.quantidade = 0
+        self.thread = None
+
+    def registrar(self, checkins):
+        if self.janela <= 0: return gravar_checkins(checkins)
+        pedido = _Pedido(checkins)
+        with self.condicao:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._executar, name='coletor-visitas', daemon=True); self.thread.start()
+            self.pendentes.append(pedido); self.quantidade += len(checkins)
+            self.condicao.notify()
+        if not pedido.concluido.wait(ESPERA_MAXIMA): raise ColetorIndisponivel('Tempo esgotado aguardando a gravação das visitas.')
+        if pedido.erro: raise ColetorIndisponivel(f'Falha ao gravar as visitas: {pedido.erro}')
+        return pedido.resultados
+
+    def _proximo_grupo(self):
+        with self.condicao:
+            while not self.pendentes: self.condicao.wait()
+            # Espera a janela (ou o grupo encher) a partir do primeiro check-in pendente.
+            prazo = time.monotonic() + self.janela
+            while self.quantidade < self.tamanho_maximo and (restante := prazo - time.monotonic()) > 0:
+                self.condicao.wait(restante)
+            grupo = self.pendentes; self.pendentes = []; self.quantidade = 0
+        return grupo
+
+    def _executar(self):
+        while True:
+            grupo = self._proximo_grupo()
+            # Cada grupo é tratado como uma requisição: a conexão segue as regras de CONN_MAX_AGE.
+            close_old_connections()
+            try:
+                resultados = gravar_checkins([checkin for pedido in grupo for checkin in pedido.checkins])
+            except Exception as e:
+                for pedido in grupo: pedido.erro = str(e); pedido.concluido.set()
+                continue
+            finally:
+                close_old_connections()
+            inicio = 0
+            for pedido in grupo:
+                pedido.resultados = resultados[inicio:inicio + len(pedido.checkins)]; inicio += len(pedido.checkins)
+                pedido.concluido.set()
+
+_coletor = None
+_trava_coletor = threading.Lock()
+
+def obter_coletor():
+    # Um coletor por processo; é refeito se a configuração mudar (ex.: override_settings nos testes).
+    global _coletor
+    janela_ms = _configuracao('VISITAS_JANELA_MS', 20); tamanho_maximo = _configuracao('VISITAS_GRUPO_MAXIMO', 200)
+    with _trava_coletor:
+        if _coletor is None or (_coletor.janela_ms, _coletor.tamanho_maximo) != (janela_ms, tamanho_maximo):
+            _coletor = ColetorVisitas(janela_ms, tamanho_maximo)
+    return _coletor
+
+def registrar_visitas(itens):
+    # Valida e grava uma lista de check-ins (dicts com leilao, cpf e nome) e devolve, na mesma
+    # ordem, {'status': registrada|duplicada|invalida[, 'erro': mensagem]}. Pode levantar
+    # ColetorIndisponivel; nesse caso nada foi confirmado e o cliente deve reenviar.
+    resultados = [None] * len(itens); validos = []; posicoes = []
+    for posicao, dados in enumerate(itens):
+        try: validos.append(validar_checkin(dados)); posicoes.append(posicao)
+        except ValueError as e: resultados[posicao] = {'status': INVALIDA, 'erro': str(e)}
+    if validos:
+        for posicao, status in zip(posicoes, obter_coletor().registrar(validos)):
+            resultados[posicao] = {'status': status}
+    return resultados
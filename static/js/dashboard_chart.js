@@ -1,7 +1,7 @@
 function renderizarGraficoVendas(labels, data) {
     const ctx = document.getElementById('vendasChart');
     if (ctx) {
-        new Chart(ctx, {
+        return new Chart(ctx, {
             type: 'bar',
             data: {
                 labels: labels,
@@ -43,4 +43,67 @@ function renderizarGraficoVendas(labels, data) {
             }
         });
     }
-}
\ No newline at end of file
+    return null;
+}
+
+// Atualiza o gráfico e os KPIs consultando a API do dashboard (api/dashboard/) a cada intervalo,
+// com GET condicional: enquanto nada muda, o servidor responde 304 sem corpo e nada é redesenhado.
+// Os KPIs são os elementos com data-kpi (caminho no JSON, ex.: "funil.taxa_conversao") e
+// data-formato opcional ("moeda" ou "percentual").
+function acompanharDashboard(url, grafico, intervaloMs) {
+    let etag = null;
+
+    function formatar(valor, formato) {
+        if (formato === 'moeda') return valor.toLocaleString('pt-BR', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+        if (formato === 'percentual') return valor.toLocaleString('pt-BR', { minimumFractionDigits: 2, maximumFractionDigits: 2 }) + '%';
+        return valor.toLocaleString('pt-BR');
+    }
+
+    function atualizarTopArrematantes(arrematantes) {
+        const corpo = document.getElementById('topArrematantes');
+        if (!corpo) return;
+        corpo.replaceChildren();
+        for (const arrematante of arrematantes) {
+            const linha = corpo.insertRow();
+            linha.insertCell().textContent = arrematante.nome_cliente;
+            linha.insertCell().textContent = arrematante.cpf_cliente;
+            linha.insertCell().textContent = 'R$ ' + formatar(arrematante.total_gasto, 'moeda');
+        }
+        if (!arrematantes.length) {
+            const celula = corpo.insertRow().insertCell();
+            celula.colSpan = 3;
+            celula.textContent = 'Nenhum arremate registrado no período.';
+        }
+    }
+
+    function aplicar(dados) {
+        if (grafico) {
+            grafico.data.labels = dados.vendas_por_dia.labels;
+            grafico.data.datasets[0].data = dados.vendas_por_dia.valores;
+            grafico.update();
+        }
+        document.querySelectorAll('[data-kpi]').forEach(function(elemento) {
+            const valor = elemento.dataset.kpi.split('.').reduce((objeto, chave) => objeto && objeto[chave], dados);
+            if (valor !== undefined && valor !== null) elemento.textContent = formatar(valor, elemento.dataset.formato);
+        });
+        atualizarTopArrematantes(dados.top_arrematantes);
+    }
+
+    async function consultar() {
+        if (document.hidden) return;
+        const cabecalhos = { 'Accept': 'application/json' };
+        if (etag) cabecalhos['If-None-Match'] = etag;
+        try {
+            // no-store: o ETag é controlado aqui, e o 304 chega ao script em vez de virar a resposta em cache.
+            const resposta = await fetch(url, { headers: cabecalhos, credentials: 'same-origin', cache: 'no-store' });
+            if (resposta.status === 304 || !resposta.ok) return;
+            etag = resposta.headers.get('ETag');
+            aplicar(await resposta.json());
+        } catch (erro) {
+            // Sem conexão: tenta de novo no próximo intervalo.
+        }
+    }
+
+    setInterval(consultar, intervaloMs || 30000);
+    document.addEventListener('visibilitychange', function() { if (!document.hidden) consultar(); });
+}